@@ -0,0 +1,383 @@
+from deals import four_of_a_month, random_deals
+from fast_go_stop import _DEAL_ORDER
+from models.card_ids import (NUM_CARDS,
+                             MONTH_MASKS,
+                             SWITCH_CARD_MASK,
+                             BRIGHT_MASK,
+                             ANIMAL_MASK,
+                             RIBBON_MASK,
+                             SINGLE_JUNK_MASK,
+                             DOUBLE_JUNK_MASK,
+                             RED_RIBBON_MASK,
+                             PLANT_RIBBON_MASK,
+                             BLUE_RIBBON_MASK,
+                             DEC_BRIGHT_MASK,
+                             GODORI_MASK)
+from models.score_table import SCORE_ARRAY, SWITCH_JUNK_FLAG, SCORE_MASK, composition_key
+
+import numpy as np
+
+from typing import Callable, Optional
+
+# Action slots of BatchGoStop.legal_actions. Throws and single match selects use the
+# card id, a select of both a thrown and a flipped match uses SELECT_BOTH_SLOT + 2 * i + j
+# for the i-th flipped and j-th thrown match, lowest card id first
+STOP_SLOT = NUM_CARDS
+GO_SLOT = NUM_CARDS + 1
+SELECT_BOTH_SLOT = NUM_CARDS + 2
+NUM_SLOTS = SELECT_BOTH_SLOT + 4
+
+_ONE = np.uint64(1)
+_SHIFTS = np.arange(NUM_CARDS, dtype=np.uint64)
+_BITS = _ONE << _SHIFTS
+_MONTH_MASK_OF_CARD = np.array([MONTH_MASKS[card >> 2] for card in range(NUM_CARDS)], dtype=np.uint64)
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(masks: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(masks).astype(np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+    def _popcount(masks: np.ndarray) -> np.ndarray:
+        masks = np.ascontiguousarray(masks, dtype=np.uint64)
+        return _BYTE_COUNTS[masks.view(np.uint8).reshape(masks.shape + (8,))].sum(axis=-1)
+
+def _u64(mask: int) -> np.uint64:
+    return np.uint64(mask)
+
+def _lowest_bit(masks: np.ndarray) -> np.ndarray:
+    return masks & (~masks + _ONE)
+
+def _has(masks: np.ndarray, mask: int) -> np.ndarray:
+    return masks & _u64(mask) != 0
+
+def _has_all(masks: np.ndarray, mask: int) -> np.ndarray:
+    return masks & _u64(mask) == _u64(mask)
+
+
+class BatchGoStop():
+    """num_games games of GoStop as NumPy arrays, stepped together.
+
+    Same card masks and rules as FastGoStop (see models.card_ids), with one
+    row per game. Every step each unfinished game takes one action, chosen
+    uniformly at random from its legal slots or drawn from a policy.
+    History, info sets and undo are left out, rollouts only need payoffs.
+    """
+
+    def __init__(self, num_games: int, rng: Optional[np.random.Generator] = None, shuffle: bool = True,
+                 deals: Optional[np.ndarray] = None):
+        # Deals from deals (num_games rows of deals.py), else every game gets its own random deal,
+        # or with shuffle False all games get the unshuffled order of a new Deck
+        self.num_games = num_games
+        self.rng = rng if rng is not None else np.random.default_rng()
+        if deals is not None:
+            if len(deals) != num_games:
+                raise ValueError(f"{len(deals)} deals for {num_games} games")
+            order = np.asarray(deals, dtype=np.uint8)
+        elif shuffle:
+            order = random_deals(num_games, self.rng)
+        else:
+            order = np.tile(np.frombuffer(_DEAL_ORDER, dtype=np.uint8), (num_games, 1))
+            if four_of_a_month(order[:1]).any():
+                raise ValueError("The order of a new Deck has four cards of a month")
+
+        self.hands = np.stack([self._mask_of(order[:, :10]), self._mask_of(order[:, 10:20])], axis=1)
+        self.center = self._mask_of(order[:, 20:28])
+        self.deck = order[:, 28:].copy()
+        self.deck_size = np.full(num_games, self.deck.shape[1], dtype=np.int64)
+        self.captured = np.zeros((num_games, 2), dtype=np.uint64)
+        self.curr = np.zeros(num_games, dtype=np.int64)
+        self.scores = np.zeros((num_games, 2), dtype=np.int64)
+        self.num_go = np.zeros((num_games, 2), dtype=np.int64)
+        self.num_ssa = np.zeros((num_games, 2), dtype=np.int64)
+        self.switch_junk = np.zeros(num_games, dtype=bool)
+        self.go = np.zeros(num_games, dtype=bool)
+        self.select = np.zeros(num_games, dtype=bool)
+        # (og card, matches) of a select, the second pair is the thrown card's when both have to select
+        self.select_cards = np.zeros((num_games, 2), dtype=np.int64)
+        self.select_matches = np.zeros((num_games, 2), dtype=np.uint64)
+        self.select_both = np.zeros(num_games, dtype=bool)
+        self.terminal = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int64) # player number, 0 for none
+
+    @staticmethod
+    def _mask_of(card_ids: np.ndarray) -> np.ndarray:
+        return np.bitwise_or.reduce(_BITS[card_ids], axis=1)
+
+    def _current_hands(self) -> np.ndarray:
+        return self.hands[np.arange(self.num_games), self.curr]
+
+    def done(self) -> np.ndarray:
+        # Terminal, or out of cards to throw (no actions, as in GoStop)
+        throw = ~(self.terminal | self.go | self.select)
+        return self.terminal | throw & (self._current_hands() == 0)
+
+    def legal_actions(self) -> np.ndarray:
+        # (num_games, NUM_SLOTS) legal action slots, none for finished games
+        legal = np.zeros((self.num_games, NUM_SLOTS), dtype=bool)
+        playing = ~self.terminal
+        throw = playing & ~self.go & ~self.select
+        single = playing & self.select & ~self.select_both
+        card_masks = np.where(throw, self._current_hands(),
+                              np.where(single, self.select_matches[:, 0], _u64(0)))
+        legal[:, :NUM_CARDS] = (card_masks[:, None] >> _SHIFTS) & _ONE != 0
+        legal[:, STOP_SLOT] = legal[:, GO_SLOT] = playing & self.go
+        legal[:, SELECT_BOTH_SLOT:] = (playing & self.select & self.select_both)[:, None]
+        return legal
+
+    def sample_actions(self, legal: np.ndarray, policy: Optional[Callable] = None) -> np.ndarray:
+        # Uniform over legal slots, or over policy(self, legal) weights (num_games, NUM_SLOTS)
+        if policy is None:
+            return self._uniform_actions(legal)
+        weights = np.where(legal, policy(self, legal), 0)
+        cumulative = np.cumsum(weights, axis=1)
+        draws = self.rng.random(self.num_games) * cumulative[:, -1]
+        choices = (cumulative <= draws[:, None]).sum(axis=1)
+        # Games whose legal slots all have weight 0 play uniformly instead
+        unweighted = cumulative[:, -1] <= 0
+        if unweighted.any():
+            choices[unweighted] = self._uniform_actions(legal[unweighted])
+        return np.minimum(choices, NUM_SLOTS - 1)
+
+    def _uniform_actions(self, legal: np.ndarray) -> np.ndarray:
+        # The legal slot with the largest random key is a uniform choice
+        return np.argmax(self.rng.random(legal.shape) * legal, axis=1)
+
+    def random_actions(self) -> np.ndarray:
+        # A uniformly random legal slot per game, read off the masks without building legal_actions
+        draws = self.rng.random(self.num_games)
+        card_masks = np.where(self.select, self.select_matches[:, 0], self._current_hands())
+        picks = (draws * _popcount(card_masks)).astype(np.int64)
+        for num_skipped in range(picks.max(initial=0)):
+            card_masks = np.where(picks > num_skipped, card_masks & (card_masks - _ONE), card_masks)
+        actions = _popcount(_lowest_bit(card_masks) - _ONE)
+        actions = np.where(self.go, STOP_SLOT + (draws < 0.5), actions)
+        return np.where(self.select_both, SELECT_BOTH_SLOT + (draws * 4).astype(np.int64), actions)
+
+    def step(self, actions: np.ndarray, legal: Optional[np.ndarray] = None):
+        # Plays actions[g] in every unfinished game g, checked against legal (from legal_actions) when given
+        if legal is not None:
+            active = legal.any(axis=1)
+            assert legal[active, actions[active]].all(), "illegal action"
+        playing = ~self.done()
+        throw = playing & ~self.go & ~self.select
+        go = playing & self.go
+        single = playing & self.select & ~self.select_both
+        both = playing & self.select & self.select_both
+
+        games = np.flatnonzero(throw)
+        self._throw_and_flip(games, actions[games])
+
+        games = np.flatnonzero(go)
+        self.go[games] = False
+        self._go(games[actions[games] == GO_SLOT])
+        self._stop(games[actions[games] == STOP_SLOT])
+
+        games = np.flatnonzero(single)
+        match_bits = _BITS[actions[games]]
+        self._select(games, _BITS[self.select_cards[games, 0]] | match_bits, match_bits)
+
+        games = np.flatnonzero(both)
+        pair = actions[games] - SELECT_BOTH_SLOT
+        flipped_matches, thrown_matches = self.select_matches[games, 0], self.select_matches[games, 1]
+        flipped_low, thrown_low = _lowest_bit(flipped_matches), _lowest_bit(thrown_matches)
+        match_bits = (np.where(pair >> 1 == 0, flipped_low, flipped_matches ^ flipped_low)
+                      | np.where(pair & 1 == 0, thrown_low, thrown_matches ^ thrown_low))
+        og_bits = _BITS[self.select_cards[games, 0]] | _BITS[self.select_cards[games, 1]]
+        self._select(games, og_bits | match_bits, match_bits)
+
+    def run(self, policy: Optional[Callable] = None) -> np.ndarray:
+        # Plays every game to the end, returns calculate_winnings of each (num_games, 2)
+        while not self.done().all():
+            if policy is None:
+                self.step(self.random_actions())
+            else:
+                self.step(self.sample_actions(self.legal_actions(), policy))
+        return self.calculate_winnings()
+
+    def _throw_and_flip(self, games: np.ndarray, thrown_cards: np.ndarray):
+        curr = self.curr[games]
+        thrown_bits = _BITS[thrown_cards]
+        month_masks = _MONTH_MASK_OF_CARD[thrown_cards]
+
+        self.hands[games, curr] &= ~thrown_bits
+        center = self.center[games] | thrown_bits
+        matched_cards = center & month_masks
+        four = matched_cards == month_masks
+        self.center[games] = np.where(four, center & ~month_masks, center)
+        self.captured[games, curr] |= np.where(four, matched_cards, _u64(0))
+
+        num_steal_junk = four.astype(np.int64)
+        num_steal_junk += self._flip(games, np.where(four, -1, thrown_cards))
+
+        # Sweep
+        num_steal_junk += (self.center[games] == 0) & (self.hands[games, curr] != 0)
+
+        for num_taken in range(num_steal_junk.max(initial=0)):
+            self._take_junk(games[num_steal_junk > num_taken])
+
+        self._check_go(games[~self.select[games]])
+
+    def _flip(self, games: np.ndarray, thrown_cards: np.ndarray) -> np.ndarray:
+        # thrown_cards -1 where the thrown card was already captured, returns junk to steal per game
+        curr = self.curr[games]
+        self.deck_size[games] -= 1
+        flipped_cards = self.deck[games, self.deck_size[games]].astype(np.int64)
+        flipped_bits = _BITS[flipped_cards]
+        flip_month_masks = _MONTH_MASK_OF_CARD[flipped_cards]
+        center = self.center[games]
+        captured = self.captured[games, curr]
+        flip_matched_cards = center & flip_month_masks
+        num_flip_matched = _popcount(flip_matched_cards)
+        num_steal_junk = np.zeros(len(games), dtype=np.int64)
+
+        thrown = thrown_cards >= 0
+        thrown_safe = np.where(thrown, thrown_cards, 0)
+        thrown_bits = np.where(thrown, _BITS[thrown_safe], _u64(0))
+        thrown_month_masks = np.where(thrown, _MONTH_MASK_OF_CARD[thrown_safe], _u64(0))
+
+        # Flipped card of the thrown card's month
+        same = thrown & (thrown_month_masks == flip_month_masks)
+        take_all = same & (num_flip_matched == 3)
+        ssa = same & (num_flip_matched == 2)
+        ghost = same & (num_flip_matched == 1)
+        num_steal_junk += take_all | ghost
+        center = np.where(take_all, center & ~flip_month_masks, center)
+        captured |= np.where(take_all, flip_matched_cards | flipped_bits, _u64(0))
+        self.num_ssa[games[ssa], curr[ssa]] += 1
+        center = np.where(ssa, center | flipped_bits, center)
+        center = np.where(ghost, center & ~thrown_bits, center)
+        captured |= np.where(ghost, thrown_bits | flipped_bits, _u64(0))
+
+        # Thrown card matches, the thrown card is in the center so it counts itself
+        rest = ~same
+        thrown_matched_cards = center & thrown_month_masks
+        num_thrown_matched = _popcount(thrown_matched_cards)
+        thrown_select = rest & thrown & (num_thrown_matched == 3)
+        thrown_take = rest & thrown & (num_thrown_matched == 2)
+        center = np.where(thrown_take, center & ~thrown_month_masks, center)
+        captured |= np.where(thrown_take, thrown_matched_cards, _u64(0))
+
+        # Flipped card matches
+        flip_take = rest & ((num_flip_matched == 3) | (num_flip_matched == 1))
+        num_steal_junk += rest & (num_flip_matched == 3)
+        flip_select = rest & (num_flip_matched == 2)
+        center = np.where(flip_take, center & ~flip_month_masks, center)
+        captured |= np.where(flip_take, flip_matched_cards | flipped_bits, _u64(0))
+        center = np.where(rest & (num_flip_matched == 0), center | flipped_bits, center)
+
+        # Selects, the thrown card leaves the center until a match is chosen
+        center = np.where(thrown_select, center & ~thrown_bits, center)
+        self.center[games] = center
+        self.captured[games, curr] = captured
+        selects = thrown_select | flip_select
+        self.select[games] = selects
+        self.select_both[games] = thrown_select & flip_select
+        first_card = np.where(flip_select, flipped_cards, thrown_safe)
+        first_matches = np.where(flip_select, flip_matched_cards, thrown_matched_cards & ~thrown_bits)
+        self.select_cards[games, 0] = first_card
+        self.select_matches[games, 0] = first_matches
+        self.select_cards[games, 1] = thrown_safe
+        self.select_matches[games, 1] = thrown_matched_cards & ~thrown_bits
+        return num_steal_junk
+
+    def _select(self, games: np.ndarray, captured: np.ndarray, matches: np.ndarray):
+        curr = self.curr[games]
+        self.select[games] = False
+        self.select_both[games] = False
+        self.center[games] &= ~matches
+        self.captured[games, curr] |= captured
+        has_cards = self.hands[games, curr] != 0
+        self._check_go(games[has_cards])
+        self.curr[games[~has_cards]] ^= 1
+
+    def _check_go(self, games: np.ndarray):
+        # Go check after a capture, switches turns if current player cannot go
+        curr = self.curr[games]
+        old_scores = self.scores[games, curr]
+        self._update_score(games, curr)
+        scores = self.scores[games, curr]
+        no_go = self.num_go[games, curr] == 0
+        out_of_cards = self.hands[games, curr] == 0
+        scored = np.where(no_go, scores >= 7, scores > old_scores)
+        wins = scored & np.where(no_go, (self.num_go[games, curr ^ 1] > 0) | out_of_cards, out_of_cards)
+        self.terminal[games[wins]] = True
+        self.winner[games[wins]] = curr[wins] + 1
+        self.go[games[scored & ~wins]] = True
+        self.curr[games[~scored]] ^= 1
+
+    def _take_junk(self, games: np.ndarray):
+        curr = self.curr[games]
+        opponent_captured = self.captured[games, curr ^ 1]
+        junk_cards = opponent_captured & _u64(SINGLE_JUNK_MASK)
+        doubles = opponent_captured & _u64(DOUBLE_JUNK_MASK)
+        doubles |= np.where(self.switch_junk[games], opponent_captured & _u64(SWITCH_CARD_MASK), _u64(0))
+        junk_cards = np.where(junk_cards != 0, junk_cards, doubles)
+        cards = _lowest_bit(junk_cards)
+        self.captured[games, curr ^ 1] ^= cards
+        self.captured[games, curr] |= cards
+
+    def _go(self, games: np.ndarray):
+        curr = self.curr[games]
+        self.num_go[games, curr] += 1
+        self._update_score(games, curr)
+        self.curr[games] ^= 1
+
+    def _stop(self, games: np.ndarray):
+        self.terminal[games] = True
+        self.winner[games] = self.curr[games] + 1
+        self._update_score(games, self.curr[games])
+
+    def _update_score(self, games: np.ndarray, players: np.ndarray):
+        # Score table lookup; a captured switch card takes whichever type scores best
+        captured = self.captured[games, players]
+        has_switch = _has(captured, SWITCH_CARD_MASK)
+        ribbon_sets = (_has_all(captured, RED_RIBBON_MASK).astype(np.int64)
+                       | _has_all(captured, PLANT_RIBBON_MASK) << 1
+                       | _has_all(captured, BLUE_RIBBON_MASK) << 2)
+        key = composition_key(_popcount(captured & _u64(BRIGHT_MASK)),
+                              _has(captured, DEC_BRIGHT_MASK).astype(np.int64),
+                              _popcount(captured & _u64(ANIMAL_MASK)),
+                              _has_all(captured, GODORI_MASK).astype(np.int64),
+                              _popcount(captured & _u64(RIBBON_MASK)),
+                              ribbon_sets,
+                              self._junk_weight(captured),
+                              has_switch.astype(np.int64))
+        entries = SCORE_ARRAY[key]
+        self.scores[games, players] = entries & SCORE_MASK
+        switch_games = games[has_switch]
+        self.switch_junk[switch_games] = entries[has_switch] & SWITCH_JUNK_FLAG != 0
+
+    @staticmethod
+    def _junk_weight(captured: np.ndarray) -> np.ndarray:
+        # Without the switch card
+        return _popcount(captured & _u64(SINGLE_JUNK_MASK)) + 2 * _popcount(captured & _u64(DOUBLE_JUNK_MASK))
+
+    def calculate_winnings(self) -> np.ndarray:
+        # (num_games, 2) payoffs, as GoStop.calculate_winnings
+        winnings = np.zeros((self.num_games, 2), dtype=np.int64)
+        games = np.flatnonzero(self.winner > 0)
+        winner = self.winner[games] - 1
+        self._update_score(games, winner)
+        amounts = self.scores[games, winner]
+        winner_captured = self.captured[games, winner]
+        loser_captured = self.captured[games, winner ^ 1]
+        switch_junk = self.switch_junk[games]
+
+        # Go - Penalties
+        num_go = self.num_go[games, winner]
+        amounts = np.where(num_go < 3, amounts + num_go, amounts << np.maximum(num_go - 2, 0))
+
+        # Pi-bak
+        winner_junk = self._junk_weight(winner_captured) + 2 * (switch_junk & _has(winner_captured, SWITCH_CARD_MASK))
+        loser_junk = self._junk_weight(loser_captured) + 2 * (switch_junk & _has(loser_captured, SWITCH_CARD_MASK))
+        amounts = np.where((winner_junk >= 10) & (loser_junk < 6), amounts * 2, amounts)
+
+        # Guang-bak
+        winner_bright = _popcount(winner_captured & _u64(BRIGHT_MASK))
+        loser_bright = _popcount(loser_captured & _u64(BRIGHT_MASK))
+        amounts = np.where((winner_bright >= 3) & (loser_bright == 0), amounts * 2, amounts)
+
+        winnings[games, winner] = amounts
+        winnings[games, winner ^ 1] = -amounts
+        return winnings
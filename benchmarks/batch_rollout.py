@@ -0,0 +1,51 @@
+# Random rollouts of BatchGoStop against the object engine: games per second and payoff statistics
+# Run from the repository root: python -m benchmarks.batch_rollout [num_games]
+from batch_go_stop import BatchGoStop
+from go_stop import GoStop
+
+import random
+import sys
+import time
+
+import numpy as np
+
+NUM_OBJECT_GAMES = 1000
+
+def object_rollouts(num_games, seed=0):
+    # The loop of test.py
+    random.seed(seed)
+    winnings = []
+    for _ in range(num_games):
+        game = GoStop()
+        while not game.terminal:
+            actions = game.actions()
+            if not actions:
+                break
+            game.play(random.choice(actions))
+        winnings.append(game.calculate_winnings())
+    return np.array(winnings)
+
+def summary(winnings):
+    p1 = winnings[:, 0]
+    return p1.mean(), p1.std() / np.sqrt(len(p1)), (p1 > 0).mean(), (p1 < 0).mean()
+
+def bench(num_games):
+    start = time.perf_counter()
+    object_winnings = object_rollouts(NUM_OBJECT_GAMES)
+    object_rate = NUM_OBJECT_GAMES / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch_winnings = BatchGoStop(num_games, np.random.default_rng(0)).run()
+    batch_rate = num_games / (time.perf_counter() - start)
+
+    for name, winnings, rate in (("object", object_winnings, object_rate), ("batch", batch_winnings, batch_rate)):
+        mean, error, p1_wins, p2_wins = summary(winnings)
+        print(f"{name:>6}: {len(winnings):7d} games, {rate:9.0f} games/s, "
+              f"p1 winnings {mean:6.2f} +- {error:.2f}, p1 wins {p1_wins:.3f}, p2 wins {p2_wins:.3f}")
+    object_mean, object_error = summary(object_winnings)[:2]
+    batch_mean, batch_error = summary(batch_winnings)[:2]
+    z = (batch_mean - object_mean) / np.hypot(object_error, batch_error)
+    print(f"speedup {batch_rate / object_rate:.0f}x, difference in mean p1 winnings z = {z:.2f}")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,65 @@
+# Convergence of the update rules in cfr_rules on SimplifiedGoStop
+# Run from the repository root: python -m benchmarks.cfr_rules [num_deals]
+# Each rule trains on one fixed deal at a time. Within a deal every history is
+# its own info set, so the best response is an expectimax over the deal's tree
+# and the exploitability below is exact for that deal.
+# Then the time an outcome sampling iteration takes with each rule, in a table
+# padded to TABLE_ROWS rows: rules rescale rows as they are touched, so the
+# time should not depend on the table's size.
+from best_response import BestResponse
+from cfr_rules import CFRPlus, DiscountedCFR, LinearCFR, UpdateRule
+from go_stop_ai import GoStopAI
+from simplified_go_stop import SimplifiedGoStop
+
+import contextlib
+import io
+import random
+import sys
+import time
+
+import numpy as np
+
+CHECKPOINTS = (10, 30, 100, 300, 1000)
+RULES = (UpdateRule(), CFRPlus(), LinearCFR(), DiscountedCFR())
+TABLE_ROWS = 200000
+OVERHEAD_ITERATIONS = 2000
+
+def deal(seed):
+    random.seed(seed)
+    return SimplifiedGoStop()
+
+def bench(num_deals):
+    deals = [deal(seed) for seed in range(num_deals)]
+    evaluations = [BestResponse([game], flips="deck") for game in deals]
+    print(f"Mean exploitability over {num_deals} deals after n iterations")
+    print("rule".ljust(40) + "".join(f"{n:>10}" for n in CHECKPOINTS))
+    for rule in RULES:
+        results = np.zeros((num_deals, len(CHECKPOINTS)))
+        for deal_index, game in enumerate(deals):
+            ai = GoStopAI()
+            random.seed(deal_index)
+            done = 0
+            for checkpoint_index, checkpoint in enumerate(CHECKPOINTS):
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    ai.train(checkpoint - done, game_class=game.clone, rule=rule)
+                done = checkpoint
+                results[deal_index, checkpoint_index] = evaluations[deal_index].exploitability(ai.nodeMap)
+        print(repr(rule).ljust(40) + "".join(f"{value:10.4f}" for value in results.mean(axis=0)))
+
+def bench_overhead():
+    print(f"Outcome sampling, {OVERHEAD_ITERATIONS} iterations in a table of {TABLE_ROWS} rows")
+    rng = np.random.default_rng(0)
+    for rule in RULES:
+        ai = GoStopAI()
+        for _ in range(TABLE_ROWS):
+            ai.nodeMap.add(rng.bytes(16), int(rng.integers(2, 5)))
+        random.seed(0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            ai.train(OVERHEAD_ITERATIONS, scheme="outcome", rule=rule)
+        elapsed = time.perf_counter() - start
+        print(repr(rule).ljust(40) + f"{elapsed / OVERHEAD_ITERATIONS * 1000:10.3f} ms/iteration")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
+    bench_overhead()
@@ -0,0 +1,39 @@
+# Clone latency against the serialize/deserialize round-trip
+# Run from the repository root: python -m benchmarks.clone
+from go_stop import GoStop
+from simplified_go_stop import SimplifiedGoStop
+
+import random
+import timeit
+
+NUM_STATES = 50
+NUM_REPEATS = 20
+
+def sample_states(game_class, seed=0): 
+    # States from random playouts, a few plays into each game 
+    random.seed(seed)
+    states = []
+    while len(states) < NUM_STATES: 
+        game = game_class()
+        for _ in range(random.randrange(6)): 
+            actions = game.actions()
+            if not actions: 
+                break
+            game.play(random.choice(actions))
+        states.append(game)
+    return states
+
+def bench(game_class): 
+    states = sample_states(game_class)
+    round_trip = min(timeit.repeat(
+        lambda: [game_class.deserialize(game.serialize()) for game in states], 
+        number=1, repeat=NUM_REPEATS)) / NUM_STATES
+    clone = min(timeit.repeat(
+        lambda: [game.clone() for game in states], 
+        number=1, repeat=NUM_REPEATS)) / NUM_STATES
+    print(f"{game_class.__name__}: round-trip {round_trip * 1e6:.1f} us, "
+          f"clone {clone * 1e6:.1f} us, {round_trip / clone:.0f}x")
+
+if __name__ == "__main__": 
+    bench(GoStop)
+    bench(SimplifiedGoStop)
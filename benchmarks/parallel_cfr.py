@@ -0,0 +1,43 @@
+# Scaling of GoStopAI.train_parallel with the number of workers
+# Run from the repository root: python -m benchmarks.parallel_cfr [iterations]
+from go_stop_ai import GoStopAI
+
+import os
+import sys
+import time
+
+import numpy as np
+
+def worker_counts(): 
+    counts = [1]
+    while counts[-1] * 2 <= os.cpu_count(): 
+        counts.append(counts[-1] * 2)
+    if counts[-1] != os.cpu_count(): 
+        counts.append(os.cpu_count())
+    return counts
+
+def same_table(ai, reference): 
+    if list(ai.nodeMap.keys()) != list(reference.nodeMap.keys()): 
+        return False
+    return all(np.array_equal(ai.nodeMap[infoSet].regretSum, node.regretSum) 
+               and np.array_equal(ai.nodeMap[infoSet].strategySum, node.strategySum) 
+               for infoSet, node in reference.nodeMap.items())
+
+def bench(iterations, scheme="chance"): 
+    reference = None
+    rows = []
+    for workers in worker_counts(): 
+        ai = GoStopAI()
+        start = time.perf_counter()
+        ai.train_parallel(iterations, workers=workers, seed=0, scheme=scheme)
+        elapsed = time.perf_counter() - start
+        if reference is None: 
+            reference, reference_time = ai, elapsed
+        assert same_table(ai, reference), f"{workers} workers trained a different table"
+        rows.append((workers, elapsed, reference_time / elapsed))
+    print(f"{scheme}, {iterations} iterations")
+    for workers, elapsed, speedup in rows: 
+        print(f"  {workers:3d} workers: {elapsed:7.2f} s, speedup {speedup:5.2f}, efficiency {speedup / workers:.0%}")
+
+if __name__ == "__main__": 
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2048)
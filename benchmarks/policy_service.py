@@ -0,0 +1,91 @@
+# Many SimplifiedGoStop games played against one PolicyService at once
+# Run from the repository root: python -m benchmarks.policy_service [games] [tables]
+# Each table is a task playing games one after another, both players sampling
+# the service's strategies; tables share connections, as a game server would.
+# Checks the answers against StrategyFile.get and reports the service's stats.
+from go_stop_ai import GoStopAI
+from policy_service import PolicyService, PolicyClient
+from simplified_go_stop import SimplifiedGoStop
+from strategy_file import StrategyFile
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+CONNECTIONS = 4
+
+async def play_table(client, policy, rng, num_games, latencies, queries):
+    num_found = 0
+    for _ in range(num_games):
+        game = SimplifiedGoStop(int(rng.integers(2**32)))
+        while not game.terminal:
+            actions = game.actions()
+            queries.append((game.get_infoSet(), len(actions)))
+            start = time.perf_counter()
+            strategy, found = await client.strategy_found(game.get_infoSet(), len(actions))
+            latencies.append(time.perf_counter() - start)
+            expected = policy.get(game.get_infoSet())
+            if found:
+                num_found += 1
+                assert np.allclose(strategy, expected / expected.sum())
+            else:
+                assert expected is None and np.allclose(strategy, 1 / len(actions))
+            game.play(actions[min(np.searchsorted(np.cumsum(strategy), rng.random()), len(actions) - 1)])
+    return num_found
+
+async def bench(num_games, num_tables, filename):
+    with StrategyFile(filename) as policy:
+        service = PolicyService(policy)
+        address = os.path.join(os.path.dirname(filename), "policy.sock")
+        await service.start(address)
+        clients = [await PolicyClient(address).connect() for _ in range(CONNECTIONS)]
+        latencies = []
+        queries = []
+        start = time.perf_counter()
+        found = await asyncio.gather(*(
+            play_table(clients[table % CONNECTIONS], policy, np.random.default_rng(table),
+                       num_games // num_tables, latencies, queries)
+            for table in range(num_tables)))
+        elapsed = time.perf_counter() - start
+        played = service.report()
+        stats = await clients[0].stats()
+        assert stats["requests"] == len(latencies)
+        # The same queries again, all sent at once, for the service's own throughput
+        service.reset_stats()
+        start = time.perf_counter()
+        await asyncio.gather(*(clients[index % CONNECTIONS].strategy(infoSet, num_actions)
+                               for index, (infoSet, num_actions) in enumerate(queries)))
+        replay_elapsed = time.perf_counter() - start
+        replay = service.report()
+        for client in clients:
+            await client.close()
+        await service.close()
+    latencies = np.array(latencies) * 1000
+    print(f"{num_tables} tables, {num_games // num_tables * num_tables} games, {len(latencies)} queries "
+          f"({sum(found)} found) in {elapsed:.2f} s: {len(latencies) / elapsed:.0f} queries/s")
+    print(f"client latency p50 {np.percentile(latencies, 50):.3f} ms, p99 {np.percentile(latencies, 99):.3f} ms")
+    print(f"service: {played}")
+    print(f"replayed at once in {replay_elapsed:.2f} s: {len(queries) / replay_elapsed:.0f} queries/s")
+    print(f"service: {replay}")
+
+def main(num_games, num_tables):
+    ai = GoStopAI()
+    random.seed(0)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        ai.train(200)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "simple.strategy")
+        ai.save_strategy(filename)
+        for tables in sorted({1, num_tables}):
+            asyncio.run(bench(num_games, tables, filename))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,87 @@
+# Trained nodeMap against its strategy file export for play: size, load time,
+# and drawing an action per lookup
+# Run from the repository root: python -m benchmarks.strategy_export [iterations]
+from go_stop_ai import GoStopAI
+from strategy_file import StrategyFile
+
+import contextlib
+import io
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+LOADS = 20
+DRAWS = 100000
+
+def nodeMap_action(nodeMap, infoSet, rng):
+    # As play_simplified_go_stop did: normalize a copy of strategySum, then search its cumulative sums
+    strategy = nodeMap[infoSet].get_average_strategy()
+    return int(np.searchsorted(np.cumsum(strategy), rng.random()))
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def bench(iterations):
+    ai = GoStopAI()
+    random.seed(0)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        ai.train(iterations)
+    keys = [infoSet for infoSet, node in ai.nodeMap.items() if len(node.strategySum)]
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_filename = os.path.join(directory, "simple")
+        strategy_filename = os.path.join(directory, "simple.strategy")
+        ai.save_nodeMap(pickle_filename)
+        ai.save_strategy(strategy_filename)
+        print(f"{iterations} iterations, {len(ai.nodeMap)} info sets")
+        print(f"pickled nodeMap {os.path.getsize(pickle_filename) / 1024:.0f} KiB, "
+              f"strategy file {os.path.getsize(strategy_filename) / 1024:.0f} KiB")
+
+        def load_pickle():
+            with open(pickle_filename, "rb") as f:
+                return pickle.load(f)
+
+        def load_strategy_file():
+            return StrategyFile(strategy_filename)
+
+        pickle_time, nodeMap = timed(load_pickle, LOADS)
+        file_time, strategies = timed(load_strategy_file, LOADS)
+        print(f"load: pickle {pickle_time * 1000:.2f} ms, strategy file {file_time * 1000:.3f} ms")
+        # Python heap allocated by a load; the strategy file's pages are the page cache's, shared
+        for name, load in (("pickle", load_pickle), ("strategy file", load_strategy_file)):
+            tracemalloc.start()
+            loaded = load()
+            print(f"heap after {name} load: {tracemalloc.get_traced_memory()[0] / 1024:.0f} KiB")
+            tracemalloc.stop()
+            del loaded
+
+        rng = random.Random(0)
+        infoSets = [keys[rng.randrange(len(keys))] for _ in range(DRAWS)]
+        start = time.perf_counter()
+        for infoSet in infoSets:
+            nodeMap_action(nodeMap, infoSet, rng)
+        nodeMap_time = (time.perf_counter() - start) / DRAWS
+        start = time.perf_counter()
+        for infoSet in infoSets:
+            strategies.sample(infoSet, rng)
+        file_time = (time.perf_counter() - start) / DRAWS
+        print(f"lookup and draw: nodeMap {nodeMap_time * 1e6:.2f} us, strategy file {file_time * 1e6:.2f} us")
+
+        # A mixed strategy far from uniform, drawn from DRAWS times
+        infoSet = max(keys, key=lambda key: strategies[key].min() * np.ptp(strategies[key]))
+        counts = np.bincount([strategies.sample(infoSet, rng) for _ in range(DRAWS)],
+                             minlength=len(strategies[infoSet]))
+        print(f"draws {np.round(counts / DRAWS, 4)} for strategy {np.round(strategies[infoSet], 4)}")
+        assert np.abs(counts / DRAWS - strategies[infoSet]).max() < 0.01
+        strategies.close()
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
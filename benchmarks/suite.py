@@ -0,0 +1,168 @@
+# Benchmarks of the engine, serialization and solver hot paths, with fixed seeds
+# Run from the repository root:
+#   python -m benchmarks.suite                      run, compare with benchmarks/baseline.json
+#   python -m benchmarks.suite --output run.json    also write the results
+#   python -m benchmarks.suite --save-baseline      make this run the baseline
+# Results are JSON: {"meta": {...}, "results": {name: {"value", "unit", "higher_is_better"}}}.
+# The comparison exits with status 1 when a result is worse than the baseline by more than --tolerance.
+from go_stop import GoStop
+from go_stop_ai import GoStopAI
+from simplified_go_stop import SimplifiedGoStop
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SEED = 0
+REPEATS = 5
+INFOSET_DEPTHS = (0, 8, 16, 24)
+
+def best_rate(function, count, repeat=REPEATS):
+    # Calls per second of the fastest of repeat runs, function does count calls per run
+    return count / min(timeit.repeat(function, number=1, repeat=repeat))
+
+def random_rollout(game):
+    while not game.terminal:
+        actions = game.actions()
+        if not actions:
+            break
+        game.play(random.choice(actions))
+    return game
+
+def states_at_depth(depth, num_states=50):
+    # States after depth random plays (fewer where the game ends first)
+    random.seed(SEED)
+    states = []
+    while len(states) < num_states:
+        game = GoStop()
+        for _ in range(depth):
+            actions = game.actions()
+            if not actions:
+                break
+            game.play(random.choice(actions))
+        states.append(game)
+    return states
+
+def bench_rollouts():
+    num_games = 100
+    def run():
+        random.seed(SEED)
+        for _ in range(num_games):
+            random_rollout(GoStop())
+    return best_rate(run, num_games, repeat=3), "games/s"
+
+def bench_serialize():
+    states = states_at_depth(6)
+    return best_rate(lambda: [GoStop.deserialize(game.serialize()) for game in states], len(states)), "round-trips/s"
+
+def bench_bytes():
+    states = states_at_depth(6)
+    return best_rate(lambda: [GoStop.from_bytes(game.to_bytes()) for game in states], len(states)), "round-trips/s"
+
+def bench_infoSet(depth):
+    states = states_at_depth(depth)
+    number = 200
+    return best_rate(lambda: [game.get_infoSet() for game in states for _ in range(number)],
+                     len(states) * number), "calls/s"
+
+def bench_update_score():
+    players = [player for game in states_at_depth(16) for player in (game.board.p1, game.board.p2)]
+    number = 50
+    return best_rate(lambda: [player.update_score() for player in players for _ in range(number)],
+                     len(players) * number), "calls/s"
+
+def train_cfr(iterations):
+    random.seed(SEED)
+    ai = GoStopAI()
+    for _ in range(iterations):
+        game = SimplifiedGoStop()
+        ai.cfr(1, game, 1, 1)
+        ai.cfr(2, game, 1, 1)
+    return ai
+
+def bench_cfr():
+    iterations = 100
+    start = time.perf_counter()
+    ai = train_cfr(iterations)
+    return ai.nodes_touched / (time.perf_counter() - start), "nodes/s"
+
+def bench_cfr_memory():
+    # Peak traced allocation during training, run apart from the timing since tracing slows it
+    tracemalloc.start()
+    train_cfr(100)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20, "MiB"
+
+def run_suite():
+    benches = [("rollouts", bench_rollouts, True),
+               ("serialize_round_trip", bench_serialize, True),
+               ("bytes_round_trip", bench_bytes, True)]
+    benches += [(f"get_infoSet_depth_{depth}", lambda depth=depth: bench_infoSet(depth), True)
+                for depth in INFOSET_DEPTHS]
+    benches += [("update_score", bench_update_score, True),
+                ("cfr_simplified", bench_cfr, True),
+                ("cfr_simplified_peak_memory", bench_cfr_memory, False)]
+    results = dict()
+    for name, bench, higher_is_better in benches:
+        value, unit = bench()
+        results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:>28}: {value:14.1f} {unit}")
+    meta = {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "platform": platform.platform(), "seed": SEED,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+def compare(run, baseline, tolerance):
+    # Prints each result relative to the baseline, returns the names that regressed
+    regressions = []
+    for name, result in run["results"].items():
+        if name not in baseline["results"]:
+            print(f"{name:>28}: no baseline, run with --save-baseline to add it")
+            continue
+        base = baseline["results"][name]["value"]
+        ratio = result["value"] / base if base else float("inf")
+        # > 1 is better
+        change = ratio if result["higher_is_better"] else 1 / ratio
+        regressed = change < 1 - tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>28}: {change:6.2f}x baseline{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="fraction a result may be worse than the baseline before it counts as a regression")
+    args = parser.parse_args()
+
+    run = run_suite()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to make one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"Against baseline from {baseline['meta']['time']} ({baseline['meta']['platform']})")
+    return 1 if compare(run, baseline, args.tolerance) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
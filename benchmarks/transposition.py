@@ -0,0 +1,58 @@
+# Work the utility transposition table saves in GoStopAI training on SimplifiedGoStop
+# Run from the repository root: python -m benchmarks.transposition [iterations]
+# The table only skips get_utility calls, so training is unchanged.
+from go_stop_ai import GoStopAI
+from simplified_go_stop import SimplifiedGoStop
+from transposition import TranspositionTable
+
+import contextlib
+import io
+import random
+import sys
+import time
+
+TABLE_SIZE = 2**16
+
+def count_positions(num_deals):
+    # Nodes of full deal trees and the distinct positions among them
+    num_nodes = num_positions = 0
+    for seed in range(num_deals):
+        game = SimplifiedGoStop(seed)
+        positions = set()
+
+        def walk():
+            nonlocal num_nodes
+            num_nodes += 1
+            positions.add(game.state_hash())
+            if game.terminal:
+                return
+            for action in game.actions():
+                undo_record = game.play(action)
+                walk()
+                game.undo(undo_record)
+
+        walk()
+        num_positions += len(positions)
+    return num_nodes, num_positions
+
+def bench(iterations):
+    num_nodes, num_positions = count_positions(100)
+    print(f"100 deal trees: {num_nodes} nodes, {num_positions} distinct positions")
+    configs = (
+        ("no tables", dict()),
+        ("utility table", dict(utility_table=TranspositionTable(TABLE_SIZE))),
+    )
+    for name, tables in configs:
+        ai = GoStopAI(**tables)
+        random.seed(0)
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            ai.train(iterations)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed:.2f} s, {len(ai.nodeMap)} info sets")
+        for line in output.getvalue().splitlines():
+            print(f"    {line}")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,240 @@
+# Best response values and exploitability of a trained policy.
+# The game is the one whose root chance event deals one of the given games,
+# all equally likely. Flips come from each game's deck ("deck"), or are chance
+# nodes over GoStop.chance_outcomes() ("enumerate"), so a player does not see
+# the deck order. Info sets group the positions of all deals a player cannot
+# tell apart, so with every deal given this is the full game's best response.
+# Enumerating every SimplifiedGoStop deal is far too slow in Python; a sample
+# of deals gives the exact values for the sampled game, and the fewer deals
+# share an info set the closer the best response is to one that sees the deal.
+# Random deals hardly ever share one. from_center takes all deals with one
+# center instead, so each player's info sets span the other's possible hands.
+#
+#   evaluation = BestResponse.from_center()
+#   evaluation.exploitability(ai.nodeMap)
+#   ai.train(10000, evaluation=evaluation, evaluate_every=1000)
+#
+# The tree is walked once when BestResponse is made. Each evaluation then looks
+# up the policy's average strategy once per info set and does a numpy pass per
+# tree level: opponent and chance reach down the tree, then values up it, the
+# best response taking at each of its info sets the action with the highest
+# reach weighted value summed over the info set's positions.
+from go_stop import GoStop
+from models.card_ids import card_id
+from node_store import NodeStore
+from simplified_go_stop import SimplifiedGoStop, DEAL_CARDS
+
+from typing import Dict, Iterable, List, Tuple
+
+import itertools
+import sys
+import numpy as np
+
+TERMINAL = 0
+CHANCE = 3
+FLIPS = ("deck", "enumerate")
+
+def average_strategies(policy, keys: Iterable[bytes], num_actions: Iterable[int]) -> np.ndarray:
+    # Average strategies of the info sets keys, concatenated, uniform where policy has none
+    # or has one with a different number of actions.
+    # policy is a NodeStore, a dict of GoStopNode, or anything whose get(key) returns
+    # probabilities (such as strategy_file.StrategyFile)
+    strategies = []
+    if isinstance(policy, NodeStore):
+        averages = policy.average_strategy()
+        for key, size in zip(keys, num_actions):
+            location = policy.index.get(key)
+            if location is not None and location[0] == size:
+                strategies.append(averages[size][location[1]])
+            else:
+                strategies.append(np.full(size, 1 / size))
+    else:
+        for key, size in zip(keys, num_actions):
+            strategy = policy.get(key)
+            if strategy is not None and hasattr(strategy, "get_average_strategy"):
+                strategy = strategy.get_average_strategy()
+            if strategy is None or len(strategy) != size:
+                strategy = np.full(size, 1 / size)
+            strategies.append(strategy)
+    return np.concatenate(strategies) if strategies else np.zeros(0)
+
+
+class BestResponse():
+    def __init__(self, games: Iterable[GoStop], flips: str = "enumerate"):
+        if flips not in FLIPS:
+            raise ValueError(f"Unknown flips {flips}, expected one of {FLIPS}")
+        self.flips = flips
+        # Per node: parent (-1 for roots), kind (TERMINAL, player number or CHANCE),
+        # info set (-1 unless a player's), action index or chance probability from the parent
+        parents: List[int] = []
+        kinds: List[int] = []
+        infoSets: List[int] = []
+        actions: List[int] = []
+        chance: List[float] = []
+        utilities: List[float] = []
+        depths: List[int] = []
+        self.keys: List[bytes] = []
+        self.num_actions: List[int] = []
+        infoSet_ids: Dict[Tuple[int, bytes], int] = dict()
+        infoSet_depths: List[int] = []
+
+        def add(parent, kind, action, probability, depth, utility=0.0, infoSet=-1):
+            parents.append(parent)
+            kinds.append(kind)
+            infoSets.append(infoSet)
+            actions.append(action)
+            chance.append(probability)
+            utilities.append(utility)
+            depths.append(depth)
+            return len(parents) - 1
+
+        def walk(game, parent, action, probability, depth):
+            if game.terminal:
+                add(parent, TERMINAL, action, probability, depth, game.get_utility(1))
+                return
+            game_actions = game.actions()
+            player_num = game.get_current_player_number()
+            if not game_actions:
+                # Dead end, worth 0 as in GoStopAI.cfr
+                add(parent, TERMINAL, action, probability, depth)
+                return
+            key = (player_num, game.get_infoSet())
+            infoSet = infoSet_ids.get(key)
+            if infoSet is None:
+                infoSet = infoSet_ids[key] = len(self.keys)
+                self.keys.append(key[1])
+                self.num_actions.append(len(game_actions))
+                infoSet_depths.append(depth)
+            elif infoSet_depths[infoSet] != depth:
+                raise ValueError("Positions of one info set at different depths")
+            node = add(parent, player_num, action, probability, depth, infoSet=infoSet)
+            for index, game_action in enumerate(game_actions):
+                if self.flips == "enumerate" and game_action.kind == "throw":
+                    chance_node = add(node, CHANCE, index, 1.0, depth + 1)
+                    for card, card_probability in game.chance_outcomes():
+                        undo_record = game.play(game_action, card)
+                        walk(game, chance_node, -1, card_probability, depth + 2)
+                        game.undo(undo_record)
+                else:
+                    undo_record = game.play(game_action)
+                    walk(game, node, index, 1.0, depth + 1)
+                    game.undo(undo_record)
+
+        games = [game.clone() for game in games]
+        for game in games:
+            walk(game, -1, -1, 1 / len(games), 0)
+
+        self.num_games = len(games)
+        self.parents = np.array(parents, dtype=np.int64)
+        self.kinds = np.array(kinds, dtype=np.int8)
+        self.infoSets = np.array(infoSets, dtype=np.int64)
+        self.utilities = np.array(utilities)
+        self.chance = np.array(chance)
+        depths = np.array(depths)
+        # Offset of each info set's first action in the concatenated strategies
+        self.offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(self.num_actions)
+        # Strategy entry of the edge into each node from a player's node, -1 for the others
+        actions = np.array(actions, dtype=np.int64)
+        parent_infoSets = np.where(self.parents >= 0, self.infoSets[self.parents], -1)
+        self.edges = np.where(parent_infoSets >= 0, self.offsets[parent_infoSets] + actions, -1)
+        self.edge_owners = np.where(self.parents >= 0, self.kinds[self.parents], CHANCE)
+        levels = [np.flatnonzero(depths == depth) for depth in range(depths.max() + 1)]
+        self.roots = levels[0]
+        self._levels = dict((player_num, [self._level(player_num, level) for level in reversed(levels[1:])])
+                            for player_num in (1, 2))
+
+    def _level(self, player_num: int, level: np.ndarray):
+        # Nodes of one tree level for player_num's best response: the ones averaged into their parent,
+        # and the ones of player_num's choices, with the strategy entries of the info sets they choose in
+        averaged = level[self.edge_owners[level] != player_num]
+        chosen = level[self.edge_owners[level] == player_num]
+        chosen_infoSets = self.infoSets[self.parents[chosen]]
+        infoSets = np.unique(chosen_infoSets)
+        sizes = self.offsets[infoSets + 1] - self.offsets[infoSets]
+        starts = np.zeros(len(infoSets), dtype=np.int64)
+        starts[1:] = np.cumsum(sizes)[:-1]
+        # Action index of every entry of infoSets' strategies
+        local = np.arange(sizes.sum()) - np.repeat(starts, sizes)
+        entries = np.repeat(self.offsets[infoSets], sizes) + local
+        return averaged, chosen, chosen_infoSets, infoSets, sizes, starts, local, entries
+
+    @staticmethod
+    def from_seeds(num_deals: int, seed: int = 0, game_class=SimplifiedGoStop, flips: str = "enumerate"):
+        # Deals of game_class from numpy Generators seeded with (seed, deal number)
+        return BestResponse([game_class((seed, index)) for index in range(num_deals)], flips)
+
+    @staticmethod
+    def from_center(seed: int = 0, flips: str = "deck"):
+        # Every SimplifiedGoStop deal with one center, picked by seed, and a deck order from seed each.
+        # Each player's info sets span all the hands the other can hold
+        rng = np.random.default_rng(seed)
+        cards = [card_id(card) for card in DEAL_CARDS]
+        while True:
+            center = list(rng.choice(cards, 2, replace=False))
+            if center[0] >> 2 != center[1] >> 2:
+                break
+        rest = [card for card in cards if card not in center]
+        games = []
+        for p1_hand in itertools.combinations(rest, 2):
+            left = [card for card in rest if card not in p1_hand]
+            for p2_hand in itertools.combinations(left, 3):
+                deck = [card for card in left if card not in p2_hand]
+                games.append(SimplifiedGoStop.from_deal(list(p1_hand) + list(p2_hand) + center
+                                                        + list(rng.permutation(deck))))
+        return BestResponse(games, flips)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def values(self, policy) -> Tuple[float, float]:
+        # Expected value of each player's best response against policy's other player
+        strategies = average_strategies(policy, self.keys, self.num_actions)
+        return self._best_response(1, strategies)[0], self._best_response(2, strategies)[0]
+
+    def exploitability(self, policy) -> float:
+        # Zero sum, so the best response values sum to the NashConv; its mean over the players
+        return sum(self.values(policy)) / 2
+
+    def _best_response(self, player_num: int, strategies: np.ndarray) -> Tuple[float, np.ndarray]:
+        # Value of player_num's best response and its action in each info set (-1 in the opponent's)
+        parents = self.parents
+        # Weight of each edge in the opponent and chance reach, and in the value of its parent
+        weights = np.where(self.edges >= 0, strategies[np.maximum(self.edges, 0)], self.chance)
+        reach_weights = np.where(self.edge_owners == player_num, 1.0, weights)
+
+        reach = np.empty(len(parents))
+        reach[self.roots] = reach_weights[self.roots]
+        for level in reversed(self._levels[player_num]):
+            nodes = np.concatenate(level[:2])
+            reach[nodes] = reach[parents[nodes]] * reach_weights[nodes]
+
+        values = np.where(self.kinds == TERMINAL, self.utilities if player_num == 1 else -self.utilities, 0.0)
+        best_actions = np.full(len(self.keys), -1, dtype=np.int64)
+        for averaged, chosen, chosen_infoSets, infoSets, sizes, starts, local, entries in self._levels[player_num]:
+            np.add.at(values, parents[averaged], weights[averaged] * values[averaged])
+            if not len(chosen):
+                continue
+            # Value of each action summed over the info set's positions, weighted by reach
+            action_values = np.zeros(len(strategies))
+            np.add.at(action_values, self.edges[chosen], reach[parents[chosen]] * values[chosen])
+            action_values = action_values[entries]
+            best = np.repeat(np.maximum.reduceat(action_values, starts), sizes)
+            # First of the best actions
+            best_actions[infoSets] = np.minimum.reduceat(np.where(action_values >= best, local, len(local)), starts)
+            taken = self.edges[chosen] == self.offsets[chosen_infoSets] + best_actions[chosen_infoSets]
+            values[parents[chosen[taken]]] = values[chosen[taken]]
+        return float(np.dot(self.chance[self.roots], values[self.roots])), best_actions
+
+
+if __name__ == "__main__":
+    # python best_response.py saved_Nodemaps/simple.strategy       every deal with one center
+    # python best_response.py saved_Nodemaps/simple.strategy 200   200 random deals
+    from strategy_file import StrategyFile
+
+    evaluation = BestResponse.from_seeds(int(sys.argv[2])) if len(sys.argv) > 2 else BestResponse.from_center()
+    with StrategyFile(sys.argv[1]) as policy:
+        p1_value, p2_value = evaluation.values(policy)
+    print(f"{evaluation.num_games} deals, {len(evaluation)} nodes, {len(evaluation.keys)} info sets")
+    print(f"Best response values: player one {p1_value:.4f}, player two {p2_value:.4f}")
+    print(f"Exploitability: {(p1_value + p2_value) / 2:.4f}")
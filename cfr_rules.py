@@ -0,0 +1,144 @@
+from node_store import GoStopNode, NodeStore
+
+import math
+import numpy as np
+
+# Update rules for GoStopAI.train. cfr accumulates regrets and strategy sums the
+# same way for every rule; a rule weights the strategy sum contributions of an
+# iteration and rescales the table between traversals and iterations.
+# Iterations are numbered from 1.
+#
+# Rescaling is lazy: a rule keeps a clock, and touch brings a row up to date
+# (from its stamp, see NodeGroup.stamps) when GoStopAI reaches its info set,
+# before reading or updating it. Rows not touched lag behind, which regret
+# matching and average strategies cannot see as they normalize each row.
+# settle brings every row up to date once training is done.
+
+class UpdateRule():
+    # Vanilla CFR: regrets and strategy sums accumulate unweighted
+    name = "vanilla"
+
+    def strategy_weight(self, iteration: int) -> float:
+        return 1
+
+    def touch(self, node: GoStopNode):
+        # Before node's rows are read or updated
+        pass
+
+    def after_traversal(self, nodeMap: NodeStore, iteration: int):
+        # After each player's traversal of an iteration
+        pass
+
+    def after_iteration(self, nodeMap: NodeStore, iteration: int):
+        pass
+
+    def settle(self, nodeMap: NodeStore):
+        # Every row up to date, at the end of training
+        pass
+
+    def __repr__(self):
+        return self.name
+
+
+class CFRPlus(UpdateRule):
+    # Regrets floored at zero after every traversal (the traversals alternate between
+    # players), strategy sums weighted by the iteration number less delay.
+    # Regrets only change at rows touched in a traversal, so a row is floored at its
+    # first touch in a later traversal
+    name = "cfr+"
+
+    def __init__(self, delay: int = 0):
+        self.delay = delay
+        # Traversal count, from 1 so settled rows (stamp 0) are floored at their next touch
+        self._traversal = 1
+
+    def strategy_weight(self, iteration: int) -> float:
+        return max(iteration - self.delay, 0)
+
+    def touch(self, node: GoStopNode):
+        stamps = node.group.stamps
+        if stamps[node.row] != self._traversal:
+            regretSum = node.regretSum
+            np.maximum(regretSum, 0, out=regretSum)
+            stamps[node.row] = self._traversal
+
+    def after_traversal(self, nodeMap: NodeStore, iteration: int):
+        self._traversal += 1
+
+    def settle(self, nodeMap: NodeStore):
+        nodeMap.floor_regrets()
+
+    def __repr__(self):
+        return f"{self.name}(delay={self.delay})"
+
+
+class DiscountedCFR(UpdateRule):
+    # After iteration t, positive regrets are scaled by t^alpha / (t^alpha + 1), negative
+    # regrets by t^beta / (t^beta + 1) and strategy sums by (t / (t + 1))^gamma.
+    # The factors are positive, so regrets keep their sign and a row stamped at step s
+    # catches up by the products of the factors of the steps since, kept as sums of logs
+    name = "discounted"
+
+    def __init__(self, alpha: float = 1.5, beta: float = 0, gamma: float = 2):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self._reset()
+
+    def _reset(self):
+        # Logs of the products of the factors of the first k iterations since the last settle, for each k
+        self._positive = [0.0]
+        self._negative = [0.0]
+        self._strategy = [0.0]
+
+    def touch(self, node: GoStopNode):
+        stamps = node.group.stamps
+        stamp = stamps[node.row]
+        step = len(self._positive) - 1
+        if stamp != step:
+            regretSum = node.regretSum
+            positive = math.exp(self._positive[-1] - self._positive[stamp])
+            negative = math.exp(self._negative[-1] - self._negative[stamp])
+            regretSum *= np.where(regretSum > 0, positive, negative)
+            node.strategySum *= math.exp(self._strategy[-1] - self._strategy[stamp])
+            stamps[node.row] = step
+
+    def after_iteration(self, nodeMap: NodeStore, iteration: int):
+        positive = iteration ** self.alpha
+        negative = iteration ** self.beta
+        self._positive.append(self._positive[-1] + math.log(positive / (positive + 1)))
+        self._negative.append(self._negative[-1] + math.log(negative / (negative + 1)))
+        self._strategy.append(self._strategy[-1] + self.gamma * math.log(iteration / (iteration + 1)))
+
+    def settle(self, nodeMap: NodeStore):
+        def since(logs):
+            logs = np.array(logs)
+            return np.exp(logs[-1] - logs)
+
+        nodeMap.discount(since(self._positive), since(self._negative), since(self._strategy))
+        self._reset()
+
+    def __repr__(self):
+        return f"{self.name}(alpha={self.alpha}, beta={self.beta}, gamma={self.gamma})"
+
+
+class LinearCFR(DiscountedCFR):
+    # Regrets and strategy sums of iteration t weighted by t
+    name = "linear"
+
+    def __init__(self):
+        super().__init__(alpha=1, beta=1, gamma=1)
+
+    def __repr__(self):
+        return self.name
+
+
+RULES = dict((rule.name, rule) for rule in (UpdateRule, CFRPlus, DiscountedCFR, LinearCFR))
+
+def get_rule(rule) -> UpdateRule:
+    # Rule instance, or the name of a rule with its default parameters
+    if isinstance(rule, UpdateRule):
+        return rule
+    if rule not in RULES:
+        raise ValueError(f"Unknown update rule {rule}, expected one of {tuple(RULES)}")
+    return RULES[rule]()
@@ -0,0 +1,85 @@
+# Valid GoStop deals in bulk, for training and evaluation workers.
+# A deal is a row of 48 card ids (uint8, see models.card_ids) in the order
+# Deck.deal deals them: player one's hand, player two's hand, the center
+# cards, then the deck, flipped from the end. Deals with four cards of a month
+# in a hand or the center are rejected, as Board rejects them.
+#
+#   stream = DealStream(seed)
+#   deals = stream.take(1000000)         (1000000, 48) uint8 array
+#   game = GoStop.from_deal(next(stream))
+#
+# FastGoStop.from_deal and BatchGoStop(deals=...) start games from deals too.
+from models.card_ids import NUM_CARDS
+
+from typing import Union
+
+import numpy as np
+
+NUM_MONTHS = 12
+# (start, end) of each dealt part
+DEALT_PARTS = ((0, 10), (10, 20), (20, 28))
+NUM_DEALT = DEALT_PARTS[-1][1]
+
+_PART_OF_POSITION = np.concatenate([np.full(end - start, part) for part, (start, end) in enumerate(DEALT_PARTS)])
+
+def four_of_a_month(deals: np.ndarray) -> np.ndarray:
+    # (num_deals,) True where a hand or the center has all four cards of a month
+    num_deals = len(deals)
+    # Count months per (deal, part) in a single bincount
+    bins = ((np.arange(num_deals)[:, None] * len(DEALT_PARTS) + _PART_OF_POSITION) * NUM_MONTHS
+            + (deals[:, :NUM_DEALT] >> 2))
+    counts = np.bincount(bins.ravel(), minlength=num_deals * len(DEALT_PARTS) * NUM_MONTHS)
+    return (counts.reshape(num_deals, -1) == 4).any(axis=1)
+
+def random_deals(num_deals: int, rng: np.random.Generator) -> np.ndarray:
+    # num_deals uniformly random valid deals
+    deals = np.empty((0, NUM_CARDS), dtype=np.uint8)
+    while len(deals) < num_deals:
+        # Orders of uniform random keys are uniform permutations
+        drawn = np.argsort(rng.random((num_deals - len(deals), NUM_CARDS)), axis=1).astype(np.uint8)
+        deals = np.concatenate([deals, drawn[~four_of_a_month(drawn)]])
+    return deals
+
+
+class DealStream():
+    """Endless stream of valid deals from one seed or numpy Generator.
+
+    take(n) returns the next n deals as one array, iterating yields them one
+    at a time from batches of batch_size.
+    """
+
+    def __init__(self, rng: Union[None, int, np.random.Generator] = None, batch_size: int = 4096):
+        self.rng = np.random.default_rng(rng)
+        self.batch_size = batch_size
+        self._buffer = np.empty((0, NUM_CARDS), dtype=np.uint8)
+        self._position = 0
+
+    def take(self, num_deals: int) -> np.ndarray:
+        buffered = self._buffer[self._position:self._position + num_deals]
+        self._position += len(buffered)
+        if len(buffered) == num_deals:
+            return buffered
+        return np.concatenate([buffered, random_deals(num_deals - len(buffered), self.rng)])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> np.ndarray:
+        if self._position == len(self._buffer):
+            self._buffer = random_deals(self.batch_size, self.rng)
+            self._position = 0
+        self._position += 1
+        return self._buffer[self._position - 1]
+
+
+if __name__ == "__main__":
+    # Deals per second and the rejected fraction
+    import time
+
+    rng = np.random.default_rng(0)
+    num_deals = 1000000
+    start = time.perf_counter()
+    deals = DealStream(rng).take(num_deals)
+    elapsed = time.perf_counter() - start
+    rejected = four_of_a_month(np.argsort(rng.random((num_deals, NUM_CARDS)), axis=1).astype(np.uint8)).mean()
+    print(f"{num_deals} deals in {elapsed:.2f} s ({num_deals / elapsed:.0f} deals/s), {rejected:.4f} of draws rejected")
@@ -0,0 +1,456 @@
+from go_stop import GoStop
+from models.action import (Action,
+                           GO_CODE,
+                           FLIP_CODE,
+                           SELECT_MATCH_CODE,
+                           SELECT_MATCHES_CODE)
+from models.card_ids import (NUM_CARDS,
+                             MONTH_MASKS,
+                             SWITCH_CARD_MASK,
+                             BRIGHT_MASK,
+                             ANIMAL_MASK,
+                             RIBBON_MASK,
+                             SINGLE_JUNK_MASK,
+                             DOUBLE_JUNK_MASK,
+                             RED_RIBBON_MASK,
+                             PLANT_RIBBON_MASK,
+                             BLUE_RIBBON_MASK,
+                             DEC_BRIGHT_MASK,
+                             GODORI_MASK,
+                             card_id,
+                             mask_of,
+                             mask_of_ids,
+                             ids_of,
+                             cards_of,
+                             card_from_id)
+from models.card_list import CardList
+from models.card import SwitchCard
+from models.constants import Month, Type
+from models.board import Board
+from models.center_field import CenterField
+from models.deck import Deck, make_rng
+from models.player import Player
+from models.flags import Flags
+
+from typing import List, Tuple, Union
+
+import random
+
+import numpy as np
+
+# Unshuffled order of a fresh Deck, which a deal shuffles the same way Board does
+_DEAL_ORDER = bytes(card_id(card) for card in Deck().deck)
+
+
+def bright_points(captured: int) -> int:
+    num_bright = (captured & BRIGHT_MASK).bit_count()
+    if num_bright < 3:
+        return 0
+    if num_bright == 3 and captured & DEC_BRIGHT_MASK:
+        return 2
+    if num_bright == 5:
+        return 15
+    return num_bright
+
+def animal_points(captured: int, switch_junk: bool) -> int:
+    points = 0
+    num_animal = (captured & ANIMAL_MASK).bit_count()
+    if not switch_junk and captured & SWITCH_CARD_MASK:
+        num_animal += 1
+    if num_animal >= 5:
+        points += num_animal - 4
+    if captured & GODORI_MASK == GODORI_MASK:
+        points += 5
+    return points
+
+def ribbon_points(captured: int) -> int:
+    points = 0
+    num_ribbon = (captured & RIBBON_MASK).bit_count()
+    if num_ribbon >= 5:
+        points += num_ribbon - 4
+    for flag_mask in (RED_RIBBON_MASK, PLANT_RIBBON_MASK, BLUE_RIBBON_MASK):
+        if captured & flag_mask == flag_mask:
+            points += 3
+    return points
+
+def num_junk(captured: int, switch_junk: bool) -> int:
+    total = (captured & SINGLE_JUNK_MASK).bit_count() + 2 * (captured & DOUBLE_JUNK_MASK).bit_count()
+    if switch_junk and captured & SWITCH_CARD_MASK:
+        total += 2
+    return total
+
+def junk_points(captured: int, switch_junk: bool) -> int:
+    total = num_junk(captured, switch_junk)
+    if total >= 10:
+        return total - 9
+    return 0
+
+def calculate_score(captured: int, switch_junk: bool) -> int:
+    return (bright_points(captured) + animal_points(captured, switch_junk)
+            + ribbon_points(captured) + junk_points(captured, switch_junk))
+
+def four_of_a_month(cards: int) -> bool:
+    return any(cards & month_mask == month_mask for month_mask in MONTH_MASKS)
+
+
+class FastGoStop():
+    """GoStop on integer card ids.
+
+    Hands, captured piles and the center field are 48 bit masks (see
+    models.card_ids), the deck is a bytearray of ids popped from the end and
+    actions are the integer codes of Action.encode. Plays by the same rules as
+    GoStop, and from_game/to_game convert between the two engines.
+    """
+
+    def __init__(self, rng: Union[None, int, np.random.Generator] = None):
+        # Shuffles like Board, so the same seed (or global random state) deals the same game
+        rng = make_rng(rng)
+        while True:
+            deck = bytearray(_DEAL_ORDER)
+            if rng is None:
+                random.shuffle(deck)
+            else:
+                deck = bytearray(deck[i] for i in rng.permutation(NUM_CARDS))
+            if not self._deal(deck):
+                break
+
+    @classmethod
+    def from_deal(cls, deal) -> "FastGoStop":
+        # Game from one deal of deals.py, four of a month is not checked
+        fast_game = cls.__new__(cls)
+        fast_game._deal(bytearray(bytes(deal)))
+        return fast_game
+
+    def _deal(self, deck: bytearray) -> bool:
+        # Deals deck in Deck.deal order, True if a hand or the center has four of a month
+        p1_hand = mask_of_ids(deck[:10])
+        p2_hand = mask_of_ids(deck[10:20])
+        center = mask_of_ids(deck[20:28])
+        del deck[:28]
+        self.deck = deck
+        self.hands = [p1_hand, p2_hand]
+        self.captured = [0, 0]
+        self.center = center
+        self.curr = 0 # index of current player, player number - 1
+        self.scores = [0, 0]
+        self.num_go = [0, 0]
+        self.num_ssa = [0, 0]
+        # Type of the switch card, only ever changed once it is captured
+        self.switch_junk = False
+        self.go = False
+        self.select = False
+        # (og card, matches mask) or (flipped card, matches mask, thrown card, matches mask)
+        self.select_match: Union[None, Tuple[int, int], Tuple[int, int, int, int]] = None
+        self.terminal = False
+        self.curr_go_score = 0
+        self.winner: Union[None, int] = None
+        # (player_num, action code)
+        self.history: List[Tuple[int, int]] = []
+        return four_of_a_month(p1_hand) or four_of_a_month(p2_hand) or four_of_a_month(center)
+
+    def is_terminal(self):
+        if self.actions() == []:
+            return True
+        return False
+
+    def actions(self) -> List[int]:
+        if self.terminal:
+            return []
+        if self.go:
+            return [GO_CODE, GO_CODE + 1]
+        if self.select:
+            if len(self.select_match) == 2:
+                og_card, matches = self.select_match
+                base = SELECT_MATCH_CODE + og_card * NUM_CARDS
+                return [base + match for match in ids_of(matches)]
+            flipped_card, first_matches, thrown_card, second_matches = self.select_match
+            base = (flipped_card * NUM_CARDS + thrown_card) * NUM_CARDS
+            second_ids = ids_of(second_matches)
+            return [SELECT_MATCHES_CODE + (base + match_one) * NUM_CARDS + match_two
+                    for match_one in ids_of(first_matches) for match_two in second_ids]
+        return ids_of(self.hands[self.curr])
+
+    def play(self, action: Union[int, Action]):
+        if isinstance(action, Action):
+            action = action.encode()
+        self.history.append((self.curr + 1, action))
+        if action < GO_CODE:
+            self._throw_and_flip(action)
+        elif action < FLIP_CODE:
+            self.go = False
+            if action - GO_CODE:
+                self._go()
+            else:
+                self._stop()
+        elif action < SELECT_MATCHES_CODE:
+            og_card, match = divmod(action - SELECT_MATCH_CODE, NUM_CARDS)
+            self._select((1 << og_card) | (1 << match), 1 << match)
+        else:
+            code, match_two = divmod(action - SELECT_MATCHES_CODE, NUM_CARDS)
+            code, match_one = divmod(code, NUM_CARDS)
+            og_one, og_two = divmod(code, NUM_CARDS)
+            matches = (1 << match_one) | (1 << match_two)
+            self._select((1 << og_one) | (1 << og_two) | matches, matches)
+
+    def _throw_and_flip(self, thrown_card: int):
+        curr = self.curr
+        num_steal_junk = 0
+        thrown_bit = 1 << thrown_card
+        month_mask = MONTH_MASKS[thrown_card >> 2]
+
+        self.hands[curr] &= ~thrown_bit
+        self.center |= thrown_bit
+        matched_cards = self.center & month_mask
+
+        if matched_cards == month_mask:
+            num_steal_junk += 1
+            self.center &= ~month_mask
+            self.captured[curr] |= matched_cards
+            num_steal_junk += self._flip(None)
+        else:
+            num_steal_junk += self._flip(thrown_card)
+
+        # Sweep
+        if self.center == 0 and self.hands[curr] != 0:
+            num_steal_junk += 1
+
+        for _ in range(num_steal_junk):
+            self._take_junk(curr)
+
+        if not self.select:
+            self._check_go()
+
+    def _flip(self, thrown_card: Union[None, int]) -> int:
+        curr = self.curr
+        num_steal_junk = 0
+        thrown_match_select = False
+        flip_match_select = False
+
+        flipped_card = self.deck.pop()
+        flipped_bit = 1 << flipped_card
+        flip_month_mask = MONTH_MASKS[flipped_card >> 2]
+        flip_matched_cards = self.center & flip_month_mask
+        self.history.append((curr + 1, FLIP_CODE + flipped_card))
+
+        if thrown_card is not None:
+            thrown_bit = 1 << thrown_card
+            thrown_month_mask = MONTH_MASKS[thrown_card >> 2]
+            if thrown_month_mask == flip_month_mask:
+                num_matched = flip_matched_cards.bit_count()
+                if num_matched == 3:
+                    num_steal_junk += 1
+                    self.center &= ~flip_month_mask
+                    self.captured[curr] |= flip_matched_cards | flipped_bit
+                elif num_matched == 2:
+                    # ssa
+                    self.num_ssa[curr] += 1
+                    self.center |= flipped_bit
+                elif num_matched == 1:
+                    # ghost
+                    num_steal_junk += 1
+                    self.center &= ~thrown_bit
+                    self.captured[curr] |= thrown_bit | flipped_bit
+                return num_steal_junk
+            thrown_matched_cards = self.center & thrown_month_mask # includes thrown card
+            num_matched = thrown_matched_cards.bit_count()
+            if num_matched == 3:
+                thrown_match_select = True
+            elif num_matched == 2:
+                self.center &= ~thrown_month_mask
+                self.captured[curr] |= thrown_matched_cards
+
+        num_matched = flip_matched_cards.bit_count()
+        if num_matched == 3:
+            num_steal_junk += 1
+            self.center &= ~flip_month_mask
+            self.captured[curr] |= flip_matched_cards | flipped_bit
+        elif num_matched == 2:
+            flip_match_select = True
+        elif num_matched == 1:
+            self.center &= ~flip_month_mask
+            self.captured[curr] |= flip_matched_cards | flipped_bit
+        else:
+            self.center |= flipped_bit
+
+        if thrown_match_select and flip_match_select:
+            self.select = True
+            self.select_match = (flipped_card, flip_matched_cards, thrown_card, thrown_matched_cards & ~thrown_bit)
+            self.center &= ~thrown_bit
+        elif thrown_match_select:
+            self.select = True
+            self.select_match = (thrown_card, thrown_matched_cards & ~thrown_bit)
+            self.center &= ~thrown_bit
+        elif flip_match_select:
+            self.select = True
+            self.select_match = (flipped_card, flip_matched_cards)
+
+        return num_steal_junk
+
+    def _select(self, captured: int, matches: int):
+        self.select = False
+        self.select_match = None
+        self.center &= ~matches
+        self.captured[self.curr] |= captured
+        if self.hands[self.curr]:
+            self._check_go()
+        else:
+            self.curr ^= 1
+
+    def _check_go(self):
+        # Go check after a capture, switches turns if current player cannot go
+        curr = self.curr
+        if self.num_go[curr] == 0:
+            self.update_score(curr)
+            if self.scores[curr] >= 7:
+                if self.num_go[curr ^ 1] > 0 or self.hands[curr] == 0:
+                    self.terminal = True
+                    self.winner = curr + 1
+                    return
+                self.go = True
+        else:
+            old_score = self.scores[curr]
+            self.update_score(curr)
+            if self.scores[curr] > old_score:
+                if self.hands[curr] == 0:
+                    self.terminal = True
+                    self.winner = curr + 1
+                    return
+                self.go = True
+        if not self.go:
+            self.curr ^= 1
+
+    def _take_junk(self, curr: int):
+        opponent_captured = self.captured[curr ^ 1]
+        junk_cards = opponent_captured & SINGLE_JUNK_MASK
+        if not junk_cards:
+            junk_cards = opponent_captured & DOUBLE_JUNK_MASK
+            if self.switch_junk:
+                junk_cards |= opponent_captured & SWITCH_CARD_MASK
+        if junk_cards:
+            card = junk_cards & -junk_cards
+            self.captured[curr ^ 1] ^= card
+            self.captured[curr] |= card
+
+    def _go(self):
+        curr = self.curr
+        self.num_go[curr] += 1
+        self.update_score(curr)
+        self.curr_go_score = self.scores[curr]
+        self.curr ^= 1
+
+    def _stop(self):
+        self.terminal = True
+        self.winner = self.curr + 1
+        self.update_score(self.curr)
+
+    def update_score(self, player: int):
+        captured = self.captured[player]
+        if captured & SWITCH_CARD_MASK:
+            # Maximize for either type
+            animal_score = calculate_score(captured, False)
+            junk_score = calculate_score(captured, True)
+            self.switch_junk = not junk_score < animal_score
+            self.scores[player] = max(animal_score, junk_score)
+        else:
+            self.scores[player] = calculate_score(captured, self.switch_junk)
+
+    def calculate_winnings(self):
+        if not self.winner:
+            return (0, 0)
+        winner = self.winner - 1
+        self.update_score(winner)
+        winnings = self.scores[winner]
+        winner_captured = self.captured[winner]
+        loser_captured = self.captured[winner ^ 1]
+
+        # Go - Penalties
+        num_go = self.num_go[winner]
+        if num_go < 3:
+            winnings += num_go
+        else:
+            winnings = winnings * pow(2, num_go - 2)
+
+        # Pi-bak
+        if junk_points(winner_captured, self.switch_junk) > 0:
+            if num_junk(loser_captured, self.switch_junk) < 6:
+                winnings *= 2
+
+        # Guang-bak
+        if bright_points(winner_captured) > 0:
+            if loser_captured & BRIGHT_MASK == 0:
+                winnings *= 2
+
+        if winner == 0:
+            return (winnings, -winnings)
+        return (-winnings, winnings)
+
+    def get_utility(self, player_num):
+        player_one_utility, player_two_utility = self.calculate_winnings()
+        if player_num == 1:
+            return player_one_utility
+        else:
+            return player_two_utility
+
+    def get_current_player_number(self):
+        return self.curr + 1
+
+    @staticmethod
+    def from_game(game: GoStop):
+        fast_game = FastGoStop.__new__(FastGoStop)
+        board = game.board
+        fast_game.deck = bytearray(card_id(card) for card in board.deck.deck)
+        fast_game.hands = [mask_of(board.p1.hand), mask_of(board.p2.hand)]
+        fast_game.captured = [mask_of(board.p1.captured), mask_of(board.p2.captured)]
+        fast_game.center = 0
+        for cards in board.center_cards.values():
+            fast_game.center |= mask_of(cards)
+        fast_game.curr = board.curr_player.number - 1
+        fast_game.scores = [board.p1.score, board.p2.score]
+        fast_game.num_go = [board.p1.num_go, board.p2.num_go]
+        fast_game.num_ssa = [board.p1.num_ssa, board.p2.num_ssa]
+        fast_game.switch_junk = any(
+            isinstance(card, SwitchCard) and card.type == Type.JUNK
+            for card in board.p1.captured + board.p2.captured
+        )
+        fast_game.go = game.flags.go
+        fast_game.select = game.flags.select_match
+        fast_game.select_match = None
+        if game.select_match:
+            fast_game.select_match = tuple(
+                mask_of(item) if isinstance(item, list) else card_id(item)
+                for item in game.select_match
+            )
+        fast_game.terminal = game.terminal
+        fast_game.curr_go_score = game.curr_go_score
+        fast_game.winner = game.winner
+        fast_game.history = [(player_num, action.encode()) for player_num, action in game.history]
+        return fast_game
+
+    def to_game(self) -> GoStop:
+        board = Board.empty()
+        board.deck.deck = CardList(card_from_id(card) for card in self.deck)
+
+        switch_type = Type.JUNK if self.switch_junk else Type.ANIMAL
+        players = []
+        for index in range(2):
+            player = Player(cards_of(self.hands[index]), index + 1)
+            player.captured = cards_of(self.captured[index], switch_type)
+            player.score = self.scores[index]
+            player.num_go = self.num_go[index]
+            player.num_ssa = self.num_ssa[index]
+            players.append(player)
+        board.p1, board.p2 = players
+        board.curr_player = players[self.curr]
+        board.center_cards = CenterField(cards_of(self.center))
+
+        flags = Flags()
+        flags.go = self.go
+        flags.select_match = self.select
+        select_match = None
+        if self.select_match:
+            select_match = tuple(
+                cards_of(item) if index % 2 else card_from_id(item)
+                for index, item in enumerate(self.select_match)
+            )
+        history = [(player_num, Action.decode(code)) for player_num, code in self.history]
+        return GoStop.from_parts(board, flags, select_match, self.terminal, self.curr_go_score, self.winner, history)
@@ -0,0 +1,260 @@
+# Append-only binary log of played games. A record is the game's deal and one
+# byte per history entry, so replaying it from the deal rebuilds any position.
+#
+# Layout, little endian:
+#   header   magic, version
+#   records  kind (uint8), deal size (uint8), number of entries (uint16),
+#            deal card ids (see models.card_ids), entries
+# A deal is in the order its game deals it (GoStop.from_deal or
+# SimplifiedGoStop.from_deal). An entry is the index of the played action in
+# game.actions(), or FLIP_ENTRY | card id for the ActionFlip that play adds.
+#
+# The offset of every record is appended to the index file (log filename +
+# ".idx", uint64 each) for random access to game n. Records written after the
+# index was last updated are found by scanning on open.
+from go_stop import GoStop
+from models.card import Card
+from models.card_ids import NUM_CARDS, card_id
+from simplified_go_stop import SimplifiedGoStop, DEAL_CARDS
+
+import functools
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from typing import Iterator, NamedTuple, Optional
+
+MAGIC = b"GOSTOPLG"
+VERSION = 1
+FLIP_ENTRY = 0x80
+_HEADER = struct.Struct("<8sI")
+_RECORD_HEADER = struct.Struct("<BBH")
+_OFFSET = struct.Struct("<Q")
+
+# Game classes by record kind
+GAME_CLASSES = (GoStop, SimplifiedGoStop)
+_DEAL_POOLS = (range(NUM_CARDS), [card_id(card) for card in DEAL_CARDS])
+# Cards dealt to player one, player two and the center, the rest go to the deck
+_DEAL_SIZES = ((10, 10, 8), (2, 3, 2))
+
+
+class GameRecord(NamedTuple):
+    kind: int
+    deal: bytes
+    entries: bytes
+
+    def pack(self) -> bytes:
+        return _RECORD_HEADER.pack(self.kind, len(self.deal), len(self.entries)) + self.deal + self.entries
+
+
+def initial_deal(game: GoStop) -> bytes:
+    # Deal game started from, worked back from its current state and history
+    history = game.history
+    flipped = [card_id(action.card) for _, action in history if action.kind == "flip"]
+    deck = [card_id(card) for card in game.board.deck.deck] + flipped[::-1]
+    hands = []
+    for player in (game.board.p1, game.board.p2):
+        thrown = [card_id(action.card) for player_num, action in history
+                  if action.kind == "throw" and player_num == player.number]
+        hands.append(sorted([card_id(card) for card in player.hand] + thrown))
+    dealt = set(deck).union(*hands)
+    center = [card for card in _DEAL_POOLS[_kind(game)] if card not in dealt]
+    return bytes(hands[0] + hands[1] + sorted(center) + deck)
+
+@functools.lru_cache(maxsize=4096)
+def _dealt(game_class, deal: bytes) -> GoStop:
+    # Info sets of a nodeMap share few deals, and dealing keys both players' views
+    return game_class.from_deal(deal)
+
+def _unordered(serialized):
+    # Serialized state or action with its card lists sorted, as cards sorted differently
+    # before card ids (the switch card went before the September junk)
+    if not isinstance(serialized, tuple):
+        return serialized
+    items = tuple(_unordered(item) for item in serialized)
+    return tuple(sorted(items)) if all(isinstance(item, str) for item in items) else items
+
+def migrate_infoSet(infoSet: tuple, game_class=SimplifiedGoStop) -> bytes:
+    # Rolling key (GoStop.get_infoSet) of an info set tuple (GoStop.get_infoSet_tuple of the
+    # player to play), the keys of nodeMaps saved before rolling keys. Works back a deal the
+    # player cannot tell from theirs, as initial_deal does, with the cards they never saw
+    # filling the opponent's hand and the deck, then replays the history on it.
+    # Raises ValueError if no game of game_class reaches infoSet
+    try:
+        board, _, _, _, _, _, history = infoSet
+        player_num = board[3]
+        hero = board[player_num - 1]
+        villain = board[2 - player_num]
+        kind = GAME_CLASSES.index(game_class)
+        ids = lambda cards: [card_id(Card.deserialize(card)) for card in cards]
+        thrown = ([], [])
+        flipped = []
+        for num, action in history:
+            if action[0] == "throw":
+                thrown[num - 1].extend(ids(action[1:]))
+            elif action[0] == "flip":
+                flipped.extend(ids(action[1:]))
+        seen = set(ids(hero[2]) + ids(villain[1]))
+        for _, cards in board[2]:
+            seen.update(ids(cards))
+    except (TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"{infoSet!r:.80} is not an info set tuple: {e}") from None
+
+    pool = _DEAL_POOLS[kind]
+    played = set(flipped).union(*thrown)
+    hands = [None, None]
+    hands[player_num - 1] = ids(hero[1]) + thrown[player_num - 1]
+    center = sorted(card for card in pool if card in seen and card not in played)
+    unseen = [card for card in pool if card not in played and card not in center
+              and card not in hands[player_num - 1]]
+    sizes = _DEAL_SIZES[kind]
+    fill = sizes[2 - player_num] - len(thrown[2 - player_num])
+    if len(hands[player_num - 1]) != sizes[player_num - 1] or len(center) != sizes[2] or fill < 0:
+        raise ValueError(f"{infoSet!r:.80} is not from a {game_class.__name__} deal")
+    hands[2 - player_num] = thrown[2 - player_num] + unseen[:fill]
+    deck = unseen[fill:] + flipped[::-1]
+
+    game = _dealt(game_class, bytes(sorted(hands[0]) + sorted(hands[1]) + center + deck)).clone()
+    for num, action in history:
+        if action[0] == "flip":
+            continue
+        action = _unordered(action)
+        legal = [legal for legal in game.actions() if _unordered(legal.serialize()) == action]
+        if not legal:
+            raise ValueError(f"{infoSet!r:.80} does not replay: {action} is not legal")
+        game.play(legal[0])
+    if _unordered(game.get_infoSet_tuple(player_num)) != _unordered(infoSet):
+        raise ValueError(f"{infoSet!r:.80} does not replay to the same info set")
+    return game.get_infoSet()
+
+def _kind(game: GoStop) -> int:
+    return 1 if isinstance(game, SimplifiedGoStop) else 0
+
+def encode_game(game: GoStop) -> GameRecord:
+    # Record of game, which must have been dealt and played from the start by play
+    kind = _kind(game)
+    deal = initial_deal(game)
+    replayed = GAME_CLASSES[kind].from_deal(deal)
+    entries = bytearray()
+    for _, action in game.history:
+        if action.kind == "flip":
+            entries.append(FLIP_ENTRY | card_id(action.card))
+            continue
+        entries.append(replayed.actions().index(action))
+        replayed.play(action)
+    return GameRecord(kind, deal, bytes(entries))
+
+def replay(record: GameRecord, stop: Optional[int] = None) -> GoStop:
+    # Game after replaying the plays that start before history entry stop (all by default).
+    # Raises ValueError if a flip differs from the record
+    game = GAME_CLASSES[record.kind].from_deal(record.deal)
+    history = game.history
+    for index, entry in enumerate(record.entries[:stop]):
+        if entry & FLIP_ENTRY:
+            if card_id(history[index][1].card) != entry & ~FLIP_ENTRY:
+                raise ValueError(f"Flip {index} of the record differs from the replay")
+            continue
+        game.play(game.actions()[entry])
+    return game
+
+
+class GameLogWriter():
+    def __init__(self, filename: str):
+        self._file = open(filename, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._index = open(filename + ".idx", "ab")
+
+    def append(self, game: GoStop):
+        self.write(encode_game(game))
+
+    def write(self, record: GameRecord):
+        self._index.write(_OFFSET.pack(self._file.tell()))
+        self._file.write(record.pack())
+
+    def flush(self):
+        # Records before the index, so an offset never points past the log
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameLog():
+    def __init__(self, filename: str):
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a game log")
+        if version != VERSION:
+            raise ValueError(f"{filename} has unsupported version {version}")
+        offsets = []
+        if os.path.exists(filename + ".idx"):
+            with open(filename + ".idx", "rb") as f:
+                index = f.read()
+            # An offset cut off by a crash is left out too
+            offsets = np.frombuffer(index, dtype="<u8", count=len(index) // _OFFSET.size).tolist()
+            # Drop offsets of records the log does not hold all of yet
+            while offsets and self._record_end(offsets[-1]) > len(self._mmap):
+                offsets.pop()
+        # Catch up on records the index is missing
+        offset = self._record_end(offsets[-1]) if offsets else _HEADER.size
+        while offset + _RECORD_HEADER.size <= len(self._mmap) and self._record_end(offset) <= len(self._mmap):
+            offsets.append(offset)
+            offset = self._record_end(offset)
+        self._offsets = offsets
+
+    def _record_end(self, offset: int) -> int:
+        _, deal_size, num_entries = _RECORD_HEADER.unpack_from(self._mmap, offset)
+        return offset + _RECORD_HEADER.size + deal_size + num_entries
+
+    def _record_at(self, offset: int) -> GameRecord:
+        kind, deal_size, num_entries = _RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + _RECORD_HEADER.size
+        return GameRecord(kind, self._mmap[start:start + deal_size],
+                          self._mmap[start + deal_size:start + deal_size + num_entries])
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, n: int) -> GameRecord:
+        return self._record_at(self._offsets[n])
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for offset in self._offsets:
+            yield self._record_at(offset)
+
+    def replay(self, n: int, stop: Optional[int] = None) -> GoStop:
+        return replay(self[n], stop)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # python game_log.py games.log       number of games and entries
+    # python game_log.py games.log 12    replay game 12 and show its final position
+    with GameLog(sys.argv[1]) as log:
+        if len(sys.argv) > 2:
+            log.replay(int(sys.argv[2])).display()
+        else:
+            print(f"{len(log)} games, {sum(len(record.entries) for record in log)} history entries")
@@ -2,18 +2,101 @@ from models.board import Board
 from models.flags import Flags
 from models.card import Card
 from models.card_list import CardList
+from models.center_field import CenterField
+from models.constants import Month, Type
+from models.card_ids import card_id, card_ids_of, card_from_id, cards_of, mask_of
+from models.deck import Deck
+from models.player import Player
+from models.zobrist import CARD_KEYS, HAND, CENTER, CAPTURED, DECK, HASH_MASK, cards_hash
 from models.action import (Action,
                            ActionGo,
                            ActionSelectMatch,
                            ActionSelectMatches,
                            ActionThrow, 
                            ActionFlip)
-from typing import List, Union, Tuple, cast, Optional
+from typing import List, Union, Tuple, cast, Optional, NamedTuple
+import functools
+import hashlib
+import struct
+
+import numpy as np
+
+INFOSET_KEY_SIZE = 16 
+
+def _roll_infoSet_key(key: bytes, player_num: int, action: Action) -> bytes: 
+    # Fold one (player_num, action) history entry into an info set key 
+    # Action codes are below 2**23, so code and player fit in 3 bytes 
+    code = action.encode() | (player_num - 1) << 23
+    return hashlib.blake2b(key + code.to_bytes(3, "little"), digest_size=INFOSET_KEY_SIZE).digest()
+
+# GoStop.to_bytes layout, little endian: magic, version, bits (go, select match, terminal, 
+# player two to play, player one's and player two's switch card captured as junk), winner 
+# (0 for none), select match size (0, 2 or 4), curr_go_score, then per player score, num_go, 
+# num_ssa, card masks (see models.card_ids) of the hands, captured cards and the center, select 
+# match cards and match masks, deck size, history size and the two info set keys. After it come 
+# the deck's card ids and a uint32 per history entry (action code | (player_num - 1) << 23) 
+STATE_MAGIC = b"GS"
+STATE_VERSION = 1
+_STATE = struct.Struct("<2sBBBBH2H2B2B5Q2B2QBH32s")
+
+@functools.lru_cache(maxsize=None)
+def _decode_action(code: int) -> Action: 
+    # Actions are never changed, so games restored by from_bytes share them 
+    return Action.decode(code)
+
+def _switch_junk(player) -> bool: 
+    switch_card = player.captured_switch_card
+    return switch_card is not None and switch_card.type == Type.JUNK
+
+class UndoRecord(NamedTuple): 
+    # State GoStop.play changes, for GoStop.undo 
+    history_len: int 
+    player_num: int 
+    thrown: Optional[Tuple[int, Card]] # (index in hand, card) 
+    center: Tuple[Tuple[Month, CardList], ...] # (month, copy of field) 
+    num_captured: Tuple[int, int] 
+    junk_taken: List[Tuple[Card, int]] # (card, index in opponent's captured) 
+    switch_cards: Tuple[Optional[Card], Optional[Card]] 
+    scores: Tuple[int, int] 
+    num_go: Tuple[int, int] 
+    num_ssa: Tuple[int, int] 
+    flags: tuple 
+    select_match: Optional[tuple] 
+    terminal: bool 
+    winner: Optional[int] 
+    curr_go_score: int 
+    actions: Optional[Tuple[Action, ...]] 
+    infoSet_keys: Tuple[bytes, bytes] 
+    zobrist: Optional[int] 
+    deck_swap: Optional[int] # deck index the flip was picked from, swapped with the top 
 
 class GoStop():
-    def __init__(self):
-        self.board = Board()
-        self.flags = Flags() 
+    def __init__(self, rng: Union[None, int, np.random.Generator] = None):
+        # Deal shuffled with rng (a seed or numpy Generator), the global random module if None 
+        self._set_parts(Board(rng))
+
+    @classmethod
+    def from_deal(cls, deal): 
+        # Game from one deal of deals.py (48 card ids in Deck.deal order) 
+        return cls.from_parts(Board.from_deal(deal))
+
+    @classmethod
+    def from_parts(cls, board: Board, flags: Optional[Flags] = None, select_match=None, terminal: bool = False, 
+                   curr_go_score: int = 0, winner: Optional[int] = None, 
+                   history: Optional[List[Tuple[int, "Action"]]] = None, 
+                   infoSet_keys: Optional[Tuple[bytes, bytes]] = None): 
+        # Game around an existing board, without dealing one first 
+        # Info set keys are recomputed from the position unless given 
+        game = cls.__new__(cls)
+        game._set_parts(board, flags, select_match, terminal, curr_go_score, winner, history, infoSet_keys)
+        return game
+
+    def _set_parts(self, board: Board, flags: Optional[Flags] = None, select_match=None, terminal: bool = False, 
+                   curr_go_score: int = 0, winner: Optional[int] = None, 
+                   history: Optional[List[Tuple[int, "Action"]]] = None, 
+                   infoSet_keys: Optional[Tuple[bytes, bytes]] = None): 
+        self.board = board
+        self.flags = flags if flags is not None else Flags() 
         self.select_match: Union[
             None, 
             Tuple[
@@ -26,19 +109,34 @@ class GoStop():
                 Card, # Card Flipped
                 CardList # Matches
             ]
-        ] = None
-        self.terminal = False
-        self.curr_go_score = 0 
-        self.winner: Union[None, int] = None
+        ] = select_match
+        self.terminal = terminal
+        self.curr_go_score = curr_go_score 
+        self.winner: Union[None, int] = winner
         # (player_num, action)
-        self.history : List[Tuple[int, Action]] = []
+        self.history : List[Tuple[int, Action]] = history if history is not None else []
+        # Legal actions, cleared by play and undo 
+        self._actions: Optional[Tuple[Action, ...]] = None
+        if infoSet_keys is None: 
+            self.reset_infoSet_keys()
+        else: 
+            self._infoSet_keys = infoSet_keys
+        # Card part of state_hash, computed on first use and then kept up to date by play. 
+        # Undo restores it as it was, so hash the root of a search before walking it 
+        self._zobrist: Optional[int] = None
     
     def is_terminal(self): 
-        if self.actions() == []:
+        if not self.actions():
             return True 
         return False
 
-    def actions(self) -> List[Action]: 
+    def actions(self) -> Tuple[Action, ...]: 
+        # Same tuple until the next play or undo, so an index keeps naming the same action 
+        if self._actions is None: 
+            self._actions = tuple(self._legal_actions())
+        return self._actions
+
+    def _legal_actions(self) -> List[Action]: 
 
         # Gives all possible actions given board state 
 
@@ -59,19 +157,26 @@ class GoStop():
             if len(self.select_match) == 2: 
                 og_card = self.select_match[0]
                 matches = self.select_match[1]
-                return [ActionSelectMatch(og_card, match) for match in matches]
+                return [ActionSelectMatch(og_card, match) for match in sorted(matches)]
             # Two match lists
             else: 
                 og_cards = (self.select_match[0], self.select_match[2])
                 first_matches = self.select_match[1]
                 second_matches = self.select_match[3]
-                return [ActionSelectMatches(og_cards, (match_one, match_two)) for match_one in first_matches
-                        for match_two in second_matches]
+                return [ActionSelectMatches(og_cards, (match_one, match_two)) for match_one in sorted(first_matches)
+                        for match_two in sorted(second_matches)]
                 
         # Otherwise, can throw card from hand 
         return [ActionThrow(card) for card in self.board.curr_player.hand]
     
-    def play(self, action: Action): 
+    def play(self, action: Action, flip: Optional[Card] = None) -> UndoRecord: 
+        # Returns record to restore the state before action with undo. 
+        # A throw flips the top card of the deck, or flip, one of the cards of chance_outcomes() 
+        deck_swap = None
+        if flip is not None: 
+            deck_swap = self._pick_flip(action, flip)
+        record = self._undo_record(action, deck_swap)
+        self._actions = None
         self.history.append((self.get_current_player_number(), action))
         if action.kind == "go":
             action = cast(ActionGo, action)
@@ -80,40 +185,245 @@ class GoStop():
 
             if action.option: 
                 self._go()
-                return
-
-            self._stop() 
-            return 
+            else: 
+                self._stop() 
         
-        if action.kind == "throw": 
+        elif action.kind == "throw": 
             action = cast(ActionThrow, action)
-            self._throw_and_flip(action.card)
-            return
+            self._throw_and_flip(action.card, record.junk_taken)
         
-        if action.kind == "select match":
+        elif action.kind == "select match":
             action = cast(ActionSelectMatch, action)
             self._select_match(action.og_card, action.match)
-            return 
         
-        if action.kind == "select matches": 
+        elif action.kind == "select matches": 
             action = cast(ActionSelectMatches, action)
             self._select_matches(action.og_cards, action.matches)
-            return 
+
+        # Fold the action and any flip into both players' info set keys 
+        p1_key, p2_key = self._infoSet_keys
+        for player_num, played in self.history[record.history_len:]: 
+            p1_key = _roll_infoSet_key(p1_key, player_num, played)
+            p2_key = _roll_infoSet_key(p2_key, player_num, played)
+        self._infoSet_keys = (p1_key, p2_key)
+
+        if self._zobrist is not None: 
+            self._zobrist = self._roll_zobrist(record)
+
+        return record
+
+    def _roll_zobrist(self, record: UndoRecord) -> int: 
+        # Card hash after the play that returned record, from the cards it moved 
+        board = self.board
+        h = record.zobrist
+        if record.thrown: 
+            h ^= CARD_KEYS[HAND[record.player_num - 1]][id(record.thrown[1])]
+        center_keys = CARD_KEYS[CENTER]
+        previous_month = None
+        for month, cards in record.center: 
+            # Listed twice when the thrown and flipped cards share a month 
+            if month is previous_month: 
+                continue
+            previous_month = month
+            for card in cards: 
+                h ^= center_keys[id(card)]
+            for card in board.center_cards[month]: 
+                h ^= center_keys[id(card)]
+        # Captured piles only grow, apart from the junk the player took from the opponent 
+        p1_captured, p2_captured = record.num_captured
+        if record.junk_taken: 
+            opponent_keys = CARD_KEYS[CAPTURED[2 - record.player_num]]
+            for card, _ in record.junk_taken: 
+                h ^= opponent_keys[id(card)]
+            if record.player_num == 1: 
+                p2_captured -= len(record.junk_taken)
+            else: 
+                p1_captured -= len(record.junk_taken)
+        captured_keys = CARD_KEYS[CAPTURED[0]]
+        for card in board.p1.captured[p1_captured:]: 
+            h ^= captured_keys[id(card)]
+        captured_keys = CARD_KEYS[CAPTURED[1]]
+        for card in board.p2.captured[p2_captured:]: 
+            h ^= captured_keys[id(card)]
+        # Flips came off the top of the deck 
+        history = self.history
+        position = len(board.deck.deck)
+        if record.deck_swap is not None: 
+            # The flip was swapped to the top with the card now at deck_swap 
+            flipped = id(next(action.card for _, action in history[record.history_len:] if action.kind == "flip"))
+            moved = id(board.deck.deck[record.deck_swap])
+            swap_keys, top_keys = CARD_KEYS[DECK + record.deck_swap], CARD_KEYS[DECK + position]
+            h ^= swap_keys[flipped] ^ top_keys[flipped] ^ top_keys[moved] ^ swap_keys[moved]
+        for index in range(len(history) - 1, record.history_len - 1, -1): 
+            action = history[index][1]
+            if action.kind == "flip": 
+                h ^= CARD_KEYS[DECK + position][id(cast(ActionFlip, action).card)]
+                position += 1
+        return h
+
+    def _compute_zobrist(self) -> int: 
+        board = self.board
+        h = (cards_hash(HAND[0], board.p1.hand) ^ cards_hash(HAND[1], board.p2.hand) 
+             ^ cards_hash(CAPTURED[0], board.p1.captured) ^ cards_hash(CAPTURED[1], board.p2.captured))
+        for cards in board.center_cards.values(): 
+            h ^= cards_hash(CENTER, cards)
+        for position, card in enumerate(board.deck.deck): 
+            h ^= CARD_KEYS[DECK + position][id(card)]
+        return h
+
+    def state_hash(self) -> int: 
+        # 64 bit hash of the position, equal for equal positions however they were reached. 
+        # Zobrist hash of where each card is, xor a hash of the rest of the state 
+        if self._zobrist is None: 
+            self._zobrist = self._compute_zobrist()
+        board = self.board
+        p1, p2 = board.p1, board.p2
+        # No None in rest, its hash differs between processes before Python 3.12 
+        select_match = 0
+        if self.select_match: 
+            select_match = tuple(card_id(part) if isinstance(part, Card) else mask_of(part) for part in self.select_match)
+        rest = (board.curr_player.number, self.flags.go, self.flags.select_match, select_match, self.terminal, 
+                self.winner or 0, self.curr_go_score, p1.score, p2.score, p1.num_go, p2.num_go, 
+                p1.num_ssa, p2.num_ssa, _switch_junk(p1), _switch_junk(p2))
+        return self._zobrist ^ hash(rest) & HASH_MASK
+
+    def chance_outcomes(self) -> Tuple[Tuple[Card, float], ...]: 
+        # (card, probability) of every card the next flip can turn up, by card order. 
+        # The deck's order is only one draw of it, e.g. deserialize sorts the deck 
+        deck = self.board.deck.deck
+        if not deck: 
+            return ()
+        probability = 1 / len(deck)
+        return tuple((card, probability) for card in sorted(deck, key=card_id))
+
+    def _pick_flip(self, action: Action, flip: Card) -> Optional[int]: 
+        # Moves flip to the top of the deck, returns the index it came from if it moved 
+        if action.kind != "throw": 
+            raise ValueError(f"{action.serialize()} does not flip a card")
+        deck = self.board.deck.deck
+        index = next((index for index, card in enumerate(deck) if card_id(card) == card_id(flip)), None)
+        if index is None: 
+            raise ValueError(f"{flip} is not in the deck")
+        if index == len(deck) - 1: 
+            return None
+        deck[index], deck[-1] = deck[-1], deck[index]
+        return index
+
+    def _undo_record(self, action: Action, deck_swap: Optional[int] = None) -> UndoRecord: 
+        board = self.board
+        p1, p2 = board.p1, board.p2
+
+        # Center fields the action can change 
+        thrown = None 
+        if action.kind == "throw": 
+            hand_index = board.curr_player.hand.index(cast(ActionThrow, action).card)
+            thrown = (hand_index, board.curr_player.hand[hand_index])
+            months = (thrown[1].month, board.deck.deck[-1].month)
+        elif action.kind == "select match": 
+            months = (cast(ActionSelectMatch, action).match.month,)
+        elif action.kind == "select matches": 
+            months = tuple(card.month for card in cast(ActionSelectMatches, action).matches)
+        else: 
+            months = ()
+        center = tuple((month, board.center_cards[month].copy()) for month in months)
+
+        return UndoRecord(
+            history_len=len(self.history),
+            player_num=board.curr_player.number,
+            thrown=thrown,
+            center=center,
+            num_captured=(len(p1.captured), len(p2.captured)),
+            junk_taken=[],
+            switch_cards=(p1.captured_switch_card, p2.captured_switch_card),
+            scores=(p1.score, p2.score),
+            num_go=(p1.num_go, p2.num_go),
+            num_ssa=(p1.num_ssa, p2.num_ssa),
+            flags=self.flags.serialize(),
+            select_match=self.select_match,
+            terminal=self.terminal,
+            winner=self.winner,
+            curr_go_score=self.curr_go_score,
+            actions=self._actions,
+            infoSet_keys=self._infoSet_keys, 
+            zobrist=self._zobrist, 
+            deck_swap=deck_swap
+        )
+
+    def clone(self): 
+        # Copy of the mutable state, cards and actions are shared 
+        game = self.__class__.__new__(self.__class__)
+        game.board = self.board.clone()
+        game.flags = self.flags.clone()
+        # select_match holds its own copies of the matches and is never changed 
+        game.select_match = self.select_match
+        game.terminal = self.terminal
+        game.curr_go_score = self.curr_go_score
+        game.winner = self.winner
+        game.history = self.history.copy()
+        game._actions = self._actions
+        game._infoSet_keys = self._infoSet_keys
+        game._zobrist = self._zobrist
+        return game
+
+    def undo(self, record: UndoRecord): 
+        # Restore state from before the play that returned record 
+        board = self.board
+        p1, p2 = board.p1, board.p2
+
+        # Put flipped cards back on the deck 
+        deck = board.deck.deck
+        for _, action in reversed(self.history[record.history_len:]): 
+            if action.kind == "flip": 
+                deck.append(cast(ActionFlip, action).card)
+        if record.deck_swap is not None: 
+            deck[record.deck_swap], deck[-1] = deck[-1], deck[record.deck_swap]
+        del self.history[record.history_len:]
+
+        board.curr_player = p1 if record.player_num == 1 else p2
+        curr_player = board.curr_player
+        opponent = board.get_opponent()
+
+        # Give back taken junk, then drop captures 
+        for card, index in reversed(record.junk_taken): 
+            curr_player.undo_take_junk(opponent, card, index)
+        p1.uncapture(record.num_captured[0])
+        p2.uncapture(record.num_captured[1])
+        p1.restore_switch_card(record.switch_cards[0])
+        p2.restore_switch_card(record.switch_cards[1])
+
+        for month, cards in reversed(record.center): 
+            board.center_cards[month] = cards
+
+        if record.thrown: 
+            hand_index, card = record.thrown
+            curr_player.hand.insert(hand_index, card)
+
+        p1.score, p2.score = record.scores
+        p1.num_go, p2.num_go = record.num_go
+        p1.num_ssa, p2.num_ssa = record.num_ssa
+        self.flags.go, self.flags.select_match = record.flags
+        self.select_match = record.select_match
+        self.terminal = record.terminal
+        self.winner = record.winner
+        self.curr_go_score = record.curr_go_score
+        self._actions = record.actions
+        self._infoSet_keys = record.infoSet_keys
+        self._zobrist = record.zobrist
                 
-    def _throw_and_flip(self, thrown_card: Card): 
+    def _throw_and_flip(self, thrown_card: Card, junk_taken: Optional[List[Tuple[Card, int]]] = None): 
 
         num_steal_junk = 0 
 
         # Remove card from player hand
         self.board.curr_player.hand.remove(thrown_card)
         # Add card into center 
-        self._append_to_center_field(CardList([thrown_card]))
-        matched_cards = self.board.center_cards[thrown_card.month]
+        center = self.board.center_cards
+        center.add(thrown_card)
 
-        if len(matched_cards) == 4: 
+        if center.count(thrown_card.month) == 4: 
             num_steal_junk += 1 
-            self.board.center_cards[thrown_card.month] = CardList() # Clear center cards of that month 
-            self.board.curr_player.captured.extend(matched_cards)
+            # Clear center cards of that month 
+            self.board.curr_player.capture(center.clear(thrown_card.month))
 
             num_steal_junk += self._flip()
         else: 
@@ -121,17 +431,16 @@ class GoStop():
             num_steal_junk += self._flip(thrown_card) 
 
         # Check to see if center cards were cleared 
-        if(
-            all(field == [] for field in self.board.center_cards.values())
-            and self.board.curr_player.hand != CardList()
-        ):
+        if center.is_empty() and self.board.curr_player.hand: 
             num_steal_junk += 1 
 
         # Take Junk 
         opponent = self.board.get_opponent() 
         if num_steal_junk: 
             for _ in range(num_steal_junk):
-                self.board.curr_player.take_junk(opponent)
+                taken = self.board.curr_player.take_junk(opponent)
+                if taken and junk_taken is not None: 
+                    junk_taken.append(taken)
         
         # See if current player has racked enough points to Go 
         # Only do this if current player is not waiting to select a match 
@@ -172,8 +481,9 @@ class GoStop():
         thrown_match_select = False
         flip_match_select = False
 
+        center = self.board.center_cards
         flipped_card = self.board.deck.flip() 
-        flip_matched_cards = self.board.center_cards[flipped_card.month]
+        flip_matched_cards = center[flipped_card.month]
 
         # Add to action history
         action_flip = ActionFlip(card=flipped_card)
@@ -184,70 +494,73 @@ class GoStop():
                 # Captured Entire Suit 
                 if len(flip_matched_cards) == 3: 
                     num_steal_junk += 1 
-                    self.board.center_cards[flipped_card.month] = CardList() 
-                    self.board.curr_player.captured.extend(flip_matched_cards + CardList([flipped_card]))
+                    center.clear(flipped_card.month)
+                    self.board.curr_player.capture(flip_matched_cards + CardList([flipped_card]))
                 elif len(flip_matched_cards) == 2: 
                     # ssa 
                     self.board.curr_player.num_ssa += 1 
-                    self._append_to_center_field(CardList([flipped_card]))
+                    center.add(flipped_card)
                 elif len(flip_matched_cards) == 1: 
                     # ghost 
                     num_steal_junk += 1 
-                    self.board.center_cards[thrown_card.month].remove(thrown_card)
-                    self.board.curr_player.captured.extend(CardList([thrown_card, flipped_card]))
+                    center.remove(thrown_card)
+                    self.board.curr_player.capture(CardList([thrown_card, flipped_card]))
                 # return here as everything is done
                 return num_steal_junk
             else: 
                 # Deal with Thrown Matchings 
-                thrown_matched_cards = self.board.center_cards[thrown_card.month] # this includes thrown card 
+                thrown_matched_cards = center[thrown_card.month] # this includes thrown card 
                 if len(thrown_matched_cards) == 3: 
                     # print(f"thrown matched cards: {thrown_matched_cards}")
                     thrown_match_select = True 
                 elif len(thrown_matched_cards) == 2: 
-                    self.board.center_cards[thrown_card.month] = CardList() # Clear that suit 
-                    self.board.curr_player.captured.extend(thrown_matched_cards)
+                    center.clear(thrown_card.month) # Clear that suit 
+                    self.board.curr_player.capture(thrown_matched_cards)
 
         # Deal with Flipped Matchings 
         # Captured Entire Suit of Different Suit from Thrown 
         if len(flip_matched_cards) == 3: 
             num_steal_junk += 1 
-            self.board.center_cards[flipped_card.month] = CardList() 
-            self.board.curr_player.captured.extend(flip_matched_cards + CardList([flipped_card]))
+            center.clear(flipped_card.month)
+            self.board.curr_player.capture(flip_matched_cards + CardList([flipped_card]))
         elif len(flip_matched_cards) == 2: 
             flip_match_select = True 
         elif len(flip_matched_cards) == 1: 
-            self.board.center_cards[flipped_card.month] = CardList() # Clear that suit 
-            self.board.curr_player.captured.extend(flip_matched_cards + CardList([flipped_card]))
+            center.clear(flipped_card.month) # Clear that suit 
+            self.board.curr_player.capture(flip_matched_cards + CardList([flipped_card]))
         else: 
-            self._append_to_center_field(CardList([flipped_card]))
+            center.add(flipped_card)
 
         # Handle Match Selects 
+        if thrown_match_select: 
+            # Remove thrown card from board 
+            center.remove(thrown_card)
+
+        # Matches are copied so select_match does not change with the center fields
         if thrown_match_select and flip_match_select: 
             self.flags.select_match = True 
-            self.select_match = (flipped_card, flip_matched_cards, thrown_card, thrown_matched_cards)
+            self.select_match = (flipped_card, flip_matched_cards.copy(), thrown_card, thrown_matched_cards.copy())
         elif thrown_match_select: 
             self.flags.select_match = True 
-            self.select_match = (thrown_card, thrown_matched_cards)
-            # Remove thrown card from board 
-            self.board.center_cards[thrown_card.month].remove(thrown_card)
+            self.select_match = (thrown_card, thrown_matched_cards.copy())
 
         elif flip_match_select: 
             self.flags.select_match = True 
-            self.select_match = (flipped_card, flip_matched_cards)
-            # Remove flipped card from board 
-            self.board.center_cards[flipped_card.month].remove(flipped_card)
+            self.select_match = (flipped_card, flip_matched_cards.copy())
 
         return num_steal_junk
     
     def _select_match(self, og_card: Card, match: Card): 
 
+        # Set select_match flag to false 
+        self.flags.select_match = False 
+        self.select_match = None
+
         # Remove match from center
-        # print(f"before sel match: {self.board.center_cards[match.month]}")
-        self.board.center_cards[match.month].remove(match)
-        # print(f"after after sel match: {self.board.center_cards[match.month]}")
+        self.board.center_cards.remove(match)
 
         # Add to captured 
-        self.board.curr_player.captured.extend(CardList([og_card, match]))
+        self.board.curr_player.capture(CardList([og_card, match]))
 
         opponent = self.board.get_opponent()
         # Check For Go 
@@ -277,17 +590,18 @@ class GoStop():
         if not self.flags.go: 
             self.board.switch_turn()
 
+    def _select_matches(self, og_cards: Tuple[Card], matches: Tuple[Card]): 
+
         # Set select_match flag to false 
         self.flags.select_match = False 
-
-    def _select_matches(self, og_cards: Tuple[Card], matches: Tuple[Card]): 
+        self.select_match = None
 
         # Remove match from center
         for card in matches: 
-            self.board.center_cards[card.month].remove(card)
+            self.board.center_cards.remove(card)
 
         # Add to captured 
-        self.board.curr_player.captured.extend(CardList([og_cards[0], og_cards[1], matches[0], matches[1]]))
+        self.board.curr_player.capture(CardList([og_cards[0], og_cards[1], matches[0], matches[1]]))
 
         # Check for Go 
         opponent = self.board.get_opponent()
@@ -316,16 +630,10 @@ class GoStop():
         if not self.flags.go: 
             self.board.switch_turn()
 
-        # Set select_match flag to false 
-        self.flags.select_match = False 
-
 
     def _append_to_center_field(self, cards: CardList): 
         for card in cards: 
-            if self.board.center_cards[card.month] != CardList():
-                self.board.center_cards[card.month].append(card)
-            else: 
-                self.board.center_cards[card.month] = CardList([card])
+            self.board.center_cards.add(card)
 
     def _go(self): 
         curr_player = self.board.curr_player
@@ -461,8 +769,6 @@ class GoStop():
     
     @staticmethod
     def deserialize(serialized_game: tuple): 
-        game = GoStop()
-
         # Deserialize select_match
         serialized_select_match = serialized_game[2]
         
@@ -485,20 +791,106 @@ class GoStop():
         serialized_history = serialized_game[6]
         history = [(int(player_num), Action.deserialize(action)) for player_num, action in serialized_history]
 
-        game.board = Board.deserialize(serialized_game[0])
-        game.flags = Flags.deserialize(serialized_game[1])
-        game.select_match = select_match
-        game.terminal = serialized_game[3]
-        game.curr_go_score = serialized_game[4]
-        game.winner = serialized_game[5]
-        game.history = history
-
-        return game
+        return GoStop.from_parts(board=Board.deserialize(serialized_game[0]), 
+                                 flags=Flags.deserialize(serialized_game[1]), 
+                                 select_match=select_match, 
+                                 terminal=serialized_game[3], 
+                                 curr_go_score=serialized_game[4], 
+                                 winner=serialized_game[5], 
+                                 history=history)
     
+    def to_bytes(self) -> bytes: 
+        # Fixed layout binary form (see _STATE), keeps the deck order and info set keys. 
+        # Hands, captured cards and center fields come back sorted, as with deserialize 
+        board = self.board
+        p1, p2 = board.p1, board.p2
+        bits = (self.flags.go | self.flags.select_match << 1 | self.terminal << 2 
+                | (board.curr_player is p2) << 3 
+                | _switch_junk(p1) << 4 | _switch_junk(p2) << 5)
+        select_match = self.select_match or ()
+        select_cards = [card_id(card) for card in select_match[::2]] + [0, 0]
+        select_masks = [mask_of(cards) for cards in select_match[1::2]] + [0, 0]
+        center = 0 
+        for cards in board.center_cards.slots: 
+            for card in cards: 
+                center |= 1 << card_id(card)
+        deck = bytes(card_ids_of(board.deck.deck))
+        history = struct.pack(f"<{len(self.history)}I", 
+                              *[action.encode() | (player_num - 1) << 23 for player_num, action in self.history])
+        return _STATE.pack(STATE_MAGIC, STATE_VERSION, bits, self.winner or 0, len(select_match), 
+                           self.curr_go_score, p1.score, p2.score, p1.num_go, p2.num_go, p1.num_ssa, p2.num_ssa, 
+                           mask_of(p1.hand), mask_of(p2.hand), mask_of(p1.captured), mask_of(p2.captured), center, 
+                           select_cards[0], select_cards[1], select_masks[0], select_masks[1], 
+                           len(deck), len(self.history), b"".join(self._infoSet_keys)) + deck + history
+
+    @classmethod
+    def from_bytes(cls, data, offset: int = 0) -> "GoStop": 
+        # Reads a state of to_bytes in place at offset, so states packed together need no slicing 
+        (magic, version, bits, winner, select_size, curr_go_score, 
+         p1_score, p2_score, p1_num_go, p2_num_go, p1_num_ssa, p2_num_ssa, 
+         p1_hand, p2_hand, p1_captured, p2_captured, center, 
+         select_card_one, select_card_two, select_mask_one, select_mask_two, 
+         deck_size, history_size, infoSet_keys) = _STATE.unpack_from(data, offset)
+        if magic != STATE_MAGIC or version != STATE_VERSION: 
+            raise ValueError(f"Not a GoStop state of version {STATE_VERSION}")
+
+        board = Board.__new__(Board)
+        start = offset + _STATE.size
+        board.deck = Deck.empty()
+        board.deck.deck = CardList([card_from_id(i) for i in data[start:start + deck_size]])
+        players = []
+        for number, hand, captured, score, num_go, num_ssa, switch_bit in (
+                (1, p1_hand, p1_captured, p1_score, p1_num_go, p1_num_ssa, 16), 
+                (2, p2_hand, p2_captured, p2_score, p2_num_go, p2_num_ssa, 32)): 
+            player = Player.from_masks(number, hand, captured, Type.JUNK if bits & switch_bit else Type.ANIMAL)
+            player.score = score
+            player.num_go = num_go
+            player.num_ssa = num_ssa
+            players.append(player)
+        board.p1, board.p2 = players
+        board.curr_player = players[bits >> 3 & 1]
+        board.center_cards = CenterField.from_mask(center)
+
+        flags = Flags()
+        flags.go = bool(bits & 1)
+        flags.select_match = bool(bits & 2)
+        select_match = None
+        if select_size == 2: 
+            select_match = (card_from_id(select_card_one), cards_of(select_mask_one))
+        elif select_size == 4: 
+            select_match = (card_from_id(select_card_one), cards_of(select_mask_one), 
+                            card_from_id(select_card_two), cards_of(select_mask_two))
+
+        history = [((code >> 23) + 1, _decode_action(code & 0x7FFFFF)) 
+                   for code in struct.unpack_from(f"<{history_size}I", data, start + deck_size)]
+        return cls.from_parts(board, flags, select_match, bool(bits & 4), curr_go_score, winner or None, 
+                              history, (infoSet_keys[:INFOSET_KEY_SIZE], infoSet_keys[INFOSET_KEY_SIZE:]))
+
+    def byte_size(self) -> int: 
+        # Length of to_bytes 
+        return _STATE.size + len(self.board.deck) + 4 * len(self.history)
+
     def get_current_player_number(self): 
         return self.board.curr_player.number
     
-    def get_infoSet(self) -> tuple: 
+    def reset_infoSet_keys(self): 
+        # Info set keys hash the player's observation of the current position and then every action 
+        # played from it, so keys only match between games tracked from the same kind of start 
+        # (a deal for GoStop and SimplifiedGoStop). 
+        self._infoSet_keys = tuple(
+            hashlib.blake2b(repr(self.get_infoSet_tuple(player_num)).encode(), 
+                            digest_size=INFOSET_KEY_SIZE).digest()
+            for player_num in (1, 2)
+        )
+
+    def get_infoSet(self) -> bytes: 
+        # Compact key of the current player's information set, kept up to date by play 
+        return self._infoSet_keys[self.get_current_player_number() - 1]
+
+    def get_infoSet_tuple(self, player_num: Optional[int] = None) -> tuple: 
+        # Full information set of player_num (default current player) 
+        if player_num is None: 
+            player_num = self.get_current_player_number() 
         serialized_history = tuple([(player_num, action.serialize()) for player_num, action in self.history])
 
         serialized_select_match = None
@@ -532,7 +924,6 @@ class GoStop():
                                                  serialized_card_flipped, 
                                                  serialized_flipped_matches))
                 
-        player_num = self.get_current_player_number() 
         return tuple((
             self.board.get_hidden_information(player_num=player_num),
             self.flags.serialize(),
@@ -542,4 +933,32 @@ class GoStop():
             self.winner, 
             serialized_history
         ))
-        
\ No newline at end of file
+        
+
+# Many states in one buffer, for sending between processes: number of states (uint32), 
+# offset of each state from the start of the buffer (uint64), then the to_bytes states 
+_COUNT = struct.Struct("<I")
+
+def pack_states(games: List[GoStop]) -> bytearray: 
+    states = [game.to_bytes() for game in games]
+    offsets = np.empty(len(states), dtype="<u8")
+    offset = _COUNT.size + offsets.nbytes
+    for index, state in enumerate(states): 
+        offsets[index] = offset
+        offset += len(state)
+    buffer = bytearray(_COUNT.pack(len(states)))
+    buffer += offsets.tobytes()
+    buffer += b"".join(states)
+    return buffer
+
+def num_packed_states(buffer) -> int: 
+    return _COUNT.unpack_from(buffer)[0]
+
+def unpack_state(buffer, index: int) -> GoStop: 
+    # State index of a pack_states buffer, read in place 
+    offset = int(np.frombuffer(buffer, dtype="<u8", count=1, offset=_COUNT.size + 8 * index)[0])
+    return GoStop.from_bytes(buffer, offset)
+
+def unpack_states(buffer) -> List[GoStop]: 
+    offsets = np.frombuffer(buffer, dtype="<u8", count=num_packed_states(buffer), offset=_COUNT.size)
+    return [GoStop.from_bytes(buffer, offset) for offset in offsets.tolist()]
@@ -1,103 +1,335 @@
 from simplified_go_stop import SimplifiedGoStop
-from models.action import Action
+# GoStopNode stays importable from here for nodeMaps pickled as go_stop_ai.GoStopNode
+from node_store import GoStopNode, NodeStore
+from strategy_file import write_strategy_file, migrate_nodeMap
+from cfr_rules import UpdateRule, get_rule
+from transposition import TranspositionTable
+from best_response import BestResponse
+import multiprocessing
 import numpy as np 
+import os
 import pickle
+import random
+import time
 from tqdm import tqdm
+from typing import Optional
 
-class GoStopNode(): 
-    def __init__(self, num_actions, infoSet: tuple):
-        self.infoSet = infoSet
-        self.regretSum = np.zeros(shape=num_actions)
-        self.strategySum = np.zeros(shape=num_actions)
-        self.strategy = np.zeros(shape=num_actions)
-
-    def get_strategy(self, realizationWeight): 
-        self.strategy = np.maximum(self.regretSum, 0)
-        normalizingSum = np.sum(self.strategy)
-
-        if normalizingSum > 0: 
-            self.strategy /= normalizingSum
-        else: 
-            self.strategy = np.ones_like(self.strategy)/(self.strategy.shape[0])
-        
-        self.strategySum += realizationWeight * self.strategy
-
-        return self.strategy
-    
-    def get_average_strategy(self): 
-        normalizingSum = np.sum(self.strategySum)
-        average_strategy = np.copy(self.strategySum)
-        if normalizingSum > 0: 
-            average_strategy /= normalizingSum
-        else: 
-            average_strategy = np.ones_like(self.strategy) / len(self.strategy)
-
-        return average_strategy 
-    
-    def __str__(self): 
-        return f'{self.infoSet}: {self.get_average_strategy()}'
-
+SCHEMES = ("chance", "external", "outcome")
+# Where throws get their flip: the deck's top card, a card sampled from GoStop.chance_outcomes() 
+# or, in the chance scheme, every outcome weighted by its probability 
+FLIPS = ("deck", "sample", "enumerate")
 
 class GoStopAI(): 
-    def __init__(self):
-        self.nodeMap = dict()
+    def __init__(self, check_collisions: bool = False, exploration: float = 0.6, 
+                 utility_table: Optional[TranspositionTable] = None, flips: str = "deck"):
+        if flips not in FLIPS: 
+            raise ValueError(f"Unknown flips {flips}, expected one of {FLIPS}")
+        self.nodeMap = NodeStore()
+        # Probability of a uniform random action for the traverser in outcome sampling 
+        self.exploration = exploration
+        self.nodes_touched = 0
+        # Update rule (cfr_rules), iterations trained with it and the strategy sum weight of the current one 
+        self.rule = UpdateRule()
+        self.iteration = 0
+        self.strategy_weight = 1
+        # Full info set tuple per key, to check that no two info sets share a key 
+        self.check_collisions = check_collisions
+        self.infoSetTuples = dict()
+        # Optional cache of terminal utilities keyed by GoStop.state_hash, which never change, 
+        # so training with it is exact 
+        self.utility_table = utility_table
+        self.flips = flips
+        # (iteration, exploitability) of every evaluation during train 
+        self.exploitability = []
 
     def save_nodeMap(self, filename="saved_Nodemaps/simple"): 
         with open(filename, "wb") as f:
             pickle.dump(self.nodeMap, f)
 
-    def load_nodeMap(self, filename="saved_Nodemaps/simple"):
+    def load_nodeMap(self, filename="saved_Nodemaps/simple", game_class=SimplifiedGoStop):
         with open(filename, "rb") as f:
-            self.nodeMap = pickle.load(f)  
+            nodeMap = pickle.load(f)  
+        # nodeMaps saved with tuple keys get the keys games look up 
+        nodeMap = migrate_nodeMap(nodeMap, game_class)
+        if isinstance(nodeMap, dict): 
+            # nodeMap saved as a dict of GoStopNode 
+            nodeMap = NodeStore.from_nodes(nodeMap)
+        self.nodeMap = nodeMap
+
+    def save_strategy(self, filename="saved_Nodemaps/simple.strategy"): 
+        # Average strategies only, for play (open with strategy_file.StrategyFile)
+        write_strategy_file(filename, self.nodeMap)
 
-    def train(self, iterations: int): 
+    def train(self, iterations: int, scheme: str = "chance", game_class=SimplifiedGoStop, rule=None, 
+              evaluation: Optional[BestResponse] = None, evaluate_every: int = 100, seed: Optional[int] = None): 
+        # scheme "chance": each iteration deals one game and walks its whole tree (vanilla CFR on the sampled deal)
+        # "external": samples opponent actions, walks all of the traverser's
+        # "outcome": samples a single path, regrets importance weighted
+        # rule is an UpdateRule or one of the names in cfr_rules.RULES, by default the rule of the last call 
+        # With evaluation, the average strategy's exploitability on it is measured every evaluate_every 
+        # iterations and at the end, and appended to self.exploitability 
+        # With seed, iteration i of this call seeds random with (seed, i) as train_parallel does, so 
+        # train_parallel with batch_size=1 trains the same table (up to rounding of the deltas) 
+        if rule is not None: 
+            self.rule = get_rule(rule)
+        self._check_scheme(scheme)
         util = 0
-        # game = SimplifiedGoStop()
-        # self.game = game 
-        for _ in tqdm(range(iterations)):
-            game = SimplifiedGoStop()
-            # Starts random game of simplified go stop 
-            util += self.cfr(1, game.serialize(), None, 1, 1)
-            util += self.cfr(2, game.serialize(), None, 1, 1)
+        self.nodes_touched = 0
+        if self.utility_table is not None: 
+            self.utility_table.reset_stats()
+        start = time.perf_counter()
+        evaluation_time = 0
+        for done in tqdm(range(1, iterations + 1)):
+            self.iteration += 1
+            if seed is not None: 
+                random.seed(seed << 32 | done - 1)
+            self.strategy_weight = self.rule.strategy_weight(self.iteration)
+            util += self._train_iteration(scheme, game_class)
+            self.rule.after_iteration(self.nodeMap, self.iteration)
+            if evaluation is not None and (done % evaluate_every == 0 or done == iterations): 
+                evaluation_start = time.perf_counter()
+                self.exploitability.append((self.iteration, evaluation.exploitability(self.nodeMap)))
+                evaluation_time += time.perf_counter() - evaluation_start
+                tqdm.write(f"Iteration {self.iteration}: exploitability {self.exploitability[-1][1]:.4f}")
+        self.rule.settle(self.nodeMap)
+        elapsed = time.perf_counter() - start - evaluation_time
         print(f"Avg game value: {util/iterations}")
-            
+        print(f"{self.nodes_touched} nodes touched, {self.nodes_touched / elapsed:.0f} nodes/sec")
+        if self.utility_table is not None: 
+            print(f"Utility table: {self.utility_table.report()}")
 
-    def cfr(self, player_num, serialized_game_state: tuple, action_to_play: Action, pr_1, pr_2): 
-        # Load in current game state 
-        game = SimplifiedGoStop.deserialize(serialized_game_state)
-        if action_to_play:
-            game.play(action_to_play)
-        if game.terminal: 
-            # print(game.winner)
-            # print(player_num)
-            # print(game.get_utility(player_num))
-            return game.get_utility(player_num)
-        
+    def _check_scheme(self, scheme: str): 
+        if scheme not in SCHEMES: 
+            raise ValueError(f"Unknown scheme {scheme}, expected one of {SCHEMES}")
+        if self.flips == "enumerate" and scheme != "chance": 
+            raise ValueError(f"flips enumerate needs the chance scheme, not {scheme}")
+
+    def _train_iteration(self, scheme: str, game_class) -> float: 
+        # Starts random game of simplified go stop 
+        game = game_class()
+        if self.utility_table is not None: 
+            # Hash from the root, so play keeps the hash of every position below it 
+            game.state_hash()
+        util = 0
+        for player_num in (1, 2): 
+            if scheme == "chance": 
+                util += self.cfr(player_num, game, 1, 1)
+            elif scheme == "external": 
+                util += self.external_cfr(player_num, game)
+            else: 
+                sampled_util, pr_tail = self.outcome_cfr(player_num, game, 1, 1, 1)
+                util += sampled_util * pr_tail
+            self.rule.after_traversal(self.nodeMap, self.iteration)
+        return util
+
+    def train_parallel(self, iterations: int, workers: int = os.cpu_count(), batch_size: int = 256, 
+                       chunk_size: int = 8, seed: int = 0, scheme: str = "chance", game_class=SimplifiedGoStop): 
+        # Iterations run in batches. Every iteration of a batch starts from the table as it was at the 
+        # start of the batch, plus the earlier iterations of its chunk, and seeds random with 
+        # (seed, iteration number). Chunks are the unit of work; their regret and strategy sum deltas 
+        # are added to the table in chunk order once the batch is done. Results therefore depend on 
+        # seed, batch_size and chunk_size but not on workers, and workers=1 runs the same steps in process. 
+        # Larger batches train on a staler table than train does: only batch_size=1 matches train(seed=seed) 
+        self._check_scheme(scheme)
+        if type(self.rule) is not UpdateRule: 
+            # Discounts and floors apply to the whole table between iterations, which batches do not have 
+            raise ValueError(f"train_parallel supports the vanilla update rule only, not {self.rule}")
+        util = 0
+        nodes_touched = 0
+        self.strategy_weight = self.rule.strategy_weight(self.iteration + 1)
+        start = time.perf_counter()
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        for batch_start in tqdm(range(0, iterations, batch_size)): 
+            batch_end = min(batch_start + batch_size, iterations)
+            tasks = [(first, min(first + chunk_size, batch_end), seed, scheme, game_class) 
+                     for first in range(batch_start, batch_end, chunk_size)]
+            if workers == 1: 
+                _init_worker(self)
+                results = [_run_chunk(task) for task in tasks]
+                self.nodeMap.close_checkpoint()
+                _init_worker(None)
+            else: 
+                # A new pool per batch so the workers start from the merged table 
+                with context.Pool(workers, initializer=_init_worker, initargs=(self,)) as pool: 
+                    results = pool.map(_run_chunk, tasks)
+            for delta, chunk_util, chunk_nodes_touched in results: 
+                self.nodeMap.apply_delta(delta)
+                util += chunk_util
+                nodes_touched += chunk_nodes_touched
+        self.nodes_touched = nodes_touched
+        self.iteration += iterations
+        elapsed = time.perf_counter() - start
+        print(f"Avg game value: {util/iterations}")
+        print(f"{self.nodes_touched} nodes touched, {self.nodes_touched / elapsed:.0f} nodes/sec")
+
+    def _get_node(self, game: SimplifiedGoStop, actions) -> GoStopNode: 
         # Get Information Set Node or Create if Inexistant
-        num_actions = len(game.actions())
+        self.nodes_touched += 1
         infoSet = game.get_infoSet()
+        if self.check_collisions: 
+            infoSet_tuple = self.infoSetTuples.setdefault(infoSet, game.get_infoSet_tuple())
+            assert infoSet_tuple == game.get_infoSet_tuple(), "info set key collision"
         curr_node = self.nodeMap.get(infoSet)
         if curr_node == None: 
-            curr_node = GoStopNode(num_actions, infoSet)
-            self.nodeMap[infoSet] = curr_node
+            curr_node = self.nodeMap.add(infoSet, len(actions))
+        # Rows the rule rescales lazily are brought up to date before use 
+        self.rule.touch(curr_node)
+        return curr_node
+
+    def _get_utility(self, game: SimplifiedGoStop, player_num) -> float: 
+        if self.utility_table is None: 
+            return game.get_utility(player_num)
+        key = game.state_hash()
+        utility = self.utility_table.get(key)
+        if utility is None: 
+            utility = game.get_utility(1)
+            self.utility_table.put(key, utility)
+        # Zero sum 
+        return utility if player_num == 1 else -utility
+
+    def cfr(self, player_num, game: SimplifiedGoStop, pr_1, pr_2): 
+        # Walks the tree in place, every play is undone before returning 
+        if game.terminal: 
+            return self._get_utility(game, player_num)
+
+        actions = game.actions()
+        num_actions = len(actions)
+        curr_node = self._get_node(game, actions)
         
         #Get current strategies for this info set 
         current_player_number = game.get_current_player_number()
-        strategy = curr_node.get_strategy(pr_1 if player_num == 1 else pr_2)
+        strategy = curr_node.get_strategy((pr_1 if player_num == 1 else pr_2) * self.strategy_weight)
         utils = np.zeros(num_actions)
         nodeUtil = 0 
-        for index, action in enumerate(game.actions()): 
+        for index, action in enumerate(actions): 
             if current_player_number == 1: 
-                utils[index] = self.cfr(player_num, game.serialize(), action, pr_1 * strategy[index], pr_2)
+                utils[index] = self._action_cfr(player_num, game, action, pr_1 * strategy[index], pr_2)
             else:
-                utils[index] = self.cfr(player_num, game.serialize(), action, pr_1, pr_2 * strategy[index])
+                utils[index] = self._action_cfr(player_num, game, action, pr_1, pr_2 * strategy[index])
 
             nodeUtil += strategy[index] * utils[index]
         
         if current_player_number == player_num: 
-            for index, action in enumerate(game.actions()): 
+            for index in range(num_actions): 
                 regret = utils[index] - nodeUtil 
                 curr_node.regretSum[index] += regret * pr_1 if player_num == 2 else regret * pr_2
-            
+
         return nodeUtil
-    
\ No newline at end of file
+
+    def _action_cfr(self, player_num, game: SimplifiedGoStop, action, pr_1, pr_2): 
+        # cfr value after action, averaged over its flips when they are enumerated 
+        if self.flips != "enumerate" or action.kind != "throw": 
+            undo_record = self._play(game, action)
+            util = self.cfr(player_num, game, pr_1, pr_2)
+            game.undo(undo_record)
+            return util
+        util = 0
+        for card, probability in game.chance_outcomes(): 
+            undo_record = game.play(action, card)
+            # Chance reach counts with the opponent's, in player_num's counterfactual reach 
+            if player_num == 1: 
+                util += probability * self.cfr(player_num, game, pr_1, pr_2 * probability)
+            else: 
+                util += probability * self.cfr(player_num, game, pr_1 * probability, pr_2)
+            game.undo(undo_record)
+        return util
+
+    def _play(self, game: SimplifiedGoStop, action): 
+        if self.flips == "sample" and action.kind == "throw": 
+            outcomes = game.chance_outcomes()
+            return game.play(action, outcomes[_sample([probability for _, probability in outcomes])][0])
+        return game.play(action)
+
+    def external_cfr(self, player_num, game: SimplifiedGoStop): 
+        # External sampling: one sampled action at the opponent's nodes, every action at player_num's 
+        if game.terminal: 
+            return self._get_utility(game, player_num)
+
+        actions = game.actions()
+        if not actions: 
+            # Dead end, worth 0 as in cfr 
+            return 0
+        curr_node = self._get_node(game, actions)
+
+        if game.get_current_player_number() != player_num: 
+            # Opponent's average strategy is accumulated where it is sampled 
+            strategy = curr_node.get_strategy(self.strategy_weight)
+            undo_record = self._play(game, actions[_sample(strategy)])
+            util = self.external_cfr(player_num, game)
+            game.undo(undo_record)
+            return util
+
+        strategy = curr_node.get_strategy(0)
+        utils = np.zeros(len(actions))
+        for index, action in enumerate(actions): 
+            undo_record = self._play(game, action)
+            utils[index] = self.external_cfr(player_num, game)
+            game.undo(undo_record)
+        nodeUtil = np.dot(strategy, utils)
+        curr_node.regretSum += utils - nodeUtil
+        return nodeUtil
+
+    def outcome_cfr(self, player_num, game: SimplifiedGoStop, pr_player, pr_opponent, pr_sample): 
+        # Outcome sampling: a single sampled path, player_num explores with probability self.exploration. 
+        # Returns the sampled utility divided by the probability of sampling it and 
+        # the probability of playing from this node to the sampled terminal 
+        if game.terminal: 
+            return self._get_utility(game, player_num) / pr_sample, 1
+
+        actions = game.actions()
+        num_actions = len(actions)
+        if not actions: 
+            return 0, 1
+        curr_node = self._get_node(game, actions)
+
+        if game.get_current_player_number() != player_num: 
+            strategy = curr_node.get_strategy(0)
+            index = _sample(strategy)
+            undo_record = self._play(game, actions[index])
+            util, pr_tail = self.outcome_cfr(player_num, game, pr_player, 
+                                             pr_opponent * strategy[index], pr_sample * strategy[index])
+            game.undo(undo_record)
+            return util, pr_tail * strategy[index]
+
+        # Average strategy weighted by player_num's reach over the sampling probability 
+        strategy = curr_node.get_strategy(pr_player / pr_sample * self.strategy_weight)
+        sample_strategy = self.exploration / num_actions + (1 - self.exploration) * strategy
+        index = _sample(sample_strategy)
+        undo_record = self._play(game, actions[index])
+        util, pr_tail = self.outcome_cfr(player_num, game, pr_player * strategy[index], 
+                                         pr_opponent, pr_sample * sample_strategy[index])
+        game.undo(undo_record)
+
+        # Sampled action gets W * (pr_tail - pr_to_terminal), the others -W * pr_to_terminal 
+        weighted_util = util * pr_opponent
+        pr_to_terminal = pr_tail * strategy[index]
+        curr_node.regretSum -= weighted_util * pr_to_terminal
+        curr_node.regretSum[index] += weighted_util * pr_tail
+        return util, pr_tail * strategy[index]
+
+
+# Per process state of train_parallel workers: the AI and the checkpoint open on its table 
+_worker_ai: Optional[GoStopAI] = None
+_worker_checkpoint = None
+
+def _init_worker(ai: Optional[GoStopAI]): 
+    global _worker_ai, _worker_checkpoint
+    _worker_ai = ai
+    _worker_checkpoint = ai.nodeMap.checkpoint() if ai is not None else None
+
+def _run_chunk(task): 
+    # Trains iterations [first, end) and returns the table delta, rolling the table back 
+    first, end, seed, scheme, game_class = task
+    ai = _worker_ai
+    ai.nodes_touched = 0
+    util = 0
+    for iteration in range(first, end): 
+        random.seed(seed << 32 | iteration)
+        util += ai._train_iteration(scheme, game_class)
+    delta = ai.nodeMap.delta(_worker_checkpoint)
+    ai.nodeMap.rollback(_worker_checkpoint)
+    return delta, util, ai.nodes_touched
+
+def _sample(strategy) -> int: 
+    index = np.searchsorted(np.cumsum(strategy), random.random(), side="right")
+    return min(int(index), len(strategy) - 1)
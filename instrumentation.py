@@ -0,0 +1,160 @@
+# Opt-in instrumentation of the hot paths.
+# enable() swaps the methods in TARGETS for wrappers counting calls, time and
+# allocated blocks per phase; disable() puts the original methods back, so
+# nothing runs in the hot paths while instrumentation is off.
+#
+#   instrumentation.enable("run.jsonl", interval=30)   snapshot every 30 s to run.jsonl
+#   ai.train(1000)
+#   instrumentation.disable()                          writes a final snapshot
+#   python -m instrumentation run_a.jsonl run_b.jsonl  diff the last snapshots of two runs
+#
+# Time and allocated blocks (sys.getallocatedblocks, net) are inclusive of
+# nested phases; for recursive methods only the outermost call is timed.
+# nodeMap.add calls count the growth of every NodeStore.
+from go_stop import GoStop
+from go_stop_ai import GoStopAI
+from models.player import Player
+from node_store import NodeStore
+
+import functools
+import json
+import sys
+import time
+
+from typing import Dict, Optional
+
+# (class, method, phase)
+TARGETS = (
+    (GoStop, "play", "play"),
+    (GoStop, "_throw_and_flip", "throw_and_flip"),
+    (GoStop, "_flip", "flip"),
+    (GoStop, "_select_match", "select_match"),
+    (GoStop, "_select_matches", "select_matches"),
+    (GoStop, "get_infoSet", "get_infoSet"),
+    (Player, "update_score", "update_score"),
+    (GoStopAI, "cfr", "cfr"),
+    (GoStopAI, "external_cfr", "external_cfr"),
+    (GoStopAI, "outcome_cfr", "outcome_cfr"),
+    (NodeStore, "add", "nodeMap.add"),
+)
+
+
+class PhaseStats():
+    __slots__ = ("calls", "seconds", "blocks", "depth")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.blocks = 0
+        self.depth = 0
+
+    def as_dict(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds, "blocks": self.blocks}
+
+
+_stats: Dict[str, PhaseStats] = dict()
+_originals = []
+_start = 0.0
+_dump_path: Optional[str] = None
+_dump_interval = 0.0
+_next_dump = float("inf")
+
+def _wrap(function, stats: PhaseStats):
+    perf_counter = time.perf_counter
+    allocated_blocks = sys.getallocatedblocks
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        stats.calls += 1
+        if stats.depth:
+            # Recursive call, inside the outermost call's time
+            stats.depth += 1
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.depth -= 1
+        stats.depth = 1
+        start_blocks = allocated_blocks()
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end = perf_counter()
+            stats.seconds += end - start
+            stats.blocks += allocated_blocks() - start_blocks
+            stats.depth = 0
+            if end >= _next_dump:
+                _periodic_dump(end)
+    return wrapper
+
+def enabled() -> bool:
+    return bool(_originals)
+
+def enable(dump_path: Optional[str] = None, interval: float = 60.0):
+    # Instruments TARGETS, resetting the counters. With dump_path, a snapshot is appended
+    # to it as a JSON line every interval seconds and when disabled
+    global _start, _dump_path, _dump_interval, _next_dump
+    if enabled():
+        disable()
+    reset()
+    for cls, name, phase in TARGETS:
+        function = cls.__dict__[name]
+        _originals.append((cls, name, function))
+        setattr(cls, name, _wrap(function, _stats.setdefault(phase, PhaseStats())))
+    _start = time.perf_counter()
+    _dump_path = dump_path
+    _dump_interval = interval
+    _next_dump = _start + interval if dump_path else float("inf")
+
+def disable():
+    global _next_dump
+    if _dump_path and enabled():
+        dump(_dump_path)
+    _next_dump = float("inf")
+    while _originals:
+        cls, name, function = _originals.pop()
+        setattr(cls, name, function)
+
+def reset():
+    for stats in _stats.values():
+        stats.calls = stats.blocks = 0
+        stats.seconds = 0.0
+
+def snapshot() -> dict:
+    return {"elapsed": time.perf_counter() - _start,
+            "phases": dict((phase, stats.as_dict()) for phase, stats in sorted(_stats.items()))}
+
+def dump(path: str):
+    with open(path, "a") as f:
+        f.write(json.dumps(snapshot(), sort_keys=True) + "\n")
+
+def _periodic_dump(now: float):
+    global _next_dump
+    _next_dump = now + _dump_interval
+    dump(_dump_path)
+
+def load_snapshots(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def diff(before: dict, after: dict) -> dict:
+    # after - before for every phase counter
+    phases = dict()
+    for phase in sorted(set(before["phases"]) | set(after["phases"])):
+        old = before["phases"].get(phase, {})
+        new = after["phases"].get(phase, {})
+        phases[phase] = dict((key, new.get(key, 0) - old.get(key, 0)) for key in ("calls", "seconds", "blocks"))
+    return {"elapsed": after["elapsed"] - before["elapsed"], "phases": phases}
+
+def format_snapshot(snapshot: dict) -> str:
+    lines = [f"{'phase':>16} {'calls':>12} {'seconds':>10} {'us/call':>9} {'blocks':>10}"]
+    for phase, stats in snapshot["phases"].items():
+        per_call = stats["seconds"] / stats["calls"] * 1e6 if stats["calls"] else 0
+        lines.append(f"{phase:>16} {stats['calls']:12d} {stats['seconds']:10.3f} {per_call:9.2f} {stats['blocks']:10d}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Last snapshot of one run, or the second run's last snapshot less the first's
+    runs = [load_snapshots(path)[-1] for path in sys.argv[1:3]]
+    print(format_snapshot(runs[0] if len(runs) == 1 else diff(runs[0], runs[1])))
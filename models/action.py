@@ -1,5 +1,6 @@
 from .card import Card 
 from .card_list import CardList
+from .card_ids import NUM_CARDS, card_id, card_from_id
 
 from abc import ABC, abstractmethod
 from typing import Literal, Tuple
@@ -12,6 +13,12 @@ Kind = Literal[
     "flip"
 ]
 
+# Integer action codes, see Action.encode
+GO_CODE = NUM_CARDS
+FLIP_CODE = GO_CODE + 2
+SELECT_MATCH_CODE = FLIP_CODE + NUM_CARDS
+SELECT_MATCHES_CODE = SELECT_MATCH_CODE + NUM_CARDS * NUM_CARDS
+
 class Action(ABC):
     def __init__(self, kind, arg):
         self.kind = kind
@@ -27,6 +34,28 @@ class Action(ABC):
     def serialize(self): 
         pass
 
+    @abstractmethod
+    def encode(self) -> int: 
+        pass
+
+    @staticmethod
+    def decode(code: int): 
+        if code < GO_CODE: 
+            return ActionThrow(card=card_from_id(code))
+        if code < FLIP_CODE: 
+            return ActionGo(option=bool(code - GO_CODE))
+        if code < SELECT_MATCH_CODE: 
+            return ActionFlip(card=card_from_id(code - FLIP_CODE))
+        if code < SELECT_MATCHES_CODE: 
+            og_card, match = divmod(code - SELECT_MATCH_CODE, NUM_CARDS)
+            return ActionSelectMatch(og_card=card_from_id(og_card), 
+                                     match=card_from_id(match))
+        code, second_match = divmod(code - SELECT_MATCHES_CODE, NUM_CARDS)
+        code, first_match = divmod(code, NUM_CARDS)
+        first_og_card, second_og_card = divmod(code, NUM_CARDS)
+        return ActionSelectMatches(og_cards=(card_from_id(first_og_card), card_from_id(second_og_card)), 
+                                   matches=(card_from_id(first_match), card_from_id(second_match)))
+
     @staticmethod
     def deserialize(serialized_action: dict): 
         kind = serialized_action[0]
@@ -67,6 +96,9 @@ class ActionThrow(Action):
             self.card.serialize()
         ])
 
+    def encode(self) -> int: 
+        return card_id(self.card)
+
 # One Match List
 class ActionSelectMatch(Action): 
 
@@ -82,6 +114,9 @@ class ActionSelectMatch(Action):
             self.match.serialize()
         ])
 
+    def encode(self) -> int: 
+        return SELECT_MATCH_CODE + card_id(self.og_card) * NUM_CARDS + card_id(self.match)
+
 # Two Match Lists 
 class ActionSelectMatches(Action): 
     def __init__(self, og_cards: Tuple[Card], matches: Tuple[Card]): 
@@ -100,6 +135,11 @@ class ActionSelectMatches(Action):
             tuple(matches.serialize())
         ])
 
+    def encode(self) -> int: 
+        code = card_id(self.og_cards[0]) * NUM_CARDS + card_id(self.og_cards[1])
+        code = code * NUM_CARDS + card_id(self.matches[0])
+        return SELECT_MATCHES_CODE + code * NUM_CARDS + card_id(self.matches[1])
+
 class ActionGo(Action): 
 
     def __init__(self, option: bool): 
@@ -111,6 +151,9 @@ class ActionGo(Action):
             self.kind, 
             self.option
         ])
+
+    def encode(self) -> int: 
+        return GO_CODE + int(self.option)
     
 class ActionFlip(Action):
     def __init__(self, card: Card): 
@@ -121,4 +164,7 @@ class ActionFlip(Action):
         return tuple([
             self.kind, 
             self.card.serialize()
-        ])
\ No newline at end of file
+        ])
+
+    def encode(self) -> int: 
+        return FLIP_CODE + card_id(self.card)
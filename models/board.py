@@ -1,24 +1,63 @@
 from .player import Player
-from .deck import Deck
+from .deck import Deck, make_rng
 from .card import Card
+from .card_ids import card_from_id
+from .center_field import CenterField
 from .card_list import CardList
 from .constants import Month
-from typing import List, Dict
+from typing import List, Optional, Union
+
+import numpy as np
 
 class Board(): 
-    def __init__(self):
+    __slots__ = ("deck", "p1", "p2", "center_cards", "curr_player")
+
+    def __init__(self, rng: Union[None, int, np.random.Generator] = None):
+        # Shuffles with rng (a seed or numpy Generator), the global random module if None 
+        rng = make_rng(rng)
         while(True):
             self.deck = Deck()
+            self.deck.shuffle(rng)
             player_one_hand, player_two_hand, center_cards = self.deck.deal()
             if not self.reset(player_one_hand, player_two_hand, center_cards): 
                 break
+        self._seat(player_one_hand, player_two_hand, center_cards)
+
+    @staticmethod
+    def from_deal(deal): 
+        # Board dealt from a sequence of 48 card ids (see models.card_ids and deals.py), 
+        # in the order Deck.deal deals them. Four of a month is not checked 
+        board = Board.__new__(Board)
+        board.deck = Deck(CardList(card_from_id(i) for i in bytes(deal)))
+        board._seat(*board.deck.deal())
+        return board
+
+    def _seat(self, player_one_hand: CardList, player_two_hand: CardList, center_cards: CardList): 
         self.p1 = Player(player_one_hand, 1)
         self.p2 = Player(player_two_hand, 2)
-        self.center_cards: Dict[Month, CardList] = dict( 
-            ((month, center_cards.of_month(month)) for month in Month)
-        )
+        self.center_cards = CenterField(center_cards)
         self.curr_player = self.p1 
 
+    @staticmethod
+    def empty(): 
+        # Board without a deal: no cards anywhere, player one to play 
+        board = Board.__new__(Board)
+        board.deck = Deck.empty()
+        board.p1 = Player(CardList(), 1)
+        board.p2 = Player(CardList(), 2)
+        board.clear_center_cards()
+        board.curr_player = board.p1
+        return board
+
+    def clone(self): 
+        board = Board.__new__(Board)
+        board.deck = self.deck.clone()
+        board.p1 = self.p1.clone()
+        board.p2 = self.p2.clone()
+        board.center_cards = self.center_cards.clone()
+        board.curr_player = board.p1 if self.curr_player is self.p1 else board.p2
+        return board
+
     def switch_turn(self):
         if self.curr_player == self.p1: 
             self.curr_player = self.p2
@@ -26,9 +65,7 @@ class Board():
             self.curr_player = self.p1
     
     def clear_center_cards(self): 
-        self.center_cards = dict(
-            (month, CardList()) for month in Month
-        )
+        self.center_cards = CenterField()
 
     def reset(self, player_one_hand, player_two_hand, center_cards):
         # Either player has 4 of same month or the center cards have 4 of same month
@@ -74,25 +111,19 @@ class Board():
         
     
     def serialize(self) -> dict: 
-        self.sort()
         return tuple((
             
             self.deck.serialize(),
             self.p1.serialize(), 
             self.p2.serialize(), 
-            tuple([
-                (int(month.value), self.center_cards[month].serialize())
-                for month in Month 
-                if self.center_cards[month] != []
-            ]),
+            self.center_cards.serialize(),
             self.curr_player.number
         ))
     
     @staticmethod
     def deserialize(serialized_board): 
 
-        board = Board()
-        board.clear_center_cards()
+        board = Board.empty()
 
         board.deck = Deck.deserialize(serialized_board[0])
         board.p1 = Player.deserialize(serialized_board[1])
@@ -115,22 +146,14 @@ class Board():
             return tuple((
                 self.p1.serialize(), 
                 self.p2.get_hidden_information(), 
-                tuple([
-                    (int(month.value), self.center_cards[month].serialize())
-                    for month in Month 
-                    if self.center_cards[month] != []
-                ]),
+                self.center_cards.serialize(),
                 self.curr_player.number
             ))
         if player_num == 2: 
             return tuple((
                 self.p1.get_hidden_information(), 
                 self.p2.serialize(), 
-                tuple([
-                    (int(month.value), self.center_cards[month].serialize())
-                    for month in Month 
-                    if self.center_cards[month] != []
-                ]),
+                self.center_cards.serialize(),
                 self.curr_player.number
             ))    
 
@@ -142,14 +165,11 @@ class Board():
             hero = self.p2 
             villain = self.p1
 
-        hero.sort()
-        villain.sort()
-
         result = f"Current Player: {self.curr_player.number}\n\n"
         result += f"Hero Num Go: {hero.num_go}\n"
         result += f"Hero Score: {hero.score}\n"
-        result  += f"Hero Hand: {hero.hand}\n"
-        result += f"Hero Captured: {hero.captured}\n\n"
+        result  += f"Hero Hand: {CardList(sorted(hero.hand))}\n"
+        result += f"Hero Captured: {CardList(sorted(hero.captured))}\n\n"
 
         result += "centercards: \n"
         for month, cards in self.center_cards.items(): 
@@ -161,7 +181,7 @@ class Board():
         
         result += f"Villain Num Go: {villain.num_go}\n"
         result += f"Villain Score: {villain.score}\n"
-        result += f"Villain Captured: {villain.captured}\n"
+        result += f"Villain Captured: {CardList(sorted(villain.captured))}\n"
         return result
 
 
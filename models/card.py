@@ -1,13 +1,50 @@
-from abc import ABC, abstractmethod
+from abc import ABC, ABCMeta, abstractmethod
 from .constants import Month, Type
 from enum import Enum 
 
+from typing import Dict
+
+# Serialized form -> the one instance of each card, filled in at import 
+_CANONICAL: Dict[str, "Card"] = dict()
+
+
+class _CanonicalCard(ABCMeta): 
+    # Constructing a card returns the canonical instance, built and frozen on first use 
+    def __call__(cls, *args, **kwargs): 
+        key = (cls, args, tuple(kwargs.items()))
+        card = cls._by_arguments.get(key)
+        if card is None: 
+            card = super().__call__(*args, **kwargs)
+            object.__setattr__(card, "_frozen", True)
+            card = _CANONICAL.setdefault(card.serialize(), card)
+            cls._by_arguments[key] = card
+        return card
+
+
+class Card(ABC, metaclass=_CanonicalCard): 
+    # Cards are immutable and there is one instance of each, so they are shared freely 
+    _by_arguments: Dict[tuple, "Card"] = dict()
+    _frozen = False
 
-class Card(ABC): 
     def __init__(self, type: Type, month: Month):
         self.type = type 
         self.month = month 
 
+    def __setattr__(self, name, value): 
+        if self._frozen: 
+            raise AttributeError(f"{self} is immutable")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self): 
+        # Unpickles to the canonical instance 
+        return (Card.deserialize, (self.serialize(),))
+
+    def __copy__(self): 
+        return self
+
+    def __deepcopy__(self, memo): 
+        return self
+
     @abstractmethod
     def __str__(self):
         pass
@@ -18,30 +55,13 @@ class Card(ABC):
     
     @staticmethod
     def deserialize(serialized_card: str): 
-        if serialized_card[0] == 'B':
-            month = int(serialized_card[1:])
-            return BrightCard(month=Month(month))
-        if serialized_card[0] == 'A': 
-            month = int(serialized_card[1:])
-            return AnimalCard(month=Month(month))
-        if serialized_card[0] == 'R': 
-            month = int(serialized_card[1:])
-            return RibbonCard(month=Month(month))
-        if serialized_card[0] == 'J': 
-            month = int(serialized_card[1:3])
-            index = int(serialized_card[3])
-            double = int(serialized_card[4])
-            return JunkCard(month=Month(month), index=index, double=double)
-        if serialized_card[0] == 'S': 
-            month = int(serialized_card[1:3])
-            type = serialized_card[3]
-            if type == 'A': 
-                return SwitchCard(month=Month(month), type=Type.ANIMAL)
-            if type == 'J': 
-                return SwitchCard(month=Month(month), type=Type.JUNK)
+        try: 
+            return _CANONICAL[serialized_card]
+        except (KeyError, TypeError): 
+            raise ValueError(f"Unknown card {serialized_card!r}") from None
 
     def __eq__(self, object) -> bool:
-        return (
+        return object is self or (
             isinstance(object, Card)
             and object.type == self.type 
             and object.month == self.month
@@ -159,9 +179,9 @@ class SwitchCard(Card):
         self.double = 1 
         self.index = 2 
     
-    def switch_type(self, type: Type): 
-        assert type == Type.ANIMAL or type == Type.JUNK
-        self.type = type
+    def with_type(self, type: Type): 
+        # The switch card as type, the type is part of the card's identity 
+        return SwitchCard(self.month, type)
 
     def __str__(self):
         if self.type == Type.JUNK:
@@ -178,6 +198,9 @@ class SwitchCard(Card):
             super().__eq__(object)
             and object.index == self.index
         )
+
+    def _sort_value(self) -> int:
+        return super()._sort_value() + self.index
     
     def serialize(self):
         if self.type == Type.ANIMAL: 
@@ -185,3 +208,25 @@ class SwitchCard(Card):
         elif self.type == Type.JUNK: 
             type = "J"
         return "S{:02d}{}".format(self.month.value, type)
+
+
+def _build_canonical_cards(): 
+    for month in BrightCard.months: 
+        BrightCard(month)
+    for month in AnimalCard.months: 
+        AnimalCard(month)
+    for month in RibbonCard.months: 
+        RibbonCard(month)
+    for month in Month: 
+        if month.value < 11: 
+            JunkCard(month, 0)
+            JunkCard(month, 1)
+    JunkCard(Month.NOV, 0)
+    JunkCard(Month.NOV, 1)
+    JunkCard(Month.NOV, 2, 1)
+    JunkCard(Month.DEC, 0, 1)
+    for month in SwitchCard.month: 
+        SwitchCard(month, Type.ANIMAL)
+        SwitchCard(month, Type.JUNK)
+
+_build_canonical_cards()
@@ -0,0 +1,146 @@
+from .card import Card, BrightCard, AnimalCard, RibbonCard, JunkCard, SwitchCard
+from .card_list import CardList
+from .constants import Month, Type
+
+from typing import Iterable, List
+
+import bisect
+
+# Every card gets a small integer id. Ids follow the CardList sort order
+# (switch card as an animal), four per month, so month = id // 4 and the
+# cards of a month are one nibble of a 48 bit mask.
+NUM_CARDS = 48
+
+def _new_card(card_id: int) -> Card:
+    return _CARD_FACTORIES[card_id]()
+
+_CARD_FACTORIES = []
+for _month in Month:
+    _factories = [lambda month=_month: JunkCard(month, index=0, double=int(month == Month.DEC))]
+    if _month != Month.DEC:
+        _factories.append(lambda month=_month: JunkCard(month, index=1))
+    if _month == Month.NOV:
+        _factories.append(lambda: JunkCard(Month.NOV, index=2, double=1))
+    if _month in RibbonCard.months:
+        _factories.append(lambda month=_month: RibbonCard(month))
+    if _month in AnimalCard.months:
+        _factories.append(lambda month=_month: AnimalCard(month))
+    if _month in SwitchCard.month:
+        _factories.append(lambda month=_month: SwitchCard(month))
+    if _month in BrightCard.months:
+        _factories.append(lambda month=_month: BrightCard(month))
+    assert len(_factories) == 4
+    _CARD_FACTORIES.extend(_factories)
+
+# Serialized form of each card (switch card as an animal) -> id
+_SERIALIZED_TO_ID = dict((_new_card(i).serialize(), i) for i in range(NUM_CARDS))
+_SERIALIZED_TO_ID["S09J"] = _SERIALIZED_TO_ID["S09A"]
+
+MONTH_MASKS = tuple(0xF << (4 * month) for month in range(12))
+ALL_CARDS_MASK = (1 << NUM_CARDS) - 1
+
+SWITCH_CARD_ID = _SERIALIZED_TO_ID["S09A"]
+SWITCH_CARD_MASK = 1 << SWITCH_CARD_ID
+
+# Card of each id, and ids by card identity: cards are canonical (see models.card)
+_CARDS = tuple(_new_card(i) for i in range(NUM_CARDS))
+_ID_BY_CARD = dict((id(card), i) for i, card in enumerate(_CARDS))
+_ID_BY_CARD[id(_CARDS[SWITCH_CARD_ID].with_type(Type.JUNK))] = SWITCH_CARD_ID
+_BIT_BY_CARD = dict((card, 1 << i) for card, i in _ID_BY_CARD.items())
+# Ids and cards of the set bits of every byte value, for each byte of a mask
+_BYTE_IDS = tuple(tuple(tuple(8 * k + i for i in range(8) if byte >> i & 1) for byte in range(256))
+                  for k in range(NUM_CARDS // 8))
+_BYTE_CARDS = tuple(tuple(tuple(_CARDS[i] for i in ids) for ids in byte_ids) for byte_ids in _BYTE_IDS)
+_SWITCH_JUNK_BEFORE = min(i for i, card in enumerate(_CARDS)
+                          if i != SWITCH_CARD_ID and _CARDS[SWITCH_CARD_ID].with_type(Type.JUNK) < card)
+
+def _mask_where(predicate) -> int:
+    mask = 0
+    for i in range(NUM_CARDS):
+        if predicate(_new_card(i)):
+            mask |= 1 << i
+    return mask
+
+# Type masks. The switch card is in none of them, scoring adds it to either
+# animals or junk.
+BRIGHT_MASK = _mask_where(lambda card: card.type == Type.BRIGHT)
+ANIMAL_MASK = _mask_where(lambda card: card.type == Type.ANIMAL) & ~SWITCH_CARD_MASK
+RIBBON_MASK = _mask_where(lambda card: card.type == Type.RIBBON)
+JUNK_MASK = _mask_where(lambda card: card.type == Type.JUNK)
+DOUBLE_JUNK_MASK = _mask_where(lambda card: card.type == Type.JUNK and card.double)
+SINGLE_JUNK_MASK = JUNK_MASK & ~DOUBLE_JUNK_MASK
+
+RED_RIBBON_MASK = _mask_where(lambda card: card.type == Type.RIBBON and card.flag == RibbonCard.Flag.RED)
+PLANT_RIBBON_MASK = _mask_where(lambda card: card.type == Type.RIBBON and card.flag == RibbonCard.Flag.PLANT)
+BLUE_RIBBON_MASK = _mask_where(lambda card: card.type == Type.RIBBON and card.flag == RibbonCard.Flag.BLUE)
+# By RibbonCard.Flag value
+RIBBON_FLAG_MASKS = tuple(_mask_where(lambda card: card.type == Type.RIBBON and card.flag == flag)
+                          for flag in sorted(RibbonCard.Flag, key=lambda flag: flag.value))
+
+DEC_BRIGHT_MASK = 1 << _SERIALIZED_TO_ID["B12"]
+GODORI_MASK = (1 << _SERIALIZED_TO_ID["A02"]) | (1 << _SERIALIZED_TO_ID["A04"]) | (1 << _SERIALIZED_TO_ID["A08"])
+
+
+def card_id(card: Card) -> int:
+    i = _ID_BY_CARD.get(id(card))
+    if i is None:
+        return _SERIALIZED_TO_ID[card.serialize()]
+    return i
+
+def card_ids_of(cards: Iterable[Card]) -> List[int]:
+    # Id of each card, in order
+    ids = _ID_BY_CARD
+    try:
+        return [ids[id(card)] for card in cards]
+    except KeyError:
+        return [card_id(card) for card in cards]
+
+def card_from_id(card_id: int, switch_type: Type = Type.ANIMAL) -> Card:
+    # Switch card gets the requested type
+    card = _CARDS[card_id]
+    if card_id == SWITCH_CARD_ID:
+        return card.with_type(switch_type)
+    return card
+
+def month_of(card_id: int) -> int:
+    # 0 based month index
+    return card_id >> 2
+
+def mask_of(cards: Iterable[Card]) -> int:
+    mask = 0
+    bits = _BIT_BY_CARD
+    for card in cards:
+        bit = bits.get(id(card))
+        mask |= bit if bit is not None else 1 << card_id(card)
+    return mask
+
+def mask_of_ids(card_ids: Iterable[int]) -> int:
+    mask = 0
+    for i in card_ids:
+        mask |= 1 << i
+    return mask
+
+def ids_of(mask: int) -> List[int]:
+    # Card ids in mask, ascending (CardList sort order)
+    ids = []
+    for byte_ids in _BYTE_IDS:
+        byte = mask & 0xFF
+        if byte:
+            ids += byte_ids[byte]
+        mask >>= 8
+    return ids
+
+def cards_of(mask: int, switch_type: Type = Type.ANIMAL) -> CardList:
+    # Sorted: ids are in sort order, but the switch card as junk sorts before _SWITCH_JUNK_BEFORE
+    if mask & SWITCH_CARD_MASK and switch_type == Type.JUNK:
+        ids = ids_of(mask)
+        ids.remove(SWITCH_CARD_ID)
+        ids.insert(bisect.bisect_left(ids, _SWITCH_JUNK_BEFORE), SWITCH_CARD_ID)
+        return CardList([card_from_id(i, switch_type) for i in ids])
+    cards = CardList()
+    for byte_cards in _BYTE_CARDS:
+        byte = mask & 0xFF
+        if byte:
+            cards += byte_cards[byte]
+        mask >>= 8
+    return cards
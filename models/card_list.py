@@ -19,8 +19,8 @@ class CardList(list):
         return CardList(self)
         
     def serialize(self): 
-        self.sort()
-        return tuple([card.serialize() for card in self])
+        # Sorted, without reordering the list itself 
+        return tuple([card.serialize() for card in sorted(self)])
     
     @staticmethod
     def deserialize(serialized_cardList): 
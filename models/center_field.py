@@ -0,0 +1,109 @@
+from .card import Card
+from .card_ids import cards_of
+from .card_list import CardList
+from .constants import Month
+
+from typing import Iterable
+
+NUM_MONTHS = len(Month)
+# Cards of each month by the month's four bits of a card mask
+_MONTH_CARDS = tuple(tuple(tuple(cards_of(bits << 4 * index)) for bits in range(16)) for index in range(NUM_MONTHS))
+
+class CenterField():
+    # Center cards in twelve month slots, with a count per month and a mask of
+    # occupied months (bit month.value - 1), so the sweep test and match lookups
+    # are O(1). center[month] is the slot of that month, change it only through
+    # add/remove/clear or assignment so the counts stay right
+    __slots__ = ("slots", "counts", "occupied")
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.slots = [CardList() for _ in range(NUM_MONTHS)]
+        self.counts = bytearray(NUM_MONTHS)
+        self.occupied = 0
+        for card in cards:
+            self.add(card)
+
+    @staticmethod
+    def from_mask(mask: int):
+        # Center holding the cards of a card mask (see models.card_ids), sorted in each month
+        center = CenterField.__new__(CenterField)
+        center.slots = [CardList(month_cards[mask >> 4 * index & 0xF])
+                        for index, month_cards in enumerate(_MONTH_CARDS)]
+        center.counts = bytearray(map(len, center.slots))
+        center.occupied = 0
+        for index in range(NUM_MONTHS):
+            if mask >> 4 * index & 0xF:
+                center.occupied |= 1 << index
+        return center
+
+    def clone(self):
+        center = CenterField.__new__(CenterField)
+        center.slots = [CardList(cards) for cards in self.slots]
+        center.counts = bytearray(self.counts)
+        center.occupied = self.occupied
+        return center
+
+    def add(self, card: Card):
+        index = card.month.value - 1
+        self.slots[index].append(card)
+        self.counts[index] += 1
+        self.occupied |= 1 << index
+
+    def remove(self, card: Card):
+        index = card.month.value - 1
+        self.slots[index].remove(card)
+        self.counts[index] -= 1
+        if not self.counts[index]:
+            self.occupied &= ~(1 << index)
+
+    def clear(self, month: Month) -> CardList:
+        # Empties the slot of month, returns its cards
+        index = month.value - 1
+        cards = self.slots[index]
+        self.slots[index] = CardList()
+        self.counts[index] = 0
+        self.occupied &= ~(1 << index)
+        return cards
+
+    def count(self, month: Month) -> int:
+        return self.counts[month.value - 1]
+
+    def is_empty(self) -> bool:
+        return not self.occupied
+
+    def __len__(self):
+        return sum(self.counts)
+
+    # Dict of month -> CardList view, as center_cards was
+
+    def __getitem__(self, month: Month) -> CardList:
+        return self.slots[month.value - 1]
+
+    def __setitem__(self, month: Month, cards: CardList):
+        index = month.value - 1
+        self.slots[index] = CardList(cards)
+        self.counts[index] = len(cards)
+        if cards:
+            self.occupied |= 1 << index
+        else:
+            self.occupied &= ~(1 << index)
+
+    def __iter__(self):
+        return iter(Month)
+
+    def keys(self):
+        return list(Month)
+
+    def values(self):
+        return list(self.slots)
+
+    def items(self):
+        return list(zip(Month, self.slots))
+
+    def serialize(self) -> tuple:
+        # (month value, serialized cards) of the occupied months
+        return tuple([
+            (month.value, self.slots[month.value - 1].serialize())
+            for month in Month
+            if self.occupied >> (month.value - 1) & 1
+        ])
@@ -9,28 +9,64 @@ from .card_list import CardList
 from .constants import Month
 
 import random
-import copy
+import numpy as np
 
-class Deck(): 
-    def __init__(self, deck: CardList = None):
+from typing import Optional, Union
+
+def make_rng(rng: Union[None, int, np.random.Generator]) -> Optional[np.random.Generator]: 
+    # None keeps the global random module, a seed becomes a numpy Generator 
+    if rng is None: 
+        return None
+    return np.random.default_rng(rng)
+
+# Every card once, in the order a new Deck holds them. Shared, never changed 
+FULL_DECK = CardList(
+    [BrightCard(month) for month in BrightCard.months] + 
+    [AnimalCard(month) for month in AnimalCard.months] + 
+    [RibbonCard(month) for month in RibbonCard.months] + 
+    [JunkCard(month, index) for month in Month if month.value < 11 for index in range(0,2)] + 
+    [JunkCard(Month.NOV, index=0), JunkCard(Month.NOV, index=1), JunkCard(Month.NOV, index=2, double=1)] + 
+    [JunkCard(Month.DEC, index=0, double=1)] + 
+    [SwitchCard(month) for month in SwitchCard.month]
+)
+
+def _shuffled(cards: CardList, rng: Optional[np.random.Generator]) -> CardList: 
+    if rng is None: 
+        cards = CardList(cards)
+        random.shuffle(cards)
+        return cards
+    return CardList(cards[i] for i in rng.permutation(len(cards)))
 
-        bright_cards = CardList(BrightCard(month) for month in BrightCard.months)
-        animal_cards = CardList(AnimalCard(month) for month in AnimalCard.months)
-        ribbon_cards = CardList(RibbonCard(month) for month in RibbonCard.months)
-        junk_cards = CardList([JunkCard(month, index) for month in Month if month.value < 11 for index in range(0,2)] + 
-                              [JunkCard(Month.NOV, index=0), JunkCard(Month.NOV, index=1), JunkCard(Month.NOV, index=2, double=1)] + 
-                              [JunkCard(Month.DEC, index=0, double=1)])
-        switch_card = CardList(SwitchCard(month) for month in SwitchCard.month)
+class Deck(): 
+    __slots__ = ("full_deck", "max_cards", "deck")
 
-        self.full_deck = CardList(bright_cards + animal_cards + ribbon_cards + junk_cards + switch_card)
+    def __init__(self, deck: CardList = None):
+        self.full_deck = FULL_DECK
         self.max_cards = 48
-        if not deck: 
-            self.deck = CardList(bright_cards + animal_cards + ribbon_cards + junk_cards + switch_card)
+        if deck is None: 
+            self.deck = CardList(FULL_DECK)
         else: 
             self.deck = deck
 
-    def shuffle(self): 
-        random.shuffle(self.deck)
+    @staticmethod
+    def empty(): 
+        # Deck with no cards left 
+        deck = Deck.__new__(Deck)
+        deck.full_deck = FULL_DECK
+        deck.max_cards = 48
+        deck.deck = CardList()
+        return deck
+
+    def clone(self): 
+        # full_deck is never changed so it is shared 
+        deck = Deck.__new__(Deck)
+        deck.full_deck = self.full_deck
+        deck.max_cards = self.max_cards
+        deck.deck = CardList(self.deck)
+        return deck
+
+    def shuffle(self, rng: Optional[np.random.Generator] = None): 
+        self.deck = _shuffled(self.deck, rng)
 
     def __len__(self):
         return len(self.deck)
@@ -51,10 +87,10 @@ class Deck():
                 CardList(sorted(player_two_hand)),
                 CardList(sorted(open_cards)))
     
-    def specified_deal(self, num_playerOne_cards, num_playerTwo_cards, num_center_cards): 
+    def specified_deal(self, num_playerOne_cards, num_playerTwo_cards, num_center_cards, 
+                       rng: Optional[np.random.Generator] = None): 
         while True:
-            copy_deck = self.deck.copy()
-            random.shuffle(copy_deck)
+            copy_deck = _shuffled(self.deck, rng)
             num_cards = 0 
             player_one_hand = copy_deck[:num_cards + num_playerOne_cards]
             num_cards += num_playerOne_cards
@@ -75,7 +111,6 @@ class Deck():
         self.deck.sort()
 
     def serialize(self) -> list: 
-        self.deck.sort()
         return CardList.serialize(self.deck)
 
     @staticmethod
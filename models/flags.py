@@ -1,10 +1,17 @@
 class Flags: 
+    __slots__ = ("go", "select_match")
     
     def __init__(self):
 
         self.go = False 
         self.select_match = False 
     
+    def clone(self): 
+        flags = Flags()
+        flags.go = self.go 
+        flags.select_match = self.select_match
+        return flags
+
     def serialize(self) -> tuple:
 
         return tuple((
@@ -1,10 +1,29 @@
 from .card import Card, BrightCard, AnimalCard, RibbonCard, SwitchCard
 from .card_list import CardList
 from .constants import Type, Month
+from .card_ids import (BRIGHT_MASK, 
+                       DEC_BRIGHT_MASK, 
+                       ANIMAL_MASK, 
+                       GODORI_MASK, 
+                       RIBBON_MASK, 
+                       RIBBON_FLAG_MASKS, 
+                       SINGLE_JUNK_MASK, 
+                       DOUBLE_JUNK_MASK, 
+                       SWITCH_CARD_ID, 
+                       SWITCH_CARD_MASK, 
+                       card_from_id, 
+                       cards_of)
+from .score_table import SCORE_TABLE, SCORE_MASK, SWITCH_JUNK_FLAG, composition_key
 
-from typing import List
+from typing import List, Iterable, Optional, Tuple
+
+GODORI_MONTHS = (Month.FEB, Month.APR, Month.AUG)
 
 class Player(): 
+    __slots__ = ("number", "hand", "_captured", "score", "shaked", "num_go", "num_ssa", 
+                 "_num_bright", "_num_dec_bright", "_num_animal", "_num_godori", 
+                 "_num_ribbon", "_num_ribbon_flag", "_junk_weight", "_switch_card")
+
     def __init__(self, hand: CardList, number: int):
         assert number == 1 or number == 2 
         self.number = number
@@ -15,7 +34,104 @@ class Player():
         self.shaked = False 
         self.num_go = 0 
         self.num_ssa = 0 
+
+    @staticmethod
+    def from_masks(number: int, hand: int, captured: int, switch_type: Type = Type.ANIMAL): 
+        # Player holding the cards of two card masks (see models.card_ids) 
+        player = Player.__new__(Player)
+        player.number = number
+        player.hand = cards_of(hand)
+        player.set_captured_mask(captured, switch_type)
+        player.score = 0 
+        player.shaked = False 
+        player.num_go = 0 
+        player.num_ssa = 0 
+        return player
+
+    def clone(self): 
+        # Copy of the lists and counts, cards are shared 
+        player = Player.__new__(Player)
+        player.number = self.number
+        player.hand = CardList(self.hand)
+        player._captured = CardList(self._captured)
+        player.score = self.score
+        player.shaked = self.shaked
+        player.num_go = self.num_go
+        player.num_ssa = self.num_ssa
+        player._num_bright = self._num_bright
+        player._num_dec_bright = self._num_dec_bright
+        player._num_animal = self._num_animal
+        player._num_godori = self._num_godori
+        player._num_ribbon = self._num_ribbon
+        player._num_ribbon_flag = self._num_ribbon_flag.copy()
+        player._junk_weight = self._junk_weight
+        player._switch_card = self._switch_card
+        return player
     
+    @property
+    def captured_switch_card(self) -> Optional[SwitchCard]: 
+        return self._switch_card
+
+    @property
+    def captured(self) -> CardList: 
+        return self._captured
+
+    @captured.setter
+    def captured(self, cards: CardList): 
+        # Reset running counts of captured cards, kept up to date by capture and take_junk
+        self._captured = cards
+        self._num_bright = 0 
+        self._num_dec_bright = 0 
+        self._num_animal = 0 # Without switch card 
+        self._num_godori = 0 
+        self._num_ribbon = 0 
+        self._num_ribbon_flag = [0] * len(RibbonCard.Flag)
+        self._junk_weight = 0 # Without switch card 
+        self._switch_card: Optional[SwitchCard] = None
+        for card in cards: 
+            self._count(card, 1)
+
+    def set_captured_mask(self, mask: int, switch_type: Type = Type.ANIMAL): 
+        # Same as setting captured to cards_of(mask, switch_type), with the counts read off the mask 
+        self._captured = cards_of(mask, switch_type)
+        self._num_bright = (mask & BRIGHT_MASK).bit_count()
+        self._num_dec_bright = (mask & DEC_BRIGHT_MASK).bit_count()
+        self._num_animal = (mask & ANIMAL_MASK).bit_count()
+        self._num_godori = (mask & GODORI_MASK).bit_count()
+        self._num_ribbon = (mask & RIBBON_MASK).bit_count()
+        self._num_ribbon_flag = [(mask & flag_mask).bit_count() for flag_mask in RIBBON_FLAG_MASKS]
+        self._junk_weight = (mask & SINGLE_JUNK_MASK).bit_count() + 2 * (mask & DOUBLE_JUNK_MASK).bit_count()
+        self._switch_card = card_from_id(SWITCH_CARD_ID, switch_type) if mask & SWITCH_CARD_MASK else None
+
+    def capture(self, cards: Iterable[Card]): 
+        for card in cards: 
+            self._captured.append(card)
+            self._count(card, 1)
+
+    def uncapture(self, num_captured: int): 
+        # Drop captures back to the first num_captured cards, for GoStop.undo
+        while len(self._captured) > num_captured: 
+            card = self._captured.pop()
+            self._count(card, -1)
+
+    def _count(self, card: Card, count: int): 
+        # Add (count=1) or remove (count=-1) card from the running counts
+        if isinstance(card, SwitchCard): 
+            self._switch_card = card if count > 0 else None
+        elif card.type == Type.BRIGHT: 
+            self._num_bright += count 
+            if card.month == Month.DEC: 
+                self._num_dec_bright += count
+        elif card.type == Type.ANIMAL: 
+            self._num_animal += count 
+            if card.month in GODORI_MONTHS: 
+                self._num_godori += count
+        elif card.type == Type.RIBBON: 
+            self._num_ribbon += count 
+            self._num_ribbon_flag[card.flag.value] += count
+        else: 
+            self._junk_weight += count * (card.double + 1)
+
     def __str__(self):
         # Sort Captured into groups 
         captured = self.captured.copy() 
@@ -34,7 +150,6 @@ class Player():
                 f"Num_go: {self.num_go}"
     
     def serialize(self) -> tuple: 
-        self.sort()
         return tuple([
             self.number, 
             self.hand.serialize(),
@@ -69,102 +184,120 @@ class Player():
         self.captured.sort()
 
     def switch_card(self, card: Card, type: Type): 
-        # Switch card to junk or animal
+        # Switch captured card to junk or animal
+        # Cards are shared between copies of a game, so the card is replaced instead of changed 
         assert isinstance(card, SwitchCard)
-        card.switch_type(type)                
+        if card.type != type: 
+            self._replace_switch_card(card, card.with_type(type))
+
+    def restore_switch_card(self, card: Optional[SwitchCard]): 
+        # Put back the captured switch card from before a GoStop.play 
+        if card is not None and self._switch_card is not card: 
+            self._replace_switch_card(self._switch_card, card)
+
+    def _replace_switch_card(self, card: SwitchCard, new_card: SwitchCard): 
+        index = next(index for index, captured in enumerate(self._captured) if captured is card)
+        self._captured[index] = new_card
+        self._switch_card = new_card
 
     # TODO: implement idea that when taking switch card, opponent can choose whether to keep as animal or give
-    def take_junk(self, opponent):
+    def take_junk(self, opponent) -> Optional[Tuple[Card, int]]:
+        # Returns (card, index in opponent's captured) of junk taken
         assert isinstance(opponent, Player)
-        opponent_junk_cards = [card for card in opponent.captured if card.type == Type.JUNK]
+        opponent_junk_cards = sorted(card for card in opponent.captured if card.type == Type.JUNK)
         if opponent_junk_cards:
-            for card in opponent_junk_cards: 
-                if not card.double: # Give single point junk card 
-                    self.captured.append(card)
-                    opponent.captured.remove(card)
-                    return 
-            # Only double cards in opponent's captured
-            card = opponent_junk_cards.pop() 
-            self.captured.append(card)
+            # Give lowest single point junk card, lowest double if only double cards in opponent's captured
+            single_junk_cards = [card for card in opponent_junk_cards if not card.double]
+            card = single_junk_cards[0] if single_junk_cards else opponent_junk_cards[0]
+            index = opponent.captured.index(card)
+            del opponent.captured[index]
+            opponent._count(card, -1)
+            self.capture([card])
+            return card, index
+        return None
+
+    def undo_take_junk(self, opponent, card: Card, index: int): 
+        # Give card taken by take_junk back to opponent 
+        assert self._captured[-1] is card
+        self._captured.pop()
+        self._count(card, -1)
+        opponent.captured.insert(index, card)
+        opponent._count(card, 1)
         
     # Scoring Methods for Player 
     def update_score(self): 
-        switch_card = [card for card in self.captured if isinstance(card, SwitchCard)]
-        if switch_card: 
-            sw_card = switch_card[0]
-            # Maximize for either type 
-            self.switch_card(card=sw_card, type=Type.ANIMAL)
-            animal_score = self.calculate_score()
-            self.switch_card(card=sw_card, type=Type.JUNK)
-            junk_score = self.calculate_score() 
-
-            if junk_score < animal_score: 
-                self.switch_card(card=sw_card, type=Type.ANIMAL)
-                self.score = animal_score
-            else: 
-                self.score = junk_score
-        else: 
-            self.score = self.calculate_score()
+        # Table lookup, switch card set to whichever type maximizes the score 
+        entry = SCORE_TABLE[self.composition_key()]
+        self.score = entry & SCORE_MASK
+        if self._switch_card: 
+            self.switch_card(card=self._switch_card, 
+                             type=Type.JUNK if entry & SWITCH_JUNK_FLAG else Type.ANIMAL)
+
+    def composition_key(self) -> int: 
+        ribbon_sets = 0 
+        for index, flag in enumerate((RibbonCard.Flag.RED, RibbonCard.Flag.PLANT, RibbonCard.Flag.BLUE)): 
+            if self._num_ribbon_flag[flag.value] == 3: 
+                ribbon_sets |= 1 << index
+        return composition_key(self._num_bright, 
+                               self._num_dec_bright, 
+                               self._num_animal, 
+                               int(self._num_godori == len(GODORI_MONTHS)), 
+                               self._num_ribbon, 
+                               ribbon_sets, 
+                               self._junk_weight, 
+                               int(self._switch_card is not None))
 
     def calculate_score(self): 
         return self.bright_points() + self.animal_points() + self.ribbon_points() + self.junk_points()
     
     def bright_points(self): 
-        bright_cards = [card for card in self.captured if card.type == Type.BRIGHT]
-        if len(bright_cards) < 3: 
+        if self._num_bright < 3: 
             return 0 
-        if len(bright_cards) == 3 and BrightCard(Month.DEC) in bright_cards: 
+        if self._num_bright == 3 and self._num_dec_bright: 
             return 2 
-        if len(bright_cards) == 5: 
+        if self._num_bright == 5: 
             return 15 
         
-        return len(bright_cards)
+        return self._num_bright
     
     def animal_points(self): 
         points = 0 
-        animal_cards = [card for card in self.captured if card.type == Type.ANIMAL]
+        num_animal = self._num_animal
+        if self._switch_card and self._switch_card.type == Type.ANIMAL: 
+            num_animal += 1 
 
-        if len(animal_cards) >= 5: 
-            points += len(animal_cards) - 4 
+        if num_animal >= 5: 
+            points += num_animal - 4 
 
         # Check for Godori 
-        godori_cards = [AnimalCard(Month.FEB), AnimalCard(Month.APR), AnimalCard(Month.AUG)]
-        godori = all(card in animal_cards for card in godori_cards)
-        if godori:
+        if self._num_godori == len(GODORI_MONTHS):
             points += 5 
         
         return points 
     
     def ribbon_points(self): 
         points = 0 
-        ribbon_cards = [card for card in self.captured if card.type == Type.RIBBON]
 
-        if len(ribbon_cards) >= 5: 
-            points += len(ribbon_cards) - 4 
+        if self._num_ribbon >= 5: 
+            points += self._num_ribbon - 4 
         
         # Check for Cheong Dan (all 3 blue)
-        blue_ribbon_cards = [card for card in ribbon_cards if card.flag == RibbonCard.Flag.BLUE]
-        if len(blue_ribbon_cards) == 3: 
+        if self._num_ribbon_flag[RibbonCard.Flag.BLUE.value] == 3: 
             points += 3 
         
         # Check for Hong Dan (all 3 red w/ poetry)
-        red_ribbon_cards = [card for card in ribbon_cards if card.flag == RibbonCard.Flag.RED]
-        if len(red_ribbon_cards) == 3: 
+        if self._num_ribbon_flag[RibbonCard.Flag.RED.value] == 3: 
             points += 3 
         
         # Check for Cho Dan (Plant flags)
-        plant_ribbon_cards = [card for card in ribbon_cards if card.flag == RibbonCard.Flag.PLANT]
-        if len(plant_ribbon_cards) == 3: 
+        if self._num_ribbon_flag[RibbonCard.Flag.PLANT.value] == 3: 
             points += 3 
         
         return points 
     
     def junk_points(self): 
-        total = 0 
-        junk_cards = [card for card in self.captured if card.type == Type.JUNK]
+        total = self.num_junk()
         points = 0
-        for card in junk_cards: 
-            total += card.double + 1 
         
         if (total >= 10):
             points = total - 9
@@ -172,14 +305,10 @@ class Player():
         return points 
 
     def num_junk(self):
-        total = 0 
-        junk_cards = [card for card in self.captured if card.type == Type.JUNK]
-        for card in junk_cards: 
-            total += card.double + 1 
+        total = self._junk_weight
+        if self._switch_card and self._switch_card.type == Type.JUNK: 
+            total += self._switch_card.double + 1 
         return total
     
     def num_bright(self): 
-        bright_cards = [card for card in self.captured if card.type == Type.BRIGHT]
-        return len(bright_cards)
-        
-        
+        return self._num_bright
@@ -0,0 +1,130 @@
+from .constants import Month
+
+import numpy as np
+
+# Score of a captured pile by composition, built once at import time.
+# A pile is described by
+#   num_bright (0-5), dec_bright (0/1), num_animal without the switch card (0-8),
+#   godori (0/1), num_ribbon (0-10), ribbon_sets (completed red | plant << 1 | blue << 2),
+#   junk_weight without the switch card (0-26) and switch (0/1, switch card captured)
+# Each entry holds the score in the low bits and SWITCH_JUNK_FLAG when the
+# switch card scores best as junk (ties go to junk, as in Player.update_score).
+COMPOSITION_SHAPE = (6, 2, 9, 2, 11, 8, 27, 2)
+SWITCH_JUNK_FLAG = 0x80
+SCORE_MASK = 0x7F
+
+def composition_key(num_bright: int, dec_bright: int, num_animal: int, godori: int,
+                    num_ribbon: int, ribbon_sets: int, junk_weight: int, switch: int) -> int:
+    key = num_bright * 2 + dec_bright
+    key = key * 9 + num_animal
+    key = key * 2 + godori
+    key = key * 11 + num_ribbon
+    key = key * 8 + ribbon_sets
+    key = key * 27 + junk_weight
+    return key * 2 + switch
+
+def _build_score_array() -> np.ndarray:
+    num_bright = np.arange(6)[:, None]
+    dec_bright = np.arange(2)[None, :]
+    bright = np.where(num_bright < 3, 0, np.where(num_bright == 5, 15, num_bright))
+    bright = np.where((num_bright == 3) & (dec_bright == 1), 2, bright)
+
+    num_ribbon = np.arange(11)[:, None]
+    ribbon_sets = np.arange(8)[None, :]
+    num_sets = (ribbon_sets & 1) + (ribbon_sets >> 1 & 1) + (ribbon_sets >> 2 & 1)
+    ribbon = np.maximum(num_ribbon - 4, 0) + 3 * num_sets
+
+    def animal_points(num_animal, godori):
+        return np.maximum(num_animal - 4, 0) + 5 * godori
+
+    def junk_points(junk_weight):
+        return np.maximum(junk_weight - 9, 0)
+
+    num_animal = np.arange(9)[:, None, None]
+    godori = np.arange(2)[None, :, None]
+    junk_weight = np.arange(27)[None, None, :]
+    no_switch = animal_points(num_animal, godori) + junk_points(junk_weight)
+    switch_animal = animal_points(num_animal + 1, godori) + junk_points(junk_weight)
+    switch_junk = animal_points(num_animal, godori) + junk_points(junk_weight + 2)
+    with_switch = np.where(switch_junk < switch_animal, switch_animal, switch_junk | SWITCH_JUNK_FLAG)
+    animal_junk = np.stack([no_switch, with_switch], axis=-1)
+
+    scores = (bright[:, :, None, None, None, None, None, None]
+              + ribbon[None, None, None, None, :, :, None, None]
+              + animal_junk[None, None, :, :, None, None, :, :])
+    assert scores.shape == COMPOSITION_SHAPE
+    return scores.astype(np.uint8).reshape(-1)
+
+# ndarray for batched lookups, bytes for fast scalar indexing
+SCORE_ARRAY = _build_score_array()
+SCORE_TABLE = SCORE_ARRAY.tobytes()
+
+
+def check_score_table():
+    # Compare the table against Player's scoring methods on every composition that can occur
+    from .card import BrightCard, AnimalCard, RibbonCard, JunkCard, SwitchCard
+    from .card_list import CardList
+    from .constants import Type
+    from .player import Player, GODORI_MONTHS
+
+    dec_bright = BrightCard(Month.DEC)
+    other_brights = [BrightCard(month) for month in BrightCard.months if month != Month.DEC]
+    godori_animals = [AnimalCard(month) for month in GODORI_MONTHS]
+    other_animals = [AnimalCard(month) for month in AnimalCard.months if month not in GODORI_MONTHS]
+    ribbon_sets = [[RibbonCard(month) for month in RibbonCard.months if RibbonCard(month).flag == flag]
+                   for flag in (RibbonCard.Flag.RED, RibbonCard.Flag.PLANT, RibbonCard.Flag.BLUE)]
+    null_ribbons = [RibbonCard(month) for month in RibbonCard.months if RibbonCard(month).flag == RibbonCard.Flag.NULL]
+    double_junk = [JunkCard(Month.NOV, index=2, double=1), JunkCard(Month.DEC, index=0, double=1)]
+    single_junk = [JunkCard(month, index) for month in Month if month.value < 12 for index in range(2)]
+
+    brights = [((num, dec), [dec_bright] * dec + other_brights[:num - dec])
+               for num in range(6) for dec in range(2)
+               if dec <= num and num - dec <= len(other_brights)]
+    animals = [((num, 1), godori_animals + other_animals[:num - 3]) for num in range(3, 9)]
+    animals += [((num, 0), other_animals[:num] + godori_animals[:max(0, num - len(other_animals))])
+                for num in range(8)]
+    ribbons = []
+    for sets in range(8):
+        complete = [ribbon_set for index, ribbon_set in enumerate(ribbon_sets) if sets >> index & 1]
+        spare = [card for index, ribbon_set in enumerate(ribbon_sets) if not sets >> index & 1
+                 for card in ribbon_set[:2]] + null_ribbons
+        for num_spare in range(len(spare) + 1):
+            cards = [card for ribbon_set in complete for card in ribbon_set] + spare[:num_spare]
+            ribbons.append(((len(cards), sets), cards))
+    junks = []
+    for weight in range(27):
+        num_double = min(len(double_junk), weight // 2)
+        junks.append((weight, double_junk[:num_double] + single_junk[:weight - 2 * num_double]))
+
+    num_checked = 0
+    for (num_bright, dec), bright_cards in brights:
+        for (num_animal, godori), animal_cards in animals:
+            for (num_ribbon, sets), ribbon_cards in ribbons:
+                for weight, junk_cards in junks:
+                    for switch in range(2):
+                        captured = CardList(bright_cards + animal_cards + ribbon_cards + junk_cards)
+                        if switch:
+                            captured.append(SwitchCard(Month.SEP))
+                        player = Player(CardList(), 1)
+                        player.captured = captured
+                        key = composition_key(num_bright, dec, num_animal, godori, num_ribbon, sets, weight, switch)
+                        assert player.composition_key() == key
+                        entry = SCORE_TABLE[key]
+
+                        if switch:
+                            sw_card = captured[-1]
+                            scores = []
+                            for type in (Type.ANIMAL, Type.JUNK):
+                                player.switch_card(sw_card, type)
+                                scores.append(player.calculate_score())
+                            expected_junk = not scores[1] < scores[0]
+                            assert bool(entry & SWITCH_JUNK_FLAG) == expected_junk, (key, scores)
+                            assert entry & SCORE_MASK == max(scores), (key, scores)
+                        else:
+                            assert entry == player.calculate_score(), key
+                        num_checked += 1
+    return num_checked
+
+
+if __name__ == "__main__":
+    print(f"Score table matches Player scoring on {check_score_table()} compositions")
@@ -0,0 +1,37 @@
+from .card import Card
+from .card_ids import NUM_CARDS, SWITCH_CARD_ID, card_from_id
+from .constants import Type
+
+from typing import Iterable
+
+import numpy as np
+
+# Zobrist keys: one random 64 bit key per (location, card id). A position hashes
+# to the xor of the keys of where every card is, so moving a card updates the
+# hash with two xors and the order cards were moved in does not matter.
+# Locations are the hands, the center, the captured piles, then every deck
+# position (counted from the bottom, which flips never change).
+HAND = (0, 1)
+CENTER = 2
+CAPTURED = (3, 4)
+DECK = 5
+NUM_LOCATIONS = DECK + NUM_CARDS
+
+# Fixed seed, so hashes are the same in every process
+ZOBRIST_KEYS = tuple(
+    tuple(row) for row in
+    np.random.default_rng(0x60570).integers(0, 2**64, size=(NUM_LOCATIONS, NUM_CARDS), dtype=np.uint64).tolist()
+)
+HASH_MASK = 2**64 - 1
+
+# Keys by id() of the card, as cards are canonical (see models.card)
+_CARD_IDS = [(id(card_from_id(i)), i) for i in range(NUM_CARDS)]
+_CARD_IDS.append((id(card_from_id(SWITCH_CARD_ID).with_type(Type.JUNK)), SWITCH_CARD_ID))
+CARD_KEYS = tuple(dict((card, keys[i]) for card, i in _CARD_IDS) for keys in ZOBRIST_KEYS)
+
+def cards_hash(location: int, cards: Iterable[Card]) -> int:
+    keys = CARD_KEYS[location]
+    h = 0
+    for card in cards:
+        h ^= keys[id(card)]
+    return h
@@ -0,0 +1,313 @@
+import numpy as np
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class NodeGroup():
+    # Rows of regret, strategy and strategy sums for all info sets with the same number of actions
+    __slots__ = ("num_actions", "size", "regretSum", "strategySum", "strategy", "infoSets", "stamps")
+
+    def __init__(self, num_actions: int, capacity: int = 1024, dtype=np.float64):
+        self.num_actions = num_actions
+        self.size = 0
+        self.regretSum = np.zeros((capacity, num_actions), dtype=dtype)
+        self.strategySum = np.zeros((capacity, num_actions), dtype=dtype)
+        self.strategy = np.zeros((capacity, num_actions), dtype=dtype)
+        self.infoSets: List[bytes] = []
+        # Per row, the update rule's clock when it last brought the row up to date, 0 when settled
+        self.stamps = np.zeros(capacity, dtype=np.int64)
+
+    def add(self, infoSet) -> int:
+        if self.size == self.regretSum.shape[0]:
+            self._grow()
+        row = self.size
+        self.size += 1
+        self.infoSets.append(infoSet)
+        return row
+
+    def _grow(self):
+        # Double the capacity, rows already handed out keep their index
+        self._grow_to(2 * self.regretSum.shape[0])
+
+    def _grow_to(self, capacity: int):
+        for name in ("regretSum", "strategySum", "strategy"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, self.num_actions), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        stamps = np.zeros(capacity, dtype=np.int64)
+        stamps[:self.size] = self.stamps[:self.size]
+        self.stamps = stamps
+
+    def __getstate__(self):
+        # Only the rows in use
+        return (self.num_actions, self.size, self.regretSum[:self.size], self.strategySum[:self.size],
+                self.strategy[:self.size], self.infoSets)
+
+    def __setstate__(self, state):
+        # Pickled settled (GoStopAI.train settles the table when it finishes), so no stamps
+        self.num_actions, self.size, self.regretSum, self.strategySum, self.strategy, self.infoSets = state
+        self.stamps = np.zeros(self.size, dtype=np.int64)
+        if self.size == 0:
+            self._grow_to(1)
+
+    def regret_matching(self) -> np.ndarray:
+        # Current strategy of every row from positive regrets, uniform where there are none
+        positive = np.maximum(self.regretSum[:self.size], 0)
+        normalizingSum = positive.sum(axis=1, keepdims=True)
+        uniform = np.full_like(positive, 1 / max(self.num_actions, 1))
+        return np.divide(positive, normalizingSum, out=uniform, where=normalizingSum > 0)
+
+    def average_strategy(self) -> np.ndarray:
+        strategySum = self.strategySum[:self.size]
+        normalizingSum = strategySum.sum(axis=1, keepdims=True)
+        uniform = np.full_like(strategySum, 1 / max(self.num_actions, 1))
+        return np.divide(strategySum, normalizingSum, out=uniform, where=normalizingSum > 0)
+
+
+class GoStopNode():
+    # View of one row of a NodeGroup, a node made directly gets a group of its own
+    __slots__ = ("group", "row", "infoSet")
+
+    def __init__(self, num_actions, infoSet: bytes, group: Optional[NodeGroup] = None, row: Optional[int] = None):
+        if group is None:
+            group = NodeGroup(num_actions, capacity=1)
+            row = group.add(infoSet)
+        self.group = group
+        self.row = row
+        self.infoSet = infoSet
+
+    @property
+    def regretSum(self) -> np.ndarray:
+        return self.group.regretSum[self.row]
+
+    @regretSum.setter
+    def regretSum(self, value):
+        self.group.regretSum[self.row] = value
+
+    @property
+    def strategySum(self) -> np.ndarray:
+        return self.group.strategySum[self.row]
+
+    @strategySum.setter
+    def strategySum(self, value):
+        self.group.strategySum[self.row] = value
+
+    @property
+    def strategy(self) -> np.ndarray:
+        return self.group.strategy[self.row]
+
+    @strategy.setter
+    def strategy(self, value):
+        self.group.strategy[self.row] = value
+
+    def get_strategy(self, realizationWeight):
+        # Regret matching in place on the node's rows
+        strategy = self.strategy
+        np.maximum(self.regretSum, 0, out=strategy)
+        normalizingSum = np.sum(strategy)
+
+        if normalizingSum > 0:
+            strategy /= normalizingSum
+        elif strategy.shape[0]:
+            # Dead end states (deck and hands empty without a winner) have no actions
+            strategy.fill(1 / strategy.shape[0])
+
+        strategySum = self.strategySum
+        strategySum += realizationWeight * strategy
+
+        return strategy
+
+    def get_average_strategy(self):
+        normalizingSum = np.sum(self.strategySum)
+        average_strategy = np.copy(self.strategySum)
+        if normalizingSum > 0:
+            average_strategy /= normalizingSum
+        else:
+            average_strategy = np.ones_like(self.strategy) / len(self.strategy)
+
+        return average_strategy
+
+    def __getstate__(self):
+        return {
+            "infoSet": self.infoSet,
+            "regretSum": self.regretSum.copy(),
+            "strategySum": self.strategySum.copy(),
+            "strategy": self.strategy.copy()
+        }
+
+    def __setstate__(self, state):
+        # Also reads nodes pickled before nodes were views
+        regretSum = np.asarray(state["regretSum"])
+        self.__init__(regretSum.shape[0], state["infoSet"])
+        self.regretSum = regretSum
+        self.strategySum = state["strategySum"]
+        self.strategy = state["strategy"]
+
+    def __str__(self):
+        return f'{self.infoSet}: {self.get_average_strategy()}'
+
+
+class NodeStore():
+    """Regrets and strategies of all info sets, in one NodeGroup per number of actions.
+
+    Behaves like the dict of GoStopNode it replaces: lookups return a
+    GoStopNode viewing the info set's row, and assigning a node copies
+    its values in. regret_matching and average_strategy work on the
+    whole table at once.
+    """
+    # While a checkpoint is open: (num_actions, row) -> (regretSum, strategySum) of every row
+    # from before the checkpoint, as it was when get first handed it out since
+    _saved: Optional[Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]] = None
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = dtype
+        self.groups: Dict[int, NodeGroup] = dict()
+        # info set key -> (num_actions, row)
+        self.index: Dict[bytes, Tuple[int, int]] = dict()
+
+    def add(self, infoSet, num_actions: int) -> GoStopNode:
+        assert infoSet not in self.index
+        group = self.groups.get(num_actions)
+        if group is None:
+            group = NodeGroup(num_actions, dtype=self.dtype)
+            self.groups[num_actions] = group
+        row = group.add(infoSet)
+        self.index[infoSet] = (num_actions, row)
+        return GoStopNode(num_actions, infoSet, group, row)
+
+    def get(self, infoSet, default=None) -> Optional[GoStopNode]:
+        location = self.index.get(infoSet)
+        if location is None:
+            return default
+        num_actions, row = location
+        group = self.groups[num_actions]
+        if self._saved is not None and location not in self._saved and row < self._sizes.get(num_actions, 0):
+            self._saved[location] = (group.regretSum[row].copy(), group.strategySum[row].copy())
+        return GoStopNode(num_actions, infoSet, group, row)
+
+    def __getitem__(self, infoSet) -> GoStopNode:
+        node = self.get(infoSet)
+        if node is None:
+            raise KeyError(infoSet)
+        return node
+
+    def __setitem__(self, infoSet, node: GoStopNode):
+        location = self.index.get(infoSet)
+        if location is None:
+            store_node = self.add(infoSet, len(node.regretSum))
+        else:
+            store_node = self.get(infoSet)
+        if store_node.group is not node.group or store_node.row != node.row:
+            store_node.regretSum = node.regretSum
+            store_node.strategySum = node.strategySum
+            store_node.strategy = node.strategy
+
+    def __contains__(self, infoSet) -> bool:
+        return infoSet in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def values(self):
+        return (self[infoSet] for infoSet in self.index)
+
+    def items(self):
+        return ((infoSet, self[infoSet]) for infoSet in self.index)
+
+    def regret_matching(self) -> Dict[int, np.ndarray]:
+        # Current strategy of every info set, by number of actions (rows follow group.infoSets)
+        return dict((num_actions, group.regret_matching()) for num_actions, group in self.groups.items())
+
+    def average_strategy(self) -> Dict[int, np.ndarray]:
+        return dict((num_actions, group.average_strategy()) for num_actions, group in self.groups.items())
+
+    def floor_regrets(self):
+        # Negative regrets set to zero (CFR+), every row settled
+        for group in self.groups.values():
+            np.maximum(group.regretSum[:group.size], 0, out=group.regretSum[:group.size])
+            group.stamps[:group.size] = 0
+
+    def discount(self, positive: np.ndarray, negative: np.ndarray, strategy: np.ndarray):
+        # Scales positive regrets, negative regrets and strategy sums (Discounted CFR) of each row
+        # by the factors at its stamp, every row settled
+        for group in self.groups.values():
+            stamps = group.stamps[:group.size]
+            regretSum = group.regretSum[:group.size]
+            regretSum *= np.where(regretSum > 0, positive[stamps, None], negative[stamps, None])
+            group.strategySum[:group.size] *= strategy[stamps, None]
+            stamps[:] = 0
+
+    def checkpoint(self): 
+        # Group sizes, to take a delta against and roll back to. Until close_checkpoint, get saves
+        # each older row the first time it hands it out, so only rows in use are copied
+        self._sizes = dict((num_actions, group.size) for num_actions, group in self.groups.items())
+        self._saved = dict()
+        return self._sizes
+
+    def close_checkpoint(self): 
+        self._saved = None
+
+    def delta(self, checkpoint) -> Dict[int, Tuple[List[bytes], np.ndarray, np.ndarray]]:
+        # Changes since checkpoint, by number of actions: (info sets, regretSum deltas, strategySum deltas)
+        # of the rows that changed, rows added since are always included
+        old_rows = dict()
+        for num_actions, row in self._saved:
+            old_rows.setdefault(num_actions, []).append(row)
+        delta = dict()
+        for num_actions, group in self.groups.items():
+            size = checkpoint.get(num_actions, 0)
+            rows = sorted(old_rows.get(num_actions, ()))
+            saved = [self._saved[num_actions, row] for row in rows]
+            shape = (len(rows), num_actions)
+            regret_delta = group.regretSum[rows] - np.reshape([regretSum for regretSum, _ in saved], shape)
+            strategy_delta = group.strategySum[rows] - np.reshape([strategySum for _, strategySum in saved], shape)
+            changed = np.any(regret_delta != 0, axis=1) | np.any(strategy_delta != 0, axis=1)
+            rows = [row for row, row_changed in zip(rows, changed) if row_changed] + list(range(size, group.size))
+            if rows:
+                regret_delta = np.concatenate([regret_delta[changed], group.regretSum[size:group.size]])
+                strategy_delta = np.concatenate([strategy_delta[changed], group.strategySum[size:group.size]])
+                delta[num_actions] = ([group.infoSets[row] for row in rows], regret_delta, strategy_delta)
+        return delta
+
+    def rollback(self, checkpoint):
+        # Back to the state at checkpoint, info sets added since are removed. The checkpoint stays open
+        for (num_actions, row), (regretSum, strategySum) in self._saved.items():
+            group = self.groups[num_actions]
+            group.regretSum[row] = regretSum
+            group.strategySum[row] = strategySum
+        self._saved = dict()
+        for num_actions, group in self.groups.items():
+            size = checkpoint.get(num_actions, 0)
+            for infoSet in group.infoSets[size:]:
+                del self.index[infoSet]
+            del group.infoSets[size:]
+            for name in ("regretSum", "strategySum", "strategy"):
+                getattr(group, name)[size:group.size] = 0
+            group.stamps[size:group.size] = 0
+            group.size = size
+
+    def apply_delta(self, delta):
+        # Adds a delta from NodeStore.delta, creating the info sets it adds
+        for num_actions, (infoSets, regret_delta, strategy_delta) in delta.items():
+            rows = []
+            for infoSet in infoSets:
+                location = self.index.get(infoSet)
+                rows.append(location[1] if location is not None else self.add(infoSet, num_actions).row)
+            group = self.groups[num_actions]
+            group.regretSum[rows] += regret_delta
+            group.strategySum[rows] += strategy_delta
+
+    @staticmethod
+    def from_nodes(nodeMap: dict, dtype=np.float64):
+        # Build from a dict of GoStopNode, such as an old pickled nodeMap
+        store = NodeStore(dtype)
+        for infoSet, node in nodeMap.items():
+            store[infoSet] = node
+        return store
@@ -1,11 +1,25 @@
 from simplified_go_stop import SimplifiedGoStop
 from go_stop_ai import GoStopAI
+from strategy_file import StrategyFile
+import os
 import random 
 import numpy as np 
 
-# Initialize AI 
-ai = GoStopAI()
-ai.load_nodeMap()
+# Initialize AI, from the strategy file if there is one (GoStopAI.save_strategy
+# or python strategy_file.py saved_Nodemaps/simple saved_Nodemaps/simple.strategy)
+STRATEGY_FILE = "saved_Nodemaps/simple.strategy"
+if os.path.exists(STRATEGY_FILE): 
+    strategies = StrategyFile(STRATEGY_FILE)
+else: 
+    ai = GoStopAI()
+    ai.load_nodeMap()
+    strategies = None
+
+def get_average_strategy(infoSet): 
+    if strategies is not None: 
+        return strategies.get(infoSet)
+    node = ai.nodeMap.get(infoSet)
+    return node.get_average_strategy() if node is not None else None
 
 continue_game = True
 
@@ -26,11 +40,9 @@ while(continue_game):
 
         if simplified_game.get_current_player_number() == int(player_num): 
             
-            has_infoSet = False
             # Show AI's decision
-            if ai.nodeMap.get(simplified_game.get_infoSet()):
-                curr_strategy = ai.nodeMap[simplified_game.get_infoSet()].get_average_strategy()
-                has_infoSet = True
+            curr_strategy = get_average_strategy(simplified_game.get_infoSet())
+            has_infoSet = curr_strategy is not None
             prompt = "What action do you want to take?\n"
             prompt += str([action.serialize() for action in simplified_game.actions()])
             if  has_infoSet: 
@@ -44,13 +56,15 @@ while(continue_game):
             simplified_game.play(action)
         
         else: 
-            if ai.nodeMap.get(simplified_game.get_infoSet()):
-                curr_strategy = ai.nodeMap[simplified_game.get_infoSet()].get_average_strategy()
-            else: 
-                print("RANDOM ACTION\n")
-                num_actions = len(simplified_game.actions())
-                curr_strategy = np.ones(num_actions) / num_actions
-            action = get_action(curr_strategy)
+            # Strategy file: one lookup and an alias table draw
+            action = strategies.sample(simplified_game.get_infoSet()) if strategies is not None else None
+            if action is None: 
+                curr_strategy = get_average_strategy(simplified_game.get_infoSet())
+                if curr_strategy is None: 
+                    print("RANDOM ACTION\n")
+                    num_actions = len(simplified_game.actions())
+                    curr_strategy = np.ones(num_actions) / num_actions
+                action = get_action(curr_strategy)
             selected_action = simplified_game.actions()[action]
             print(f"Villain's selected action is: {selected_action}\n")
             simplified_game.play(selected_action)
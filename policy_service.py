@@ -0,0 +1,326 @@
+# Policy service: one process loads a strategy file once and answers info set
+# queries from many games over a local socket (a unix socket path, or a
+# (host, port) on localhost where there are none). Queries from every
+# connection wait in one queue, which is looked up as a batch when it holds
+# max_batch queries or its oldest has waited max_delay seconds. Answers are
+# normalized average strategies, uniform when the file has no such info set
+# or one with a different number of actions.
+#
+#   python policy_service.py saved_Nodemaps/simple.strategy /tmp/go_stop_policy.sock
+#
+#   async with PolicyClient("/tmp/go_stop_policy.sock") as client:
+#       strategy = await client.strategy(game.get_infoSet(), len(game.actions()))
+#       print(await client.stats())
+#
+# Frames, little endian. A client may send many before reading any answers,
+# which come back in batch order, matched by request id:
+#   query     type QUERY, request id u32, key (strategy_key) 16 bytes, number of actions u16
+#   stats     type STATS, request id u32
+#   answer    request id u32, flags u8, payload length u32, then float64 probabilities
+#             (FOUND set if they came from the file), the stats as JSON (STATS set)
+#             or why the query failed (ERROR set), such as a query for no actions
+from strategy_file import StrategyFile, KEY_SIZE, strategy_key
+
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+import numpy as np
+
+QUERY = 0
+STATS = 1
+FOUND = 1
+STATS_ANSWER = 2
+ERROR = 4
+_QUERY = struct.Struct(f"<BI{KEY_SIZE}sH")
+_STATS = struct.Struct("<BI")
+_ANSWER = struct.Struct("<IBI")
+LATENCY_WINDOW = 100000
+
+Address = Union[str, Tuple[str, int]]
+
+async def _open_server(handler, address: Address):
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.unlink(address)
+        return await asyncio.start_unix_server(handler, address)
+    return await asyncio.start_server(handler, *address)
+
+async def _open_connection(address: Address):
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+def parse_address(address: str) -> Address:
+    # "host:port" for TCP, anything else is a unix socket path
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+class PolicyService():
+    def __init__(self, policy: StrategyFile, max_batch: int = 256, max_delay: float = 0.001):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Queries waiting for the next batch: (key, number of actions, request id, writer, time received)
+        self._pending: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._server = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        # Queries answered uniformly, because the key is not in the file or has a different number of actions
+        self.missing = 0
+        self.mismatched = 0
+        # Queries answered with an error frame
+        self.errors = 0
+        self.connections = 0
+        # Seconds from receiving each query to writing its answer, the latest LATENCY_WINDOW
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.perf_counter() - self.started
+        stats = dict(
+            requests=self.requests,
+            batches=self.batches,
+            mean_batch=self.requests / self.batches if self.batches else 0.0,
+            missing=self.missing,
+            mismatched=self.mismatched,
+            errors=self.errors,
+            connections=self.connections,
+            requests_per_second=self.requests / elapsed if elapsed > 0 else 0.0,
+        )
+        if self.latencies:
+            latencies = np.array(self.latencies) * 1000
+            for name, percentile in zip(("p50_ms", "p90_ms", "p99_ms"), np.percentile(latencies, (50, 90, 99))):
+                stats[name] = float(percentile)
+            stats["max_ms"] = float(latencies.max())
+        return stats
+
+    def report(self) -> str:
+        stats = self.stats()
+        report = (f"{stats['requests']} requests in {stats['batches']} batches (mean {stats['mean_batch']:.1f}), "
+                  f"{stats['requests_per_second']:.0f}/s, {stats['missing']} missing, "
+                  f"{stats['mismatched']} mismatched, {stats['errors']} errors")
+        if "p50_ms" in stats:
+            report += (f", latency p50 {stats['p50_ms']:.3f} ms, p90 {stats['p90_ms']:.3f} ms, "
+                       f"p99 {stats['p99_ms']:.3f} ms")
+        return report
+
+    async def start(self, address: Address):
+        self._server = await _open_server(self._handle, address)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._flush()
+
+    async def serve_forever(self, address: Address, report_every: float = 0.0):
+        server = await self.start(address)
+        async with server:
+            if report_every <= 0:
+                await server.serve_forever()
+            requests = 0
+            while True:
+                await asyncio.sleep(report_every)
+                if self.requests != requests:
+                    requests = self.requests
+                    print(self.report(), flush=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                buffer += data
+                offset = self._parse(buffer, writer)
+                buffer = buffer[offset:]
+                # Only wait for the client to read when its answers pile up
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _parse(self, buffer: bytes, writer: asyncio.StreamWriter) -> int:
+        # Queues every complete frame in buffer, returning the length used
+        offset = 0
+        now = time.perf_counter()
+        while offset < len(buffer):
+            kind = buffer[offset]
+            if kind == QUERY:
+                if len(buffer) - offset < _QUERY.size:
+                    break
+                _, request_id, key, num_actions = _QUERY.unpack_from(buffer, offset)
+                offset += _QUERY.size
+                if num_actions < 1:
+                    self._error(writer, request_id, "Query for no actions")
+                    continue
+                self._pending.append((key, num_actions, request_id, writer, now))
+            elif kind == STATS:
+                if len(buffer) - offset < _STATS.size:
+                    break
+                _, request_id = _STATS.unpack_from(buffer, offset)
+                offset += _STATS.size
+                payload = json.dumps(self.stats()).encode()
+                writer.write(_ANSWER.pack(request_id, STATS_ANSWER, len(payload)) + payload)
+            else:
+                raise ConnectionError(f"Unknown frame type {kind}")
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return offset
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            self._answer(batch)
+
+    def _error(self, writer: asyncio.StreamWriter, request_id: int, message: str):
+        self.errors += 1
+        payload = message.encode()
+        if not writer.is_closing():
+            writer.write(_ANSWER.pack(request_id, ERROR, len(payload)) + payload)
+
+    def _answer(self, batch: List[tuple]):
+        # Runs in a loop callback with the batch already off the queue, so every query
+        # gets an answer frame, an error one if looking it up fails
+        try:
+            indices = self.policy.find_many([key for key, _, _, _, _ in batch]).tolist()
+        except Exception as e:
+            indices = [e] * len(batch)
+        answers: Dict[asyncio.StreamWriter, List[bytes]] = dict()
+        for (key, num_actions, request_id, writer, _), index in zip(batch, indices):
+            try:
+                if isinstance(index, Exception):
+                    raise index
+                flags, strategy = self._strategy(index, num_actions)
+                payload = strategy.astype("<f8").tobytes()
+            except Exception as e:
+                self.errors += 1
+                flags, payload = ERROR, f"Lookup failed: {e!r}".encode()
+            answers.setdefault(writer, []).append(_ANSWER.pack(request_id, flags, len(payload)) + payload)
+        for writer, frames in answers.items():
+            if not writer.is_closing():
+                writer.write(b"".join(frames))
+        now = time.perf_counter()
+        self.latencies.extend(now - received for _, _, _, _, received in batch)
+        self.requests += len(batch)
+        self.batches += 1
+
+    def _strategy(self, index: int, num_actions: int) -> Tuple[int, np.ndarray]:
+        # Answer flags and normalized strategy of the file's entry index (-1 if missing)
+        if index < 0:
+            self.missing += 1
+        else:
+            strategy = self.policy.strategy(index)
+            if len(strategy) != num_actions:
+                self.mismatched += 1
+            else:
+                total = strategy.sum()
+                if total > 0:
+                    return FOUND, strategy / total
+        return 0, np.full(num_actions, 1 / num_actions)
+
+
+class PolicyClient():
+    # One connection, shared by any number of tasks; queries are pipelined
+    def __init__(self, address: Address):
+        self.address = address
+        self._reader = self._writer = self._receiver = None
+        self._next_id = 0
+        self._waiting: Dict[int, asyncio.Future] = dict()
+
+    async def connect(self):
+        self._reader, self._writer = await _open_connection(self.address)
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            await self._receiver
+            self._writer = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _request(self) -> Tuple[int, asyncio.Future]:
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        future = self._waiting[request_id] = asyncio.get_running_loop().create_future()
+        return request_id, future
+
+    async def strategy_found(self, infoSet, num_actions: int) -> Tuple[np.ndarray, bool]:
+        # Normalized strategy of infoSet, and whether the service had it
+        request_id, future = self._request()
+        self._writer.write(_QUERY.pack(QUERY, request_id, strategy_key(infoSet), num_actions))
+        return await future
+
+    async def strategy(self, infoSet, num_actions: int) -> np.ndarray:
+        return (await self.strategy_found(infoSet, num_actions))[0]
+
+    async def stats(self) -> Dict[str, float]:
+        request_id, future = self._request()
+        self._writer.write(_STATS.pack(STATS, request_id))
+        return await future
+
+    async def _receive(self):
+        try:
+            while True:
+                header = await self._reader.readexactly(_ANSWER.size)
+                request_id, flags, length = _ANSWER.unpack(header)
+                payload = await self._reader.readexactly(length)
+                # Gone if the caller cancelled, e.g. wait_for timing out; the connection carries on
+                future = self._waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if flags & ERROR:
+                    future.set_exception(ValueError(payload.decode()))
+                elif flags & STATS_ANSWER:
+                    future.set_result(json.loads(payload))
+                else:
+                    future.set_result((np.frombuffer(payload, dtype="<f8"), bool(flags & FOUND)))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Policy service connection closed: {e}"))
+            self._waiting.clear()
+
+
+if __name__ == "__main__":
+    # python policy_service.py saved_Nodemaps/simple.strategy /tmp/go_stop_policy.sock [report seconds]
+    # python policy_service.py saved_Nodemaps/simple.strategy 127.0.0.1:8765
+    with StrategyFile(sys.argv[1]) as policy:
+        service = PolicyService(policy)
+        print(f"Serving {len(policy)} info sets on {sys.argv[2]}", flush=True)
+        try:
+            asyncio.run(service.serve_forever(parse_address(sys.argv[2]),
+                                              float(sys.argv[3]) if len(sys.argv) > 3 else 10.0))
+        except KeyboardInterrupt:
+            print(service.report())
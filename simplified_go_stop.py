@@ -8,16 +8,55 @@ from models.card import (Card,
                          SwitchCard
                          )
 from models.card_list import CardList
-from models.deck import Deck
+from models.card_ids import card_from_id
+from models.deck import Deck, make_rng
 from models.constants import Month, Type
 from models.player import Player
 from models.action import Action
 
 from go_stop import GoStop
 
+from typing import Union
+
+import numpy as np
+
+# Cards dealt in every game: 2 to player one, 3 to player two, 2 to the center, 5 left in the deck 
+DEAL_CARDS = CardList([
+    JunkCard(month=Month(6), index=1),
+    JunkCard(month=Month(11), index=0), 
+    JunkCard(month=Month(1), index=0), 
+    JunkCard(month=Month(1), index=1), 
+    JunkCard(month=Month(11), index=1),  
+    JunkCard(month=Month(6), index=0), 
+    RibbonCard(month=Month(7)), 
+    AnimalCard(month=Month(10)), 
+
+    JunkCard(month=Month(7), index=1), 
+    RibbonCard(month=Month(10)),
+
+    AnimalCard(month=Month(2)), 
+    JunkCard(month=Month(2), index=0), 
+
+])
+
 class SimplifiedGoStop(GoStop): 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, rng: Union[None, int, np.random.Generator] = None):
+        # Deal shuffled with rng (a seed or numpy Generator), the global random module if None 
+        deck = Deck(CardList(DEAL_CARDS))
+        p1_hand, p2_hand, center_cards = deck.specified_deal(2, 3, 2, make_rng(rng))
+        self._deal(p1_hand, p2_hand, center_cards, deck)
+
+    @classmethod
+    def from_deal(cls, deal): 
+        # Game from the 12 card ids of DEAL_CARDS in deal order: player one's hand, 
+        # player two's hand, the center cards, then the deck 
+        cards = CardList(card_from_id(i) for i in bytes(deal))
+        game = cls.__new__(cls)
+        game._deal(CardList(sorted(cards[:2])), CardList(sorted(cards[2:5])), 
+                   CardList(sorted(cards[5:7])), Deck(CardList(cards[7:])))
+        return game
+
+    def _deal(self, p1_hand: CardList, p2_hand: CardList, center_cards: CardList, deck: Deck): 
         p1_captured = CardList([JunkCard(month=Month(3), index=0), 
                                 JunkCard(month=Month(3), index=1),
                                 BrightCard(month=Month(8)), 
@@ -64,27 +103,7 @@ class SimplifiedGoStop(GoStop):
 
         ])
 
-        deck = Deck() 
-        deck.deck = CardList([
-                              JunkCard(month=Month(6), index=1),
-                              JunkCard(month=Month(11), index=0), 
-                              JunkCard(month=Month(1), index=0), 
-                              JunkCard(month=Month(1), index=1), 
-                              JunkCard(month=Month(11), index=1),  
-                              JunkCard(month=Month(6), index=0), 
-                              RibbonCard(month=Month(7)), 
-                              AnimalCard(month=Month(10)), 
-                              
-                              JunkCard(month=Month(7), index=1), 
-                              RibbonCard(month=Month(10)),
-
-                              AnimalCard(month=Month(2)), 
-                              JunkCard(month=Month(2), index=0), 
-
-        ])
         
-        p1_hand, p2_hand, center_cards = deck.specified_deal(2, 3, 2)
-
         p1 = Player(hand=p1_hand, number=1)
         p1.captured = p1_captured
         p1.num_go = 1
@@ -94,15 +113,16 @@ class SimplifiedGoStop(GoStop):
         p2.captured = p2_captured
         p2.update_score()
 
-        self.board = Board()
-        self.board.deck = deck
-        self.board.p1 = p1
-        self.board.p2 = p2 
-        self.board.curr_player = p1 
-        self.board.clear_center_cards()
+        board = Board.empty()
+        board.deck = deck
+        board.p1 = p1
+        board.p2 = p2 
+        board.curr_player = p1 
 
-        self.flags = Flags() 
-        self.flags.go=True
+        flags = Flags() 
+        flags.go=True
 
+        self._set_parts(board, flags)
         self._append_to_center_field(center_cards)
+        self.reset_infoSet_keys()
     
\ No newline at end of file
@@ -0,0 +1,245 @@
+# Average strategies in a read only, memory mapped file. Lookups binary search
+# the keys in place, so nothing is deserialized on open and processes reading
+# the same file share its pages. Only the normalized average strategies are
+# written, no regrets, with an alias table each so sample() draws an action
+# in constant time from one random number.
+#
+#   with StrategyFile("saved_Nodemaps/simple.strategy") as strategies:
+#       action = strategies.sample(game.get_infoSet())    # None if not in the file
+#
+# Layout, little endian, sections 8 byte aligned:
+#   header         magic, version, key size, number of info sets, section offsets
+#   keys           info set keys, sorted, KEY_SIZE bytes each
+#   offsets        uint64[n + 1], entry i is probabilities[offsets[i]:offsets[i + 1]]
+#   probabilities  float64 average strategies
+#   accept         float64, alias         uint16, alias tables laid out as probabilities (version 2)
+#   prefixes       uint64[n], first 8 bytes of each key as a big endian number, to search (version 2)
+from game_log import migrate_infoSet
+from node_store import NodeStore
+from simplified_go_stop import SimplifiedGoStop
+
+import numpy as np
+import mmap
+import pickle
+import random
+import struct
+import sys
+
+from typing import List, Optional
+
+MAGIC = b"GOSTOPST"
+VERSION = 2
+KEY_SIZE = 16
+_HEADER_V1 = struct.Struct("<8sIIQQQQ")
+_HEADER = struct.Struct("<8sIIQQQQQQQ")
+
+def strategy_key(infoSet) -> bytes:
+    # Info set keys are the KEY_SIZE byte keys of GoStop.get_infoSet. nodeMaps saved
+    # with the older tuple keys are converted by migrate_nodeMap
+    if isinstance(infoSet, bytes) and len(infoSet) == KEY_SIZE:
+        return infoSet
+    raise ValueError(f"Info set key {infoSet!r:.80} is not a {KEY_SIZE} byte key from GoStop.get_infoSet; "
+                     f"convert nodeMaps saved with tuple keys with migrate_nodeMap")
+
+def migrate_nodeMap(nodeMap, game_class=SimplifiedGoStop):
+    # nodeMap (NodeStore or dict of GoStopNode) with the tuple keys of nodeMaps saved before
+    # rolling keys replaced by the keys games look up (game_log.migrate_infoSet), as a dict.
+    # nodeMap itself if it has none. Raises ValueError for a key no game of game_class reaches
+    if all(isinstance(infoSet, bytes) for infoSet in nodeMap.keys()):
+        for infoSet in nodeMap.keys():
+            strategy_key(infoSet)
+        return nodeMap
+    migrated = dict()
+    for infoSet, node in nodeMap.items():
+        if not isinstance(infoSet, bytes):
+            infoSet = migrate_infoSet(infoSet, game_class)
+        node.infoSet = strategy_key(infoSet)
+        migrated[infoSet] = node
+    return migrated
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def alias_table(probabilities: np.ndarray):
+    # Vose's alias method: action i is taken with probability accept[i] when i is
+    # drawn uniformly, and alias[i] otherwise
+    num_actions = len(probabilities)
+    scaled = probabilities * num_actions / probabilities.sum()
+    accept = np.ones(num_actions)
+    alias = np.arange(num_actions, dtype=np.uint16)
+    small = [i for i in range(num_actions) if scaled[i] < 1]
+    large = [i for i in range(num_actions) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        accept[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    # Whatever is left is 1 up to rounding, and keeps accept 1
+    return accept, alias
+
+def write_strategy_file(filename: str, nodeMap, game_class=SimplifiedGoStop):
+    # Writes the average strategy of every info set in nodeMap (NodeStore or dict of GoStopNode),
+    # migrating tuple keys for games of game_class
+    nodeMap = migrate_nodeMap(nodeMap, game_class)
+    if not isinstance(nodeMap, NodeStore):
+        nodeMap = NodeStore.from_nodes(nodeMap)
+    average_strategies = nodeMap.average_strategy()
+    entries = sorted(
+        (strategy_key(infoSet), num_actions, row)
+        for num_actions, group in nodeMap.groups.items()
+        for row, infoSet in enumerate(group.infoSets)
+    )
+    num_entries = len(entries)
+    offsets = np.zeros(num_entries + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([num_actions for _, num_actions, _ in entries])
+    probabilities = np.empty(int(offsets[-1]), dtype="<f8")
+    accept = np.empty(len(probabilities), dtype="<f8")
+    alias = np.empty(len(probabilities), dtype="<u2")
+    for index, (_, num_actions, row) in enumerate(entries):
+        start, end = offsets[index], offsets[index + 1]
+        probabilities[start:end] = average_strategies[num_actions][row]
+        accept[start:end], alias[start:end] = alias_table(probabilities[start:end])
+
+    keys_offset = _align(_HEADER.size)
+    offsets_offset = _align(keys_offset + num_entries * KEY_SIZE)
+    probabilities_offset = _align(offsets_offset + offsets.nbytes)
+    accept_offset = _align(probabilities_offset + probabilities.nbytes)
+    alias_offset = _align(accept_offset + accept.nbytes)
+    prefixes_offset = _align(alias_offset + alias.nbytes)
+    prefixes = np.array([int.from_bytes(key[:8], "big") for key, _, _ in entries], dtype="<u8")
+    with open(filename, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, KEY_SIZE, num_entries, keys_offset, offsets_offset,
+                             probabilities_offset, accept_offset, alias_offset, prefixes_offset))
+        f.seek(keys_offset)
+        f.write(b"".join(key for key, _, _ in entries))
+        f.seek(offsets_offset)
+        f.write(offsets.tobytes())
+        f.seek(probabilities_offset)
+        f.write(probabilities.tobytes())
+        f.seek(accept_offset)
+        f.write(accept.tobytes())
+        f.seek(alias_offset)
+        f.write(alias.tobytes())
+        f.seek(prefixes_offset)
+        f.write(prefixes.tobytes())
+
+def convert_pickle(pickle_filename: str, filename: str, game_class=SimplifiedGoStop):
+    # Converts a nodeMap saved by GoStopAI.save_nodeMap, with either kind of key
+    with open(pickle_filename, "rb") as f:
+        nodeMap = pickle.load(f)
+    write_strategy_file(filename, nodeMap, game_class)
+
+
+class StrategyFile():
+    def __init__(self, filename: str):
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, key_size, num_entries,
+         keys_offset, offsets_offset, probabilities_offset) = _HEADER_V1.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a strategy file")
+        if version not in (1, VERSION) or key_size != KEY_SIZE:
+            raise ValueError(f"{filename} has unsupported version {version} or key size {key_size}")
+        self.version = version
+        self.num_entries = num_entries
+        self._keys_offset = keys_offset
+        # First 8 key bytes as big endian integers sort the same way as the keys
+        self._key_prefixes = np.ndarray((num_entries,), dtype=">u8", buffer=self._mmap,
+                                        offset=keys_offset, strides=(KEY_SIZE,))
+        self._offsets = np.ndarray((num_entries + 1,), dtype="<u8", buffer=self._mmap, offset=offsets_offset)
+        num_probabilities = int(self._offsets[-1]) if num_entries else 0
+        self._probabilities = np.ndarray((num_probabilities,), dtype="<f8", buffer=self._mmap,
+                                         offset=probabilities_offset)
+        # Version 1 files have no alias tables, sample() searches cumulative sums instead,
+        # and no prefixes section, searching the keys in place (slower, numpy converts them)
+        self._accept = self._alias = None
+        if version >= 2:
+            accept_offset, alias_offset, prefixes_offset = _HEADER.unpack_from(self._mmap)[-3:]
+            self._accept = np.ndarray((num_probabilities,), dtype="<f8", buffer=self._mmap, offset=accept_offset)
+            self._alias = np.ndarray((num_probabilities,), dtype="<u2", buffer=self._mmap, offset=alias_offset)
+            self._key_prefixes = np.ndarray((num_entries,), dtype="<u8", buffer=self._mmap, offset=prefixes_offset)
+
+    def _find(self, key: bytes) -> int:
+        prefix = int.from_bytes(key[:8], "big")
+        index = int(np.searchsorted(self._key_prefixes, prefix))
+        while index < self.num_entries and self._key_prefixes[index] == prefix:
+            start = self._keys_offset + index * KEY_SIZE
+            if self._mmap[start:start + KEY_SIZE] == key:
+                return index
+            index += 1
+        return -1
+
+    def find_many(self, keys: List[bytes]) -> np.ndarray:
+        # Index of each of keys (as from strategy_key) in the file, -1 where missing,
+        # with one binary search for all of them
+        if not keys or not self.num_entries:
+            return np.full(len(keys), -1, dtype=np.int64)
+        prefixes = np.frombuffer(b"".join(key[:8] for key in keys), dtype=">u8")
+        indices = np.minimum(np.searchsorted(self._key_prefixes, prefixes), self.num_entries - 1)
+        found = self._key_prefixes[indices] == prefixes
+        for position in np.flatnonzero(found).tolist():
+            start = self._keys_offset + int(indices[position]) * KEY_SIZE
+            if self._mmap[start:start + KEY_SIZE] != keys[position]:
+                # Another key with the same prefix, rare enough to search one by one
+                indices[position] = self._find(keys[position])
+        return np.where(found, indices, -1)
+
+    def strategy(self, index: int) -> np.ndarray:
+        # Average strategy of the entry at index (from find_many)
+        return self._probabilities[self._offsets[index]:self._offsets[index + 1]]
+
+    def get(self, infoSet, default=None) -> Optional[np.ndarray]:
+        # Average strategy of infoSet, a read only view into the file
+        index = self._find(strategy_key(infoSet))
+        if index < 0:
+            return default
+        return self._probabilities[self._offsets[index]:self._offsets[index + 1]]
+
+    def sample(self, infoSet, rng=random) -> Optional[int]:
+        # Action index drawn from infoSet's average strategy with one rng.random(),
+        # None if it is not in the file or has no actions
+        index = self._find(strategy_key(infoSet))
+        if index < 0:
+            return None
+        start = int(self._offsets[index])
+        num_actions = int(self._offsets[index + 1]) - start
+        if not num_actions:
+            return None
+        if self._accept is None:
+            cumulative = np.cumsum(self._probabilities[start:start + num_actions])
+            return min(int(np.searchsorted(cumulative, rng.random() * cumulative[-1], side="right")), num_actions - 1)
+        # The integer part of a uniform draw over the actions picks a column, the fraction accepts it or its alias
+        draw = rng.random() * num_actions
+        action = min(int(draw), num_actions - 1)
+        if draw - action < self._accept[start + action]:
+            return action
+        return int(self._alias[start + action])
+
+    def __getitem__(self, infoSet) -> np.ndarray:
+        strategy = self.get(infoSet)
+        if strategy is None:
+            raise KeyError(infoSet)
+        return strategy
+
+    def __contains__(self, infoSet) -> bool:
+        return self._find(strategy_key(infoSet)) >= 0
+
+    def __len__(self) -> int:
+        return self.num_entries
+
+    def close(self):
+        # Drop the array views first, the map cannot close while they are exported
+        self._key_prefixes = self._offsets = self._probabilities = self._accept = self._alias = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # python strategy_file.py saved_Nodemaps/simple saved_Nodemaps/simple.strategy
+    convert_pickle(sys.argv[1], sys.argv[2])
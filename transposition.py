@@ -0,0 +1,74 @@
+# Bounded transposition table keyed by 64 bit state hashes (GoStop.state_hash).
+# Entries live in buckets of two: a new key goes in the first slot and moves
+# the first slot's entry to the second, evicting the oldest of the bucket.
+#
+#   table = TranspositionTable(2**16)
+#   value = table.get(key)
+#   if value is None:
+#       value = ...
+#       table.put(key, value)
+#   print(table.report())
+from typing import Optional
+
+BUCKET_SIZE = 2
+
+class TranspositionTable():
+    __slots__ = ("size", "_mask", "_keys", "_values", "probes", "hits", "stores", "evictions")
+
+    def __init__(self, size: int = 2**16):
+        # size entries, rounded down to a power of two buckets
+        num_buckets = 1 << max(size // BUCKET_SIZE, 1).bit_length() - 1
+        self.size = num_buckets * BUCKET_SIZE
+        self._mask = num_buckets - 1
+        self._keys = [None] * self.size
+        self._values = [0.0] * self.size
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        # Entries overwritten by a different key
+        self.evictions = 0
+
+    def get(self, key: int) -> Optional[float]:
+        self.probes += 1
+        slot = (key & self._mask) * BUCKET_SIZE
+        keys = self._keys
+        if keys[slot] == key:
+            self.hits += 1
+            return self._values[slot]
+        if keys[slot + 1] == key:
+            self.hits += 1
+            return self._values[slot + 1]
+        return None
+
+    def put(self, key: int, value: float):
+        self.stores += 1
+        first = (key & self._mask) * BUCKET_SIZE
+        keys, values = self._keys, self._values
+        if keys[first] == key:
+            values[first] = value
+            return
+        if keys[first + 1] == key:
+            values[first + 1] = value
+            return
+        if keys[first + 1] is not None and keys[first] is not None:
+            self.evictions += 1
+        if keys[first] is not None:
+            keys[first + 1], values[first + 1] = keys[first], values[first]
+        keys[first], values[first] = key, value
+
+    def clear(self):
+        self._keys = [None] * self.size
+
+    def __len__(self) -> int:
+        return sum(1 for key in self._keys if key is not None)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def report(self) -> str:
+        return (f"{self.hits}/{self.probes} hits ({self.hit_rate:.1%}), "
+                f"{self.evictions} evictions, {len(self)}/{self.size} entries")